@@ -0,0 +1,105 @@
+# Plik: app/change_tracker.py
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+import threading
+import uuid
+
+
+class ChangeTracker:
+    """
+    Licznik zmian per tabela, zwiększany po każdym zatwierdzonym zapisie.
+
+    Zapisy są wykrywane zdarzeniami sesji ORM: obiekty dodane, zmienione
+    i usunięte przy flush oraz instrukcje UPDATE/DELETE/INSERT wykonywane
+    przez `session.execute`. Licznik rośnie dopiero po commit - czytelnik
+    nigdy nie dostanie nowego znacznika razem ze starymi danymi. Zapisy
+    z pominięciem sesji (`engine.begin()`) muszą wołać `bump` samodzielnie.
+
+    Subskrybenci tabeli (`subscribe`) dostają po commit zbiór kluczy
+    zmienionych wierszy albo None, gdy nie da się ich ustalić (instrukcja
+    UPDATE/DELETE na wielu wierszach). Instrukcja, która zmienia znane
+    wiersze, może je podać w opcji wykonania `changed_ids`.
+
+    `epoch` zmienia się przy każdym starcie procesu, więc znaczniki
+    wydane przed restartem nie pasują do nowych.
+    """
+
+    def __init__(self):
+        self.epoch = uuid.uuid4().hex[:8]
+        self._versions: dict[str, int] = {}
+        self._subscribers: dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def version(self, *tables: str) -> tuple[int, ...]:
+        return tuple(self._versions.get(t, 0) for t in tables)
+
+    def bump(self, *tables: str, rows: dict | None = None) -> None:
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+        for table in tables:
+            ids = rows.get(table) if rows else None
+            for callback in self._subscribers.get(table, ()):
+                callback(ids)
+
+    def subscribe(self, table: str, callback) -> None:
+        self._subscribers.setdefault(table, []).append(callback)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"epoch": self.epoch, "versions": dict(self._versions)}
+
+
+change_tracker = ChangeTracker()
+
+
+def _pending(session) -> dict:
+    """Zmienione w transakcji tabele: nazwa -> klucze wierszy (None = nieznane)."""
+    return session.info.setdefault("changed_tables", {})
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_flushed(session, flush_context):
+    pending = _pending(session)
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        table = getattr(type(obj), "__table__", None)
+        if table is None:
+            continue
+        ids = pending.setdefault(table.name, set())
+        if ids is None:
+            continue
+        state = inspect(obj)
+        # Nowe obiekty dostają identity dopiero po after_flush - ich klucz
+        # (nadany przez INSERT) czytamy wprost z atrybutów
+        identity = state.identity or state.mapper.primary_key_from_instance(obj)
+        if identity and identity[0] is not None:
+            ids.add(identity[0])
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_executed(orm_execute_state):
+    statement = orm_execute_state.statement
+    if statement.is_dml:
+        table = getattr(statement, "table", None)
+        name = getattr(table, "name", None)
+        if not name:
+            return
+        pending = _pending(orm_execute_state.session)
+        ids = orm_execute_state.execution_options.get("changed_ids")
+        if ids is not None and pending.get(name, set()) is not None:
+            pending.setdefault(name, set()).update(ids)
+        else:
+            pending[name] = None
+
+
+@event.listens_for(Session, "after_commit")
+def _publish(session):
+    pending = session.info.pop("changed_tables", None)
+    if pending:
+        change_tracker.bump(*pending, rows=pending)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard(session, previous_transaction):
+    session.info.pop("changed_tables", None)
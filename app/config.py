@@ -1,5 +1,6 @@
 # Plik: app/config.py (cała, zaktualizowana zawartość)
 
+from typing import Literal, Optional
 from pydantic_settings import BaseSettings
 
 
@@ -9,6 +10,10 @@ class Settings(BaseSettings):
     SECRET_KEY: str = "change-me"
     ACCESS_TOKEN_EXPIRE_HOURS: int = 8
     DATABASE_URL: str = "sqlite:///./toolid.db"
+    # Pula połączeń z bazą; razem z nadmiarem najwyżej tyle połączeń, ile
+    # wątków ma pula AnyIO (domyślnie 40) - więcej i tak nie pracuje naraz
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 30
     CORS_ALLOW_ORIGINS: str = "*"
     ALLOWED_LOCAL_PATH: str = "/home"
 
@@ -18,7 +23,73 @@ class Settings(BaseSettings):
     ADMIN_PASS: str = "admin"
     # -----------------------------
 
+    # Pamięć podręczna zweryfikowanych sesji; TTL to maksymalna nieaktualność
+    # po zmianach wykonanych poza procesem (0 wyłącza pamięć podręczną)
+    AUTH_SESSION_CACHE_TTL_S: float = 30
+    AUTH_SESSION_CACHE_SIZE: int = 10000
+
+    # Haszowanie haseł przy logowaniu: osobna, ograniczona pula wątków
+    AUTH_HASH_WORKERS: int = 2
+    AUTH_HASH_QUEUE_SIZE: int = 16
+    AUTH_HASH_TIMEOUT_S: float = 5
+    # Koszt bcrypt dobierany przy starcie do docelowego czasu haszowania;
+    # AUTH_BCRYPT_COST ustawia koszt na sztywno (bez kalibracji). Minimum
+    # to dawny stały koszt - kalibracja nigdy go nie obniża
+    AUTH_BCRYPT_TARGET_MS: float = 250
+    AUTH_BCRYPT_MIN_COST: int = 12
+    AUTH_BCRYPT_MAX_COST: int = 14
+    AUTH_BCRYPT_COST: Optional[int] = None
+
+    # Usuwanie wygasłych i wylogowanych sesji z tabeli user_sessions
+    SESSION_PURGE_ENABLED: bool = True
+    SESSION_PURGE_INTERVAL_S: int = 3600
+    SESSION_PURGE_BATCH_SIZE: int = 500
+    # Jak długo od wylogowania trzymać sesję (np. do audytu), także po
+    # wygaśnięciu tokenu
+    SESSION_INACTIVE_RETENTION_DAYS: int = 7
+
+    # Stronicowanie listy narzędzi (GET /api/tools)
+    TOOLS_PAGE_DEFAULT_LIMIT: int = 100
+    TOOLS_PAGE_MAX_LIMIT: int = 1000
+    # Katalog narzędzi w pamięci jako gotowy JSON (lista bez filtrów po id)
+    TOOLS_CATALOGUE_ENABLED: bool = True
+    TOOLS_CATALOGUE_GZIP_LEVEL: int = 6
+    # Import narzędzi z CSV/NDJSON (POST /api/tools/import)
+    TOOLS_IMPORT_CHUNK_SIZE: int = 500
+    TOOLS_IMPORT_MAX_ERRORS: int = 1000
+    TOOLS_IMPORT_MAX_BYTES: int = 200 * 1024 * 1024
+    # Do tego rozmiaru treść importu jest trzymana w pamięci, potem na dysku
+    TOOLS_IMPORT_SPOOL_BYTES: int = 1024 * 1024
+    # Eksport (GET /api/export/...): liczba wierszy czytanych jednym zapytaniem
+    EXPORT_BATCH_SIZE: int = 1000
+
     SCALE_LISTENER_ENABLED: bool = True
+    # "thread" - wątek na wagę, "asyncio" - wszystkie porty w pętli zdarzeń
+    SCALE_LISTENER_ENGINE: Literal["thread", "asyncio"] = "thread"
+
+    # Kolejka write-behind dla odczytów wagi
+    SCALE_QUEUE_MAX_SIZE: int = 5000
+    SCALE_QUEUE_BATCH_SIZE: int = 200
+    SCALE_QUEUE_FLUSH_INTERVAL_MS: int = 500
+    SCALE_QUEUE_PUT_TIMEOUT_MS: int = 100
+
+    # Liczba ostatnich odczytów trzymanych w pamięci dla każdej wagi
+    SCALE_BUFFER_SIZE: int = 256
+
+    # Strumień odczytów (SSE): kolejka na klienta i odstęp keep-alive
+    SCALE_STREAM_QUEUE_SIZE: int = 1
+    SCALE_STREAM_KEEPALIVE_S: int = 15
+
+    # Agregaty (rollup) odczytów i retencja danych
+    SCALE_ROLLUP_ENABLED: bool = True
+    SCALE_ROLLUP_INTERVAL_S: int = 60
+    SCALE_ROLLUP_BATCH_SIZE: int = 5000
+    SCALE_RAW_RETENTION_DAYS: int = 3
+    SCALE_MINUTE_ROLLUP_RETENTION_DAYS: int = 90
+    SCALE_HOUR_ROLLUP_RETENTION_DAYS: int = 730
+    # Maksymalny zakres zapytania o historię obsługiwany z danej rozdzielczości
+    SCALE_HISTORY_RAW_MAX_HOURS: int = 6
+    SCALE_HISTORY_MINUTE_MAX_DAYS: int = 7
 
     class Config:
         env_file = ".env"
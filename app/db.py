@@ -1,14 +1,100 @@
-from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel import SQLModel, create_engine, Session, select, delete
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateIndex
+import logging
+import time
 from .config import settings
+from .tool_search import ensure_search_index
 
 connect_args = (
     {"check_same_thread": False} if settings.DATABASE_URL.startswith("sqlite") else {}
 )
-engine = create_engine(settings.DATABASE_URL, echo=False, connect_args=connect_args)
+engine = create_engine(
+    settings.DATABASE_URL,
+    echo=False,
+    connect_args=connect_args,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+)
 
 
 def init_db() -> None:
     SQLModel.metadata.create_all(engine)
+    _add_missing_columns()
+    _create_missing_indexes()
+    ensure_search_index(engine)
+
+
+def _add_missing_columns() -> None:
+    """
+    `create_all` nie zmienia istniejących tabel. Nowe kolumny z modeli
+    (ze stałą wartością domyślną) dopisujemy przez ALTER TABLE, żeby
+    istniejąca baza na urządzeniu nie wymagała ręcznej migracji.
+    """
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in SQLModel.metadata.sorted_tables:
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                ddl = (
+                    f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" '
+                    f"{column.type.compile(dialect=engine.dialect)}"
+                )
+                default = column.default.arg if column.default is not None else None
+                if isinstance(default, bool):
+                    ddl += f" DEFAULT {int(default)}"
+                elif isinstance(default, (int, float)):
+                    ddl += f" DEFAULT {default}"
+                elif isinstance(default, str):
+                    ddl += " DEFAULT '{}'".format(default.replace("'", "''"))
+                conn.execute(text(ddl))
+                logging.info(f"Added column {table.name}.{column.name}")
+
+
+def _create_missing_indexes() -> None:
+    """Tworzy indeksy zdefiniowane w modelach, których brakuje w istniejących tabelach."""
+    # IF NOT EXISTS zamiast checkfirst - refleksja SQLite pomija indeksy na
+    # wyrażeniach, więc checkfirst próbowałby utworzyć je ponownie
+    with engine.begin() as conn:
+        for table in SQLModel.metadata.sorted_tables:
+            for index in table.indexes:
+                conn.execute(CreateIndex(index, if_not_exists=True))
+
+
+def delete_in_batches(model, *conditions, batch_size: int, pause_s: float = 0) -> int:
+    """
+    Usuwa wiersze `model` spełniające `conditions` paczkami po `batch_size`,
+    każda w osobnej, krótkiej transakcji - żeby nie trzymać długo blokady
+    zapisu. `pause_s` to przerwa między paczkami dla innych zapisujących.
+    Zwraca liczbę usuniętych wierszy.
+    """
+    purged = 0
+    while True:
+        with Session(engine) as session:
+            ids = select(model.id).where(*conditions).limit(batch_size)
+            result = session.execute(delete(model).where(model.id.in_(ids)))
+            session.commit()
+        purged += result.rowcount
+        if result.rowcount < batch_size:
+            return purged
+        if pause_s:
+            time.sleep(pause_s)
+
+
+def end_session(session: Session, result):
+    """
+    Zamyka sesję endpointu i zwraca `result` (obiekty muszą być już
+    załadowane). Sesja z `get_session` jest zamykana dopiero po walidacji
+    i wysłaniu odpowiedzi, a walidacja odpowiedzi endpointu synchronicznego
+    czeka na wolny wątek puli AnyIO. Przy fali żądań połączenia trzymają
+    żądania czekające na wątek, a wątki czekają na połączenie - serwer stoi
+    do timeoutu puli. Endpointy zapisu pod dużą współbieżnością oddają
+    połączenie przed zwróceniem wyniku.
+    """
+    session.close()
+    return result
 
 
 def get_session():
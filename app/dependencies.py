@@ -1,19 +1,38 @@
 # Plik: app/dependencies.py (cała zawartość)
 
-from fastapi import Depends, HTTPException
+from datetime import datetime
+import hashlib
+from fastapi import Depends, HTTPException, Request, Response
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from starlette.concurrency import run_in_threadpool
 from sqlmodel import Session, select
 from .security import decode_token
-from .db import get_session
-from .models import UserSession  # Import modelu sesji
+from .db import engine
+from .models import User, UserSession, StatusEnum
+from .session_cache import session_cache
+from .permissions import permission_bit, permission_engine
+from .change_tracker import change_tracker
 
 bearer = HTTPBearer(auto_error=False)
 
 
-async def get_current_user(
-    creds: HTTPAuthorizationCredentials = Depends(bearer),
-    session: Session = Depends(get_session),
-):
+def _load_session(token_jti: str):
+    """
+    Sprawdza, czy sesja jest aktywna w bazie danych, a jej właściciel nie
+    został zablokowany. Własna, krótka sesja DB - długie odpowiedzi
+    (np. strumień SSE) nie trzymają połączenia z puli przez cały czas.
+    """
+    with Session(engine) as session:
+        return session.exec(
+            select(UserSession.user_id, UserSession.expires_at)
+            .join(User, User.id == UserSession.user_id)
+            .where(UserSession.id == token_jti)
+            .where(UserSession.is_active == True)  # noqa: E712
+            .where(User.status == StatusEnum.active)
+        ).first()
+
+
+async def get_current_user(creds: HTTPAuthorizationCredentials = Depends(bearer)):
     if not creds:
         raise HTTPException(401, "Not authenticated")
     try:
@@ -24,13 +43,14 @@ async def get_current_user(
     except Exception:
         raise HTTPException(401, "Invalid token")
 
-    # Sprawdzenie, czy sesja jest aktywna w bazie danych
-    db_session = session.exec(
-        select(UserSession).where(UserSession.id == token_jti)
-    ).first()
-
-    if not db_session or not db_session.is_active:
-        raise HTTPException(401, "Session is not active")
+    if session_cache.get(token_jti) is None:
+        # Zapytanie synchroniczne - w puli wątków, żeby nie blokować pętli
+        # zdarzeń, która obsługuje wszystkie pozostałe żądania
+        row = await run_in_threadpool(_load_session, token_jti)
+        if not row:
+            raise HTTPException(401, "Session is not active")
+        expires_in = (row.expires_at - datetime.utcnow()).total_seconds()
+        session_cache.put(token_jti, row.user_id, expires_in)
 
     return payload  # {sub, role, exp, jti}
 
@@ -42,3 +62,51 @@ def require_role(*roles: str):
         return user
 
     return _checker
+
+
+def require_permission(module: str, perm: str):
+    """
+    Sprawdza uprawnienie (moduł, uprawnienie) na skompilowanej masce
+    użytkownika: rola + wpisy UserPermission. Bez zapytań do bazy, o ile
+    maska użytkownika jest już w pamięci.
+    """
+    bit = permission_bit(module, perm)
+
+    async def _checker(user=Depends(get_current_user)):
+        user_id = user.get("sub")
+        if permission_engine.mask(user_id) is None:
+            await run_in_threadpool(permission_engine.load_user, user_id)
+        if not permission_engine.allows(user_id, bit):
+            raise HTTPException(403, "Forbidden")
+        return user
+
+    return _checker
+
+
+def conditional_get(*models):
+    """
+    Obsługa ETag / If-None-Match dla listy lub zasobu zależnego od `models`.
+
+    Znacznik powstaje z liczników zmian tabel (bez zapytań do bazy) i adresu
+    żądania, więc każda kombinacja filtrów ma własny ETag. Gdy klient ma
+    aktualną wersję, odpowiedź 304 jest zwracana przed wykonaniem endpointu.
+    Zależność musi stać po zależności uwierzytelniającej.
+    """
+    tables = tuple(model.__table__.name for model in models)
+
+    async def _checker(request: Request, response: Response):
+        versions = "-".join(str(v) for v in change_tracker.version(*tables))
+        digest = hashlib.blake2b(
+            f"{request.url.path}?{request.url.query}".encode(), digest_size=8
+        ).hexdigest()
+        etag = f'"{change_tracker.epoch}-{versions}-{digest}"'
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and (
+            if_none_match.strip() == "*"
+            or etag in (tag.strip() for tag in if_none_match.split(","))
+        ):
+            raise HTTPException(status_code=304, headers=headers)
+        response.headers.update(headers)
+
+    return _checker
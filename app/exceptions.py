@@ -21,6 +21,15 @@ class OperationForbidden(Exception):
         self.reason = reason
 
 
+class ServiceBusy(Exception):
+    """Wyjątek rzucany, gdy ograniczony zasób (np. pula haszowania) jest przeciążony."""
+
+    def __init__(self, reason: str, status_code: int = 503, retry_after: int = 1):
+        self.reason = reason
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
 # --- Funkcja rejestrująca "handlery" ---
 
 
@@ -42,3 +51,12 @@ def register_exception_handlers(app):
             status_code=status.HTTP_400_BAD_REQUEST,
             content={"detail": exc.reason},
         )
+
+    @app.exception_handler(ServiceBusy)
+    async def service_busy_handler(request: Request, exc: ServiceBusy):
+        """Obsługuje przeciążenie (429/503) z nagłówkiem Retry-After."""
+        return JSONResponse(
+            status_code=exc.status_code,
+            content={"detail": exc.reason},
+            headers={"Retry-After": str(exc.retry_after)},
+        )
@@ -5,16 +5,31 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from sqlmodel import Session, select
-import threading
-import time
-import serial
-import re
+import asyncio
 import logging
 
 from .config import settings
 from .db import init_db, engine
-from .routers import auth, users, tools, scale, integrations, warehouse, recognise
-from .models import ScaleConfig, ScaleWeight
+from .routers import (
+    auth,
+    users,
+    tools,
+    scale,
+    integrations,
+    warehouse,
+    recognise,
+    system,
+    export,
+)
+from .models import ScaleConfig
+from .scale.ingest import write_queue
+from .scale.supervisor import listener_supervisor
+from .scale.rollup import scale_rollup
+from .session_purge import session_purge
+from .security import calibrate_bcrypt_cost
+from .permissions import permission_engine
+from .routers.tools.catalogue import tool_catalogue
+from .tasks import run_periodic, cancel_tasks
 from .exceptions import register_exception_handlers  # <-- WAŻNY IMPORT
 
 # Konfiguracja loggera
@@ -23,83 +38,39 @@ logging.basicConfig(
 )
 
 
-def scale_listener(scale_config: ScaleConfig, stop_event: threading.Event):
-    """
-    Funkcja działająca w osobnym wątku, nasłuchująca na porcie szeregowym
-    i zapisująca odczyty wagi do bazy danych.
-    """
-    while not stop_event.is_set():
-        try:
-            logging.info(
-                f"Attempting to connect to scale {scale_config.id} on {scale_config.port}..."
-            )
-            ser = serial.Serial(
-                port=scale_config.port,
-                baudrate=scale_config.baudrate,
-                parity=getattr(
-                    serial, f"PARITY_{scale_config.parity.upper()}", serial.PARITY_NONE
-                ),
-                stopbits=getattr(
-                    serial, f"STOPBITS_{scale_config.stop_bits}", serial.STOPBITS_ONE
-                ),
-                bytesize=getattr(serial, f"EIGHTBITS", serial.EIGHTBITS),
-                timeout=scale_config.timeout / 1000.0,
-            )
-            logging.info(
-                f"Successfully connected to scale {scale_config.id} on {scale_config.port}"
-            )
-
-            buffer = ""
-            while not stop_event.is_set():
-                data = ser.read(ser.in_waiting or 1).decode(errors="ignore")
-                if data:
-                    buffer += data
-                    if "\n" in buffer:
-                        lines = buffer.split("\n")
-                        buffer = lines.pop()
-                        for line in lines:
-                            line = line.strip()
-                            if not line:
-                                continue
-
-                            match = re.search(r"Net\s+([\d\.]+)\s+g", line)
-                            if match:
-                                try:
-                                    weight_value = float(match.group(1))
-                                    with Session(engine) as session:
-                                        scale_weight = ScaleWeight(
-                                            scale_id=scale_config.id,
-                                            weight=weight_value,
-                                        )
-                                        session.add(scale_weight)
-                                        session.commit()
-                                        logging.info(
-                                            f"Saved weight {weight_value}g for scale {scale_config.id}"
-                                        )
-                                except (ValueError, IndexError):
-                                    logging.error(
-                                        f"Could not parse weight from line: '{line}'"
-                                    )
-
-        except serial.SerialException as e:
-            logging.error(
-                f"Serial error with scale {scale_config.id} on {scale_config.port}: {e}"
-            )
-            stop_event.wait(5)  # Czekaj 5s lub do sygnału zatrzymania
-        except Exception as e:
-            logging.error(
-                f"An unexpected error occurred with scale listener {scale_config.id}: {e}"
-            )
-            stop_event.wait(5)  # Czekaj 5s lub do sygnału zatrzymania
-
-
 # --- NOWA LOGIKA CYKLU ŻYCIA APLIKACJI (LIFESPAN) ---
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Kod, który uruchamia się przy starcie aplikacji
     logging.info("--- Running application startup logic ---")
     init_db()
-    app.state.scale_threads = []
+    calibrate_bcrypt_cost()
+    permission_engine.load_all()
+    if settings.TOOLS_CATALOGUE_ENABLED:
+        tool_catalogue.warm()
+    app.state.background_tasks = []
+
+    if settings.SCALE_ROLLUP_ENABLED:
+        app.state.background_tasks.append(
+            asyncio.create_task(
+                run_periodic(
+                    "scale-rollup",
+                    scale_rollup.run_once,
+                    settings.SCALE_ROLLUP_INTERVAL_S,
+                )
+            )
+        )
+
+    if settings.SESSION_PURGE_ENABLED:
+        app.state.background_tasks.append(
+            asyncio.create_task(
+                run_periodic(
+                    "session-purge",
+                    session_purge.run_once,
+                    settings.SESSION_PURGE_INTERVAL_S,
+                )
+            )
+        )
 
     if settings.SCALE_LISTENER_ENABLED:
         with Session(engine) as s:
@@ -110,38 +81,25 @@ async def lifespan(app: FastAPI):
 
             scales = s.exec(select(ScaleConfig)).all()
             logging.info(f"Found {len(scales)} scale(s) to monitor.")
-            for scale_cfg in scales:
-                stop_event = threading.Event()
-                thread = threading.Thread(
-                    target=scale_listener, args=(scale_cfg, stop_event), daemon=True
-                )
-                app.state.scale_threads.append(
-                    {"thread": thread, "stop_event": stop_event, "id": scale_cfg.id}
-                )
-                thread.start()
-                logging.info(
-                    f"Started listener thread for scale {scale_cfg.id} on port {scale_cfg.port}"
-                )
+            write_queue.start()
+            listener_supervisor.start(settings.SCALE_LISTENER_ENGINE, scales)
     else:
         logging.info("Scale listener is disabled by configuration.")
 
     yield  # W tym miejscu aplikacja jest gotowa i czeka na żądania
 
     # Kod, który uruchomi się przy zamykaniu aplikacji
+    await cancel_tasks(app.state.background_tasks)
+
     if settings.SCALE_LISTENER_ENABLED:
         logging.info("--- Running application shutdown logic ---")
-        logging.info("Stopping all scale listener threads...")
-        for item in app.state.scale_threads:
-            item["stop_event"].set()
-
-        for item in app.state.scale_threads:
-            # Daj wątkowi 2 sekundy na zakończenie
-            item["thread"].join(timeout=2)
-            if item["thread"].is_alive():
-                logging.warning(
-                    f"Thread for scale {item['id']} did not terminate gracefully."
-                )
-        logging.info("All scale listener threads have been processed.")
+        logging.info("Stopping all scale listeners...")
+        listener_supervisor.stop()
+        logging.info("All scale listeners have been processed.")
+
+        # Zapis odczytów, które zostały jeszcze w kolejce
+        write_queue.stop()
+        logging.info(f"Scale write queue flushed: {write_queue.stats()}")
 
 
 app = FastAPI(title=settings.APP_NAME, version=settings.APP_VERSION, lifespan=lifespan)
@@ -173,3 +131,5 @@ app.include_router(
 )
 app.include_router(warehouse.router, prefix="/api/warehouse", tags=["warehouse"])
 app.include_router(recognise.router, prefix="/api/recognise", tags=["recognise"])
+app.include_router(system.router, prefix="/api/system", tags=["system"])
+app.include_router(export.router, prefix="/api/export", tags=["export"])
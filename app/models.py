@@ -3,7 +3,8 @@
 from typing import Optional
 from enum import Enum
 from datetime import datetime, date
-from sqlmodel import SQLModel, Field, Column, JSON
+from sqlmodel import SQLModel, Field, Column, JSON, UniqueConstraint, Index
+from sqlalchemy import case, literal_column, text
 import uuid
 
 
@@ -74,8 +75,42 @@ class Tool(SQLModel, table=True):
     created_at: datetime = Field(default_factory=datetime.now)
     updated_at: datetime = Field(default_factory=datetime.now)
 
+    # Indeksy pod filtrowanie i stronicowanie listy narzędzi (klucz + id)
+    __table_args__ = (
+        Index("ix_tool_name_id", "name", "id"),
+        Index("ix_tool_updated_at_id", "updated_at", "id"),
+        Index("ix_tool_type", "type"),
+        Index("ix_tool_condition", "condition"),
+        Index("ix_tool_quantity_available", "quantity_available"),
+        Index("ix_tool_width", "width"),
+        Index("ix_tool_height", "height"),
+        Index("ix_tool_area", "area"),
+    )
+
+
+# Waga narzędzia w gramach. Stałe są wstawiane dosłownie (nie jako parametry),
+# bo SQLite używa indeksu na wyrażeniu tylko przy identycznym wyrażeniu.
+tool_weight_in_grams = case(
+    (
+        Tool.weight_unit == literal_column("'kg'"),
+        Tool.weight_value * literal_column("1000"),
+    ),
+    else_=Tool.weight_value,
+)
+Index("ix_tool_weight_g", tool_weight_in_grams)
+
 
 class ToolLoan(SQLModel, table=True):
+    # Wypożyczenia narzędzia (historia i aktywne w kolejności zwrotu), lista
+    # wszystkich aktywnych i eksport po dacie wypożyczenia. Indeks częściowy
+    # ix_toolloan_open (tylko niezwrócone) obsługuje GET /api/recognise/loans
+    # (returned = 0 bez tool_id) kosztem proporcjonalnym do liczby aktywnych
+    # wypożyczeń - bez niego planer przechodzi po wszystkich narzędziach
+    __table_args__ = (
+        Index("ix_toolloan_tool_returned", "tool_id", "returned", "loan_date", "id"),
+        Index("ix_toolloan_open", "tool_id", sqlite_where=text("returned = 0")),
+        Index("ix_toolloan_loan_date", "loan_date"),
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
     tool_id: int = Field(foreign_key="tool.id")
     user_id: str = Field(foreign_key="user.id")
@@ -88,6 +123,10 @@ class ToolLoan(SQLModel, table=True):
 
 # --- Pozostałe modele bez zmian ---
 class ToolWeight(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_toolweight_tool_measured", "tool_id", "measured_at"),
+        Index("ix_toolweight_measured_at", "measured_at"),
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
     tool_id: int = Field(foreign_key="tool.id")
     weight_value: float
@@ -103,22 +142,47 @@ class ScaleConfig(SQLModel, table=True):
     data_bits: int = 8
     stop_bits: int = 1
     timeout: int = 500
+    protocol: str = Field(
+        default="net_g", description="Protokół wagi (parser linii, patrz PARSERS)"
+    )
+    # --- Filtr odczytów: stabilizacja, martwa strefa i heartbeat ---
+    stable_window: int = Field(
+        default=5, description="Liczba kolejnych odczytów do uznania wagi za stabilną"
+    )
+    stable_tolerance: float = Field(
+        default=0.5, description="Dopuszczalny rozrzut odczytów w oknie (g)"
+    )
+    deadband: float = Field(
+        default=1.0, description="Minimalna zmiana względem ostatniego zapisu (g)"
+    )
+    heartbeat_s: int = Field(
+        default=60, description="Wymuszony zapis po tylu sekundach ciszy (0 = wył.)"
+    )
     updated_at: datetime = Field(default_factory=datetime.now)
 
 
 class UserSession(SQLModel, table=True):
     __tablename__ = "user_sessions"
+    __table_args__ = (
+        # Czyszczenie sesji: wygasłe bez wylogowania (logged_out_at IS NULL)
+        # i wylogowane przed progiem retencji - oba zakresy z jednego indeksu
+        Index("ix_user_sessions_logout_expires", "logged_out_at", "expires_at"),
+    )
     id: str = Field(default_factory=lambda: str(uuid.uuid4()), primary_key=True)
     user_id: str = Field(foreign_key="user.id")
     session_token: str = Field(index=True)
     is_active: bool = Field(default=True)
-    expires_at: datetime
+    expires_at: datetime = Field(index=True)
     created_at: datetime = Field(default_factory=datetime.now)
+    logged_out_at: Optional[datetime] = None
 
 
 # ... (reszta modeli, które dodałeś wcześniej, bez zmian)
 class UserPermission(SQLModel, table=True):
     __tablename__ = "user_permissions"
+    __table_args__ = (
+        Index("ix_user_permissions_user", "user_id", "module", "permission"),
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: str = Field(foreign_key="user.id")
     module: str
@@ -139,6 +203,9 @@ class ExternalIntegration(SQLModel, table=True):
 
 class IntegrationLog(SQLModel, table=True):
     __tablename__ = "integration_logs"
+    __table_args__ = (
+        Index("ix_integration_logs_integration", "integration_id", "created_at"),
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
     integration_id: str = Field(foreign_key="external_integrations.id")
     event_type: str
@@ -174,7 +241,34 @@ class ToolMapping(SQLModel, table=True):
 # --- NOWY MODEL ---
 class ScaleWeight(SQLModel, table=True):
     __tablename__ = "scale_weights"
+    # Zapytania o historię: WHERE scale_id = ? ORDER BY created_at
+    __table_args__ = (
+        Index("ix_scale_weights_scale_created", "scale_id", "created_at"),
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
     scale_id: int = Field(foreign_key="scaleconfig.id")
     weight: float
-    created_at: datetime = Field(default_factory=datetime.now)
+    created_at: datetime = Field(default_factory=datetime.now, index=True)
+
+
+class ScaleWeightRollup(SQLModel, table=True):
+    """Agregat odczytów wagi w przedziale czasu (minuta / godzina)."""
+
+    __tablename__ = "scale_weight_rollups"
+    __table_args__ = (UniqueConstraint("scale_id", "resolution", "bucket_start"),)
+    id: Optional[int] = Field(default=None, primary_key=True)
+    scale_id: int = Field(foreign_key="scaleconfig.id")
+    resolution: str  # "minute" | "hour"
+    bucket_start: datetime
+    min_weight: float
+    max_weight: float
+    sum_weight: float
+    count: int
+
+
+class ScaleRollupState(SQLModel, table=True):
+    """Znacznik postępu agregacji: ostatnie przetworzone id z scale_weights."""
+
+    __tablename__ = "scale_rollup_state"
+    resolution: str = Field(primary_key=True)
+    last_weight_id: int = 0
@@ -0,0 +1,128 @@
+# Plik: app/permissions.py
+
+from sqlmodel import Session, select
+import threading
+
+from .db import engine
+from .models import User, UserPermission
+
+# Moduły i uprawnienia, które można nadawać przez /api/users/{id}/permissions.
+# Każda para (moduł, uprawnienie) to jeden bit w masce użytkownika.
+MODULE_PERMISSIONS = {
+    "tools": ("read", "write", "delete"),
+    "loans": ("read", "create", "return"),
+}
+
+PERMISSION_BITS = {
+    pair: 1 << i
+    for i, pair in enumerate(
+        (module, perm) for module, perms in MODULE_PERMISSIONS.items() for perm in perms
+    )
+}
+
+
+def mask_of(*pairs: tuple[str, str]) -> int:
+    mask = 0
+    for pair in pairs:
+        mask |= PERMISSION_BITS[pair]
+    return mask
+
+
+def permission_bit(module: str, perm: str) -> int:
+    try:
+        return PERMISSION_BITS[(module, perm)]
+    except KeyError:
+        raise ValueError(f"Unknown permission: {module}.{perm}")
+
+
+# Uprawnienia domyślne ról (odpowiadają dotychczasowym require_role),
+# nadpisywane wpisami UserPermission
+ROLE_DEFAULTS = {
+    "admin": mask_of(*PERMISSION_BITS),
+    "moderator": mask_of(*PERMISSION_BITS),
+    "user": mask_of(("tools", "read"), ("loans", "create")),
+}
+
+
+def compile_mask(role: str, grants: list[UserPermission]) -> int:
+    """Maska roli z nałożonymi nadaniami (granted=True) i odebraniami (False)."""
+    mask = ROLE_DEFAULTS.get(role, 0)
+    for grant in grants:
+        bit = PERMISSION_BITS.get((grant.module, grant.permission))
+        if bit is None:
+            continue
+        mask = mask | bit if grant.granted else mask & ~bit
+    return mask
+
+
+class PermissionEngine:
+    """
+    Skompilowane uprawnienia użytkowników: jedna maska bitowa na użytkownika.
+
+    Sprawdzenie to odczyt ze słownika i operacja AND, bez bazy danych.
+    Maski są ładowane przy starcie i przeliczane przez endpointy, które
+    zmieniają użytkownika lub jego uprawnienia; użytkownik spoza pamięci
+    (np. dodany przez skrypt) jest kompilowany przy pierwszym sprawdzeniu.
+    """
+
+    def __init__(self):
+        self._masks: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._counters = {"checks": 0, "denied": 0, "compiled": 0}
+
+    def load_all(self) -> int:
+        with Session(engine) as session:
+            users = session.exec(select(User.id, User.role)).all()
+            grants: dict[str, list] = {}
+            for grant in session.exec(select(UserPermission)):
+                grants.setdefault(grant.user_id, []).append(grant)
+        masks = {
+            user_id: compile_mask(role, grants.get(user_id, []))
+            for user_id, role in users
+        }
+        with self._lock:
+            self._masks = masks
+            self._counters["compiled"] += len(masks)
+        return len(masks)
+
+    def refresh(self, session: Session, user_id: str) -> None:
+        """Przelicza maskę użytkownika po zmianie (w sesji wołającego)."""
+        user = session.get(User, user_id)
+        if user is None:
+            self.forget(user_id)
+            return
+        grants = session.exec(
+            select(UserPermission).where(UserPermission.user_id == user_id)
+        ).all()
+        mask = compile_mask(user.role, grants)
+        with self._lock:
+            self._masks[user_id] = mask
+            self._counters["compiled"] += 1
+
+    def load_user(self, user_id: str) -> None:
+        with Session(engine) as session:
+            self.refresh(session, user_id)
+
+    def forget(self, user_id: str) -> None:
+        with self._lock:
+            self._masks.pop(user_id, None)
+
+    def mask(self, user_id: str) -> int | None:
+        return self._masks.get(user_id)
+
+    def allows(self, user_id: str, bit: int) -> bool:
+        allowed = bool(self._masks.get(user_id, 0) & bit)
+        with self._lock:
+            self._counters["checks"] += 1
+            if not allowed:
+                self._counters["denied"] += 1
+        return allowed
+
+    def stats(self) -> dict:
+        with self._lock:
+            data = dict(self._counters)
+            data["users"] = len(self._masks)
+        return data
+
+
+permission_engine = PermissionEngine()
@@ -3,11 +3,19 @@
 from fastapi import APIRouter, HTTPException, Depends, Body, status
 from pydantic import BaseModel
 from datetime import datetime
-from sqlmodel import Session, select
-from ..db import get_session
+from sqlmodel import Session, select, update
+from starlette.concurrency import run_in_threadpool
+from ..db import get_session, engine
 from ..models import User, UserSession
-from ..security import verify_password, create_access_token
+from ..security import (
+    verify_password,
+    hash_password,
+    needs_rehash,
+    password_pool,
+    create_access_token,
+)
 from ..dependencies import get_current_user
+from ..session_cache import session_cache
 
 router = APIRouter()
 
@@ -22,32 +30,53 @@ class TokenOut(BaseModel):
     token_type: str = "bearer"
 
 
+def _find_user(email: str) -> User | None:
+    with Session(engine) as s:
+        return s.exec(select(User).where(User.email == email)).first()
+
+
+def _open_session(user: User, new_hash: str | None) -> str:
+    """Tworzy token i sesję w bazie; opcjonalnie zapisuje nowy hasz hasła."""
+    token, jti, exp = create_access_token(sub=user.id, role=user.role)
+    with Session(engine) as s:
+        # === POPRAWKA JEST TUTAJ ===
+        # Dodajemy `session_token=token` do tworzonego obiektu.
+        user_session = UserSession(
+            id=jti, user_id=user.id, session_token=token, expires_at=exp
+        )
+        s.add(user_session)
+
+        values = {"last_login": datetime.now()}
+        if new_hash:
+            values["password_hash"] = new_hash
+        s.execute(update(User).where(User.id == user.id).values(**values))
+        s.commit()
+    return token
+
+
 @router.post("/login", response_model=TokenOut)
-def login(
+async def login(
     payload: LoginIn = Body(
         ..., example={"email": "admin@example.com", "password": "admin"}
     ),
-    session: Session = Depends(get_session),
 ):
-    s = session
-    user = s.exec(select(User).where(User.email == payload.email)).first()
-    if not user or not verify_password(payload.password, user.password_hash):
+    """
+    Haszowanie bcrypt odbywa się w osobnej, ograniczonej puli (429/503 przy
+    przeciążeniu), a zapytania do bazy - w puli wątków, poza pętlą zdarzeń.
+    """
+    user = await run_in_threadpool(_find_user, payload.email)
+    if not user or not await password_pool.run(
+        verify_password, payload.password, user.password_hash
+    ):
         raise HTTPException(401, "Invalid credentials")
 
-    # Utworzenie tokena i sesji w bazie danych
-    token, jti, exp = create_access_token(sub=user.id, role=user.role)
-
-    # === POPRAWKA JEST TUTAJ ===
-    # Dodajemy `session_token=token` do tworzonego obiektu.
-    user_session = UserSession(
-        id=jti, user_id=user.id, session_token=token, expires_at=exp
-    )
-    s.add(user_session)
-
-    user.last_login = datetime.now()
-    s.add(user)
-    s.commit()
+    # Hasz z innym kosztem niż bieżący jest przeliczany przy udanym logowaniu
+    new_hash = None
+    if needs_rehash(user.password_hash):
+        new_hash = await password_pool.run(hash_password, payload.password)
+        password_pool.count_rehash()
 
+    token = await run_in_threadpool(_open_session, user, new_hash)
     return TokenOut(access_token=token)
 
 
@@ -61,5 +90,7 @@ def logout(
     db_session = session.get(UserSession, token_jti)
     if db_session:
         db_session.is_active = False
+        db_session.logged_out_at = datetime.now()
         session.add(db_session)
         session.commit()
+    session_cache.invalidate(token_jti)
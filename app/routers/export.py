@@ -0,0 +1,129 @@
+# Plik: app/routers/export.py
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from typing import Literal, Optional
+from sqlalchemy import select
+from datetime import datetime
+import csv
+import io
+import json
+
+from ..config import settings
+from ..db import engine
+from ..models import Tool, ToolLoan, ToolWeight
+from ..dependencies import require_permission
+
+router = APIRouter()
+
+# Zbiór danych -> (tabela, kolumna czasu dla filtra zakresu dat)
+DATASETS = {
+    "tools": (Tool.__table__, Tool.__table__.c.updated_at),
+    "loans": (ToolLoan.__table__, ToolLoan.__table__.c.loan_date),
+    "weights": (ToolWeight.__table__, ToolWeight.__table__.c.measured_at),
+}
+
+MEDIA_TYPES = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+
+def _plain(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def export_rows(
+    dataset: str,
+    fmt: str,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    batch_size: int = 1000,
+):
+    """
+    Generator kolejnych porcji pliku eksportu (bajty).
+
+    Wiersze są czytane porcjami po `batch_size` po kluczu
+    (`WHERE id > ostatnie ORDER BY id LIMIT n`), każda porcja w osobnym,
+    krótkim odczycie. Połączenie wraca do puli przed wysłaniem porcji, więc
+    wolny klient nie trzyma blokady odczytu SQLite, która wstrzymałaby
+    zapisy innych żądań. W pamięci jest najwyżej jedna porcja. Kolejność
+    po id.
+    """
+    table, time_column = DATASETS[dataset]
+    query = select(table).order_by(table.c.id).limit(batch_size)
+    if date_from is not None:
+        query = query.where(time_column >= date_from)
+    if date_to is not None:
+        query = query.where(time_column < date_to)
+    columns = [column.name for column in table.columns]
+
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+    last_id = None
+    while True:
+        page = query if last_id is None else query.where(table.c.id > last_id)
+        with engine.connect() as conn:
+            rows = conn.execute(page).all()
+        if fmt == "csv":
+            writer.writerows([_plain(v) for v in row] for row in rows)
+            chunk = buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        else:
+            chunk = "".join(
+                json.dumps(dict(zip(columns, map(_plain, row))), ensure_ascii=False)
+                + "\n"
+                for row in rows
+            )
+        if chunk:
+            yield chunk.encode()
+        if len(rows) < batch_size:
+            return
+        last_id = rows[-1].id
+
+
+@router.get("/tools", dependencies=[Depends(require_permission("tools", "read"))])
+def export_tools(
+    format: Literal["csv", "ndjson"] = "csv",
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+):
+    """Eksport tabeli narzędzi; zakres dat dotyczy ostatniej zmiany (updated_at)."""
+    return _export("tools", format, date_from, date_to)
+
+
+@router.get("/loans", dependencies=[Depends(require_permission("loans", "read"))])
+def export_loans(
+    format: Literal["csv", "ndjson"] = "csv",
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+):
+    """Eksport wszystkich wypożyczeń; zakres dat dotyczy daty wypożyczenia."""
+    return _export("loans", format, date_from, date_to)
+
+
+@router.get("/weights", dependencies=[Depends(require_permission("tools", "read"))])
+def export_weights(
+    format: Literal["csv", "ndjson"] = "csv",
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+):
+    """
+    Eksport historii pomiarów wagi narzędzi; zakres dat dotyczy pomiaru.
+    Uprawnienie jak dla historii pomiarów narzędzia: tools.read.
+    """
+    return _export("weights", format, date_from, date_to)
+
+
+def _export(dataset, fmt, date_from, date_to) -> StreamingResponse:
+    """Zakres dat: od `date_from` włącznie do `date_to` wyłącznie."""
+    if date_from and date_to and date_from >= date_to:
+        raise HTTPException(400, "date_from must be earlier than date_to")
+    filename = f"{dataset}-{datetime.now():%Y%m%d-%H%M%S}.{fmt}"
+    return StreamingResponse(
+        export_rows(dataset, fmt, date_from, date_to, settings.EXPORT_BATCH_SIZE),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -7,7 +7,7 @@ from sqlmodel import Session, select
 
 from ..db import get_session
 from ..models import Tool, ToolLoan
-from ..dependencies import require_role
+from ..dependencies import require_permission, conditional_get
 
 router = APIRouter()
 
@@ -30,7 +30,10 @@ class UnreturnedLoanDetail(BaseModel):
 @router.get(
     "/loans",
     response_model=List[UnreturnedLoanDetail],
-    dependencies=[Depends(require_role("admin", "moderator"))],
+    dependencies=[
+        Depends(require_permission("loans", "read")),
+        Depends(conditional_get(ToolLoan, Tool)),
+    ],
 )
 def get_unreturned_loans_with_details(session: Session = Depends(get_session)):
     """
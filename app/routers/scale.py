@@ -1,17 +1,30 @@
 # Plik: app/routers/scale.py (poprawiona, działająca zawartość)
 
-from fastapi import APIRouter, HTTPException, Depends, Body
-from pydantic import BaseModel
+from fastapi import APIRouter, HTTPException, Depends, Body, Query, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional, Literal
+from pydantic import BaseModel, field_validator
 from pydantic.config import ConfigDict
-from datetime import datetime
+from datetime import datetime, timedelta
 from sqlmodel import Session, select
 from ..db import get_session
 from ..models import ScaleConfig, ScaleWeight
+from ..config import settings
+from ..scale.buffer import latest_readings
+from ..scale.hub import reading_hub, reading_message
+from ..scale.reading import ScaleReading
+from ..scale import history
+from ..scale.protocols import PARSERS
+from ..scale.supervisor import listener_supervisor
+from ..scale.broker import port_broker
+from ..exceptions import ResourceNotFound
 from ..dependencies import (
     require_role,
     get_current_user,
 )  # Upewnij się, że get_current_user jest importowane
 import serial
+import asyncio
 
 router = APIRouter()
 
@@ -27,6 +40,7 @@ class ScaleConfigPayload(BaseModel):
                 "data_bits": 8,
                 "stop_bits": 1,
                 "timeout": 5000,
+                "protocol": "net_g",
             }
         },
     )
@@ -36,6 +50,47 @@ class ScaleConfigPayload(BaseModel):
     data_bits: int
     stop_bits: int
     timeout: int
+    protocol: Optional[str] = None
+    # Parametry filtra odczytów (opcjonalne - brak oznacza bez zmian)
+    stable_window: Optional[int] = None
+    stable_tolerance: Optional[float] = None
+    deadband: Optional[float] = None
+    heartbeat_s: Optional[int] = None
+
+    @field_validator("protocol")
+    @classmethod
+    def _known_protocol(cls, v: Optional[str]) -> Optional[str]:
+        if v is not None and v not in PARSERS:
+            raise ValueError(f"Unknown protocol '{v}'. Available: {sorted(PARSERS)}")
+        return v
+
+
+class ScaleReadingOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: Optional[int] = None
+    scale_id: int
+    weight: float
+    stable: bool
+    created_at: datetime
+
+
+class HistoryPoint(BaseModel):
+    t: datetime
+    min: float
+    max: float
+    avg: float
+    count: int
+
+
+class HistoryOut(BaseModel):
+    scale_id: int
+    resolution: Literal["raw", "minute", "hour"]
+    start: datetime
+    end: datetime
+    points: List[HistoryPoint]
+    next_cursor: Optional[str] = None
+    downsampled: bool = False
 
 
 @router.get(
@@ -61,50 +116,154 @@ def update_config(
 ):
     s = session
     cfg = s.exec(select(ScaleConfig)).first()
+    return _save_config(s, cfg, payload)
+
+
+# --- Konfiguracja wielu wag i stan listenerów ---
+
+
+def _save_config(
+    session: Session, cfg: Optional[ScaleConfig], payload: ScaleConfigPayload
+) -> ScaleConfig:
+    """Zapisuje konfigurację i przeładowuje listener tylko tej wagi."""
+    data = payload.model_dump(exclude_unset=True, exclude_none=True)
     if not cfg:
-        cfg = ScaleConfig(**payload.model_dump())
+        cfg = ScaleConfig(**data)
     else:
-        for k, v in payload.model_dump().items():
+        for k, v in data.items():
             setattr(cfg, k, v)
     cfg.updated_at = datetime.utcnow()
-    s.add(cfg)
-    s.commit()
-    s.refresh(cfg)
+    session.add(cfg)
+    session.commit()
+    session.refresh(cfg)
+    listener_supervisor.apply(cfg)
     return cfg
 
 
-@router.get("/read", dependencies=[Depends(get_current_user)])
-def read_once(session: Session = Depends(get_session)):
-    """Wymaga tylko bycia zalogowanym."""
-    s = session
-    cfg = s.exec(select(ScaleConfig)).first()
+@router.get(
+    "/configs",
+    response_model=List[ScaleConfig],
+    dependencies=[Depends(require_role("admin"))],
+)
+def list_configs(session: Session = Depends(get_session)):
+    return session.exec(select(ScaleConfig)).all()
+
+
+@router.post(
+    "/configs",
+    response_model=ScaleConfig,
+    status_code=201,
+    dependencies=[Depends(require_role("admin"))],
+)
+def create_config(
+    payload: ScaleConfigPayload = Body(...),
+    session: Session = Depends(get_session),
+):
+    return _save_config(session, None, payload)
+
+
+@router.put(
+    "/configs/{scale_id}",
+    response_model=ScaleConfig,
+    dependencies=[Depends(require_role("admin"))],
+)
+def update_config_by_id(
+    scale_id: int,
+    payload: ScaleConfigPayload = Body(...),
+    session: Session = Depends(get_session),
+):
+    cfg = session.get(ScaleConfig, scale_id)
+    if not cfg:
+        raise ResourceNotFound(name="Scale config", resource_id=scale_id)
+    return _save_config(session, cfg, payload)
+
+
+@router.delete(
+    "/configs/{scale_id}",
+    status_code=204,
+    dependencies=[Depends(require_role("admin"))],
+)
+def delete_config(scale_id: int, session: Session = Depends(get_session)):
+    cfg = session.get(ScaleConfig, scale_id)
+    if cfg:
+        session.delete(cfg)
+        session.commit()
+    listener_supervisor.remove(scale_id)
+
+
+@router.get("/listeners", dependencies=[Depends(require_role("admin"))])
+def get_listeners():
+    """Stan listenerów wag: connecting, connected, backoff, stopping lub stopped."""
+    return listener_supervisor.status()
+
+
+def _read_config(
+    scale_id: Optional[int] = None, session: Session = Depends(get_session)
+) -> ScaleConfig:
+    if scale_id is not None:
+        cfg = session.get(ScaleConfig, scale_id)
+    else:
+        cfg = session.exec(select(ScaleConfig)).first()
     if not cfg:
         raise HTTPException(404, "No scale config")
+    return cfg
+
+
+def _read_direct(cfg: ScaleConfig) -> str:
+    """Jednorazowy odczyt z otwarciem portu - gdy listener tej wagi nie działa."""
     try:
         ser = serial.Serial(cfg.port, cfg.baudrate, timeout=cfg.timeout / 1000.0)
         raw = ser.readline().decode(errors="ignore").strip()
         ser.close()
     except serial.SerialException as e:
         raise HTTPException(status_code=500, detail=f"Scale connection error: {e}")
-    return {"raw": raw}
+    return raw
+
+
+@router.get("/read", dependencies=[Depends(get_current_user)])
+async def read_once(cfg: ScaleConfig = Depends(_read_config)):
+    """
+    Zwraca kolejną surową linię z wagi. Wymaga tylko bycia zalogowanym.
+    Linia pochodzi z portu otwartego już przez listener; równoczesne żądania
+    czekają na tę samą linię. Bez działającego listenera port jest otwierany.
+    """
+    if not listener_supervisor.is_connected(cfg.id):
+        return {"raw": await run_in_threadpool(_read_direct, cfg)}
+    raw = await port_broker.next_line(cfg.id, timeout=cfg.timeout / 1000.0)
+    return {"raw": raw or ""}
+
+
+def _warm_buffer(session: Session, scale_id: int) -> None:
+    """
+    Po restarcie bufor jest pusty - jednorazowo ładujemy ostatnie odczyty z bazy.
+    Kolejne zapytania o tę wagę obsługuje już wyłącznie pamięć.
+    """
+    if latest_readings.is_warm(scale_id):
+        return
+    rows = session.exec(
+        select(ScaleWeight)
+        .where(ScaleWeight.scale_id == scale_id)
+        .order_by(ScaleWeight.created_at.desc())  # type: ignore
+        .limit(latest_readings.size)
+    ).all()
+    latest_readings.seed(scale_id, map(ScaleReading.from_row, reversed(rows)))
 
 
 # --- ENDPOINT Z ZABEZPIECZENIEM ---
 @router.get(
     "/weight/{scale_id}/last",
-    response_model=ScaleWeight,
+    response_model=ScaleReadingOut,
     dependencies=[Depends(get_current_user)],  # <-- POPRAWKA JEST TUTAJ
 )
 def get_last_weight(scale_id: int, session: Session = Depends(get_session)):
     """
     Pobiera ostatni zarejestrowany pomiar wagi dla określonej wagi.
+    Odczyt pochodzi z bufora w pamięci; baza jest używana tylko po restarcie.
+    Flaga `stable` mówi, czy waga ustabilizowała się na tej wartości.
     Wymaga bycia zalogowanym.
     """
-    weight = session.exec(
-        select(ScaleWeight)
-        .where(ScaleWeight.scale_id == scale_id)
-        .order_by(ScaleWeight.created_at.desc())  # type: ignore
-    ).first()
+    _warm_buffer(session, scale_id)
+    weight = latest_readings.last(scale_id)
 
     if not weight:
         raise HTTPException(
@@ -112,3 +271,137 @@ def get_last_weight(scale_id: int, session: Session = Depends(get_session)):
         )
 
     return weight
+
+
+@router.get(
+    "/weight/{scale_id}/recent",
+    response_model=List[ScaleReadingOut],
+    dependencies=[Depends(get_current_user)],
+)
+def get_recent_weights(
+    scale_id: int,
+    n: int = Query(10, ge=1, le=settings.SCALE_BUFFER_SIZE),
+    session: Session = Depends(get_session),
+):
+    """Zwraca `n` ostatnich odczytów (od najnowszego) z bufora w pamięci."""
+    _warm_buffer(session, scale_id)
+    return latest_readings.recent(scale_id, n)
+
+
+def _pick_resolution(start: datetime, end: datetime) -> str:
+    """Dobiera rozdzielczość do długości zakresu i dostępności danych (retencji)."""
+    now = datetime.now()
+    span = end - start
+    if span <= timedelta(
+        hours=settings.SCALE_HISTORY_RAW_MAX_HOURS
+    ) and start >= now - timedelta(days=settings.SCALE_RAW_RETENTION_DAYS):
+        return "raw"
+    if span <= timedelta(
+        days=settings.SCALE_HISTORY_MINUTE_MAX_DAYS
+    ) and start >= now - timedelta(days=settings.SCALE_MINUTE_ROLLUP_RETENTION_DAYS):
+        return "minute"
+    return "hour"
+
+
+@router.get(
+    "/weight/{scale_id}/history",
+    response_model=HistoryOut,
+    dependencies=[Depends(get_current_user)],
+)
+def get_weight_history(
+    scale_id: int,
+    start: datetime = Query(..., alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    resolution: Optional[Literal["raw", "minute", "hour"]] = None,
+    limit: int = Query(1000, ge=1, le=10000),
+    cursor: Optional[str] = None,
+    max_points: Optional[int] = Query(None, ge=2, le=10000),
+    session: Session = Depends(get_session),
+):
+    """
+    Historia odczytów wagi w zakresie `from`-`to`. Krótkie zakresy są
+    zwracane z surowych odczytów, dłuższe z agregatów minutowych lub
+    godzinowych (min/max/avg/count). Rozdzielczość można wymusić parametrem.
+
+    Wyniki są stronicowane kursorem (`next_cursor`). Z `max_points` zwracany
+    jest cały zakres zredukowany do co najwyżej tylu punktów, z zachowaniem
+    minimów i maksimów.
+    """
+    end = end or datetime.now()
+    if end <= start:
+        raise HTTPException(400, "'to' must be later than 'from'")
+    resolution = resolution or _pick_resolution(start, end)
+
+    next_cursor = None
+    if max_points is not None:
+        total = history.count_points(session, scale_id, resolution, start, end)
+        rows = session.exec(
+            history.history_query(scale_id, resolution, start, end).execution_options(
+                yield_per=1000
+            )
+        )
+        points = list(history.decimate(rows, total, max_points))
+    else:
+        try:
+            after = history.decode_cursor(cursor) if cursor else None
+        except ValueError as e:
+            raise HTTPException(400, str(e))
+        points = session.exec(
+            history.history_query(scale_id, resolution, start, end, after).limit(
+                limit + 1
+            )
+        ).all()
+        if len(points) > limit:
+            points = points[:limit]
+            next_cursor = history.encode_cursor(points[-1])
+
+    return HistoryOut(
+        scale_id=scale_id,
+        resolution=resolution,
+        start=start,
+        end=end,
+        points=[
+            HistoryPoint(t=t, min=lo, max=hi, avg=avg, count=count)
+            for t, lo, hi, avg, count, _ in points
+        ],
+        next_cursor=next_cursor,
+        downsampled=max_points is not None,
+    )
+
+
+@router.get("/weight/{scale_id}/stream", dependencies=[Depends(get_current_user)])
+async def stream_weights(scale_id: int, request: Request):
+    """
+    Strumień odczytów wagi w formacie Server-Sent Events.
+    Na start wysyłany jest ostatni znany odczyt, potem każdy nowy odczyt.
+    Wolny klient dostaje tylko najnowszą wartość (starsze są scalane).
+    Wymaga bycia zalogowanym.
+    """
+    sub = reading_hub.subscribe(scale_id)
+    last = latest_readings.last(scale_id)
+
+    async def events():
+        try:
+            if last:
+                yield _sse_event(reading_message(last))
+            while not await request.is_disconnected():
+                try:
+                    message = await asyncio.wait_for(
+                        sub.get(), timeout=settings.SCALE_STREAM_KEEPALIVE_S
+                    )
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield _sse_event(message)
+        finally:
+            reading_hub.unsubscribe(sub)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _sse_event(data: str) -> str:
+    return f"event: weight\ndata: {data}\n\n"
@@ -0,0 +1,35 @@
+# Plik: app/routers/system.py
+
+from fastapi import APIRouter, Depends
+
+from ..dependencies import require_role
+from ..scale.ingest import write_queue
+from ..scale.hub import reading_hub
+from ..scale.rollup import scale_rollup
+from ..scale.broker import port_broker
+from ..session_cache import session_cache
+from ..session_purge import session_purge
+from ..security import password_pool
+from ..permissions import permission_engine
+from ..change_tracker import change_tracker
+from .tools.catalogue import tool_catalogue
+
+# Zabezpieczenie całego routera - wymaga roli "admin"
+router = APIRouter(dependencies=[Depends(require_role("admin"))])
+
+
+@router.get("/stats")
+def get_stats():
+    """Zwraca liczniki wewnętrznych podsystemów aplikacji."""
+    return {
+        "scale_queue": write_queue.stats(),
+        "scale_stream": reading_hub.stats(),
+        "scale_rollup": scale_rollup.stats(),
+        "scale_read_broker": port_broker.stats(),
+        "auth_sessions": session_cache.stats(),
+        "session_purge": session_purge.stats(),
+        "auth_hashing": password_pool.stats(),
+        "permissions": permission_engine.stats(),
+        "change_tracker": change_tracker.stats(),
+        "tool_catalogue": tool_catalogue.stats(),
+    }
@@ -2,10 +2,13 @@
 
 from fastapi import APIRouter
 
-from . import core, images, loans, weights
+from . import bulk, core, images, loans, search, weights
 
 router = APIRouter()
 
+# Wyszukiwarka przed core - inaczej "/search" trafiłoby do "/{tool_id}"
+router.include_router(search.router, tags=["Tools Search"])
+router.include_router(bulk.router, tags=["Tools Import"])
 router.include_router(core.router, tags=["Tools Core"])
 router.include_router(images.router, tags=["Tools Images"])
 router.include_router(loans.router, tags=["Tools Loans"])
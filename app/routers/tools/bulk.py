@@ -0,0 +1,327 @@
+# Plik: app/routers/tools/bulk.py
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from typing import Literal, Optional
+from pydantic import ValidationError
+from sqlalchemy import insert, update
+from sqlmodel import Session, select
+from datetime import datetime
+import csv
+import io
+import json
+import logging
+import tempfile
+
+from ...config import settings
+from ...db import get_session
+from ...models import Tool as ToolModel, ToolMapping
+from ...dependencies import require_permission
+from .schemas import ToolCreate
+
+router = APIRouter()
+
+# Kolumna pliku z identyfikatorem narzędzia w systemie zewnętrznym (ToolMapping)
+EXTERNAL_ID_FIELD = "external_id"
+
+
+class ImportReport:
+    """Wynik importu: liczniki i błędy kolejnych wierszy (numerowanych od 1)."""
+
+    def __init__(self, max_errors: int):
+        self.max_errors = max_errors
+        self.rows = 0
+        self.inserted = 0
+        self.updated = 0
+        self.failed = 0
+        self.errors: list[dict] = []
+
+    def error(self, row: int, message: str) -> None:
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"row": row, "error": message})
+
+    def as_dict(self, committed: bool) -> dict:
+        return {
+            "rows": self.rows,
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "failed": self.failed,
+            "committed": committed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+
+class ToolImporter:
+    """
+    Import narzędzi w jednej transakcji, paczkami po `chunk_size` wierszy.
+
+    Wiersze są walidowane schematem `ToolCreate` jeden po drugim, a w pamięci
+    jest najwyżej jedna paczka - nowe narzędzia trafiają do bazy wielowierszowym
+    INSERT, istniejące (tryb upsert) zbiorczym UPDATE po kluczu głównym.
+    Upsert szuka narzędzia po nazwie albo po identyfikatorze zewnętrznym
+    (tabela tool_id_mapping). Mapowanie jest dopisywane tylko dla nowych
+    narzędzi; id zewnętrzne przypisane już innemu narzędziu to błąd wiersza.
+    """
+
+    def __init__(
+        self,
+        session: Session,
+        mode: Literal["insert", "upsert"],
+        key: Literal["name", "external_id"],
+        chunk_size: int,
+        report: ImportReport,
+    ):
+        self.session = session
+        self.mode = mode
+        self.key = key
+        self.chunk_size = chunk_size
+        self.report = report
+        self._chunk: list[tuple[int, dict, Optional[str]]] = []
+        self._keys: set = set()
+
+    def add(self, row_no: int, raw: dict) -> None:
+        self.report.rows += 1
+        if not isinstance(raw, dict):
+            self.report.error(row_no, "Row is not an object")
+            return
+        # Puste komórki CSV oznaczają brak wartości (wartość domyślną)
+        raw = {k: v for k, v in raw.items() if k and v not in ("", None)}
+        external_id = raw.pop(EXTERNAL_ID_FIELD, None)
+        if external_id is not None:
+            external_id = str(external_id)
+        try:
+            payload = ToolCreate.model_validate(raw)
+        except ValidationError as e:
+            self.report.error(row_no, _describe(e))
+            return
+        if self.mode == "upsert" and self.key == "external_id" and not external_id:
+            self.report.error(row_no, "Missing external_id")
+            return
+
+        keys = {("ext", external_id)} if external_id else set()
+        if self.mode == "upsert":
+            keys.add(("key", payload.name if self.key == "name" else external_id))
+        if keys & self._keys:
+            # Ten sam klucz drugi raz w paczce - poprzedni wiersz musi już
+            # być w bazie, żeby ten go zaktualizował (albo został odrzucony
+            # jako duplikat), a nie zdublował
+            self.flush()
+        self._keys |= keys
+        self._chunk.append(
+            (row_no, payload.model_dump(exclude_unset=True), external_id)
+        )
+        if len(self._chunk) >= self.chunk_size:
+            self.flush()
+
+    def flush(self) -> None:
+        chunk, self._chunk, self._keys = self._chunk, [], set()
+        if not chunk:
+            return
+        existing = self._existing(chunk) if self.mode == "upsert" else {}
+        mapped = self._mapped(chunk)
+        new_rows, new_external_ids, updates = [], [], []
+        now = datetime.now()
+        for row_no, data, external_id in chunk:
+            key = data["name"] if self.key == "name" else external_id
+            current = existing.get(key)
+            if current is None:
+                if external_id in mapped:
+                    self.report.error(
+                        row_no,
+                        f"External id {external_id!r} is already mapped "
+                        f"to tool {mapped[external_id]}",
+                    )
+                    continue
+                full = ToolCreate.model_validate(data).model_dump()
+                full["quantity_available"] = full["quantity_total"]
+                full["created_at"] = full["updated_at"] = now
+                new_rows.append(full)
+                new_external_ids.append(external_id)
+                continue
+            if isinstance(current, str):
+                self.report.error(row_no, current)
+                continue
+            tool_id, total, available = current
+            data.pop("status", None)
+            if "quantity_total" in data:
+                loaned = total - available
+                if data["quantity_total"] < loaned:
+                    self.report.error(
+                        row_no,
+                        f"Cannot set total quantity to {data['quantity_total']}, "
+                        f"because {loaned} items are currently on loan.",
+                    )
+                    continue
+                data["quantity_available"] = data["quantity_total"] - loaned
+            updates.append({**data, "id": tool_id, "updated_at": now})
+
+        if new_rows:
+            ids = self.session.scalars(
+                insert(ToolModel).returning(ToolModel.id, sort_by_parameter_order=True),
+                new_rows,
+            ).all()
+            mappings = [
+                {"external_tool_id": ext, "internal_tool_id": tool_id}
+                for tool_id, ext in zip(ids, new_external_ids)
+                if ext is not None
+            ]
+            if mappings:
+                self.session.execute(insert(ToolMapping), mappings)
+            self.report.inserted += len(new_rows)
+        # Wiersze o różnych zestawach kolumn - osobny UPDATE dla każdego zestawu
+        by_columns: dict[tuple, list] = {}
+        for row in updates:
+            by_columns.setdefault(tuple(sorted(row)), []).append(row)
+        for rows in by_columns.values():
+            self.session.execute(update(ToolModel), rows)
+        self.report.updated += len(updates)
+
+    def _mapped(self, chunk) -> dict:
+        """Identyfikatory zewnętrzne z paczki, które mają już mapowanie."""
+        external_ids = [ext for _, _, ext in chunk if ext is not None]
+        if not external_ids:
+            return {}
+        query = select(ToolMapping.external_tool_id, ToolMapping.internal_tool_id)
+        return dict(
+            self.session.exec(
+                query.where(ToolMapping.external_tool_id.in_(external_ids))
+            ).all()
+        )
+
+    def _existing(self, chunk) -> dict:
+        """Klucz -> (id, quantity_total, quantity_available) lub komunikat błędu."""
+        if self.key == "name":
+            names = [data["name"] for _, data, _ in chunk]
+            query = select(
+                ToolModel.name,
+                ToolModel.id,
+                ToolModel.quantity_total,
+                ToolModel.quantity_available,
+            ).where(ToolModel.name.in_(names))
+        else:
+            external_ids = [ext for _, _, ext in chunk]
+            query = (
+                select(
+                    ToolMapping.external_tool_id,
+                    ToolModel.id,
+                    ToolModel.quantity_total,
+                    ToolModel.quantity_available,
+                )
+                .join(ToolModel, ToolModel.id == ToolMapping.internal_tool_id)
+                .where(ToolMapping.external_tool_id.in_(external_ids))
+            )
+        found = {}
+        for key, *current in self.session.exec(query):
+            found[key] = (
+                f"Ambiguous key {key!r}: more than one tool matches"
+                if key in found
+                else tuple(current)
+            )
+        return found
+
+
+def _describe(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(p) for p in e['loc']) or 'row'}: {e['msg']}"
+        for e in error.errors()
+    )
+
+
+def _records(source, fmt: str):
+    """(numer wiersza, słownik) z pliku CSV lub NDJSON czytanego strumieniowo."""
+    text = io.TextIOWrapper(source, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        for row_no, row in enumerate(csv.DictReader(text), start=1):
+            yield row_no, row
+        return
+    row_no = 0
+    for line in text:
+        if not line.strip():
+            continue
+        row_no += 1
+        try:
+            yield row_no, json.loads(line)
+        except json.JSONDecodeError as e:
+            yield row_no, f"Invalid JSON: {e.msg}"
+
+
+def _run_import(source, fmt, session, mode, key, on_error) -> dict:
+    report = ImportReport(settings.TOOLS_IMPORT_MAX_ERRORS)
+    importer = ToolImporter(
+        session, mode, key, settings.TOOLS_IMPORT_CHUNK_SIZE, report
+    )
+    try:
+        for row_no, record in _records(source, fmt):
+            if isinstance(record, str):
+                report.rows += 1
+                report.error(row_no, record)
+                continue
+            importer.add(row_no, record)
+        importer.flush()
+    except (UnicodeDecodeError, csv.Error) as e:
+        session.rollback()
+        raise HTTPException(400, f"Cannot read import file: {e}")
+
+    if report.failed and on_error == "abort":
+        session.rollback()
+        return report.as_dict(committed=False)
+    session.commit()
+    logging.info(
+        "Tool import: %d inserted, %d updated, %d failed.",
+        report.inserted,
+        report.updated,
+        report.failed,
+    )
+    return report.as_dict(committed=True)
+
+
+def _detect_format(request: Request, fmt: Optional[str]) -> str:
+    if fmt:
+        return fmt
+    content_type = request.headers.get("content-type", "")
+    if "csv" in content_type:
+        return "csv"
+    if "json" in content_type:
+        return "ndjson"
+    raise HTTPException(
+        415, "Send text/csv or application/x-ndjson, or set the format parameter"
+    )
+
+
+@router.post("/import", dependencies=[Depends(require_permission("tools", "write"))])
+async def import_tools(
+    request: Request,
+    format: Optional[Literal["csv", "ndjson"]] = None,
+    mode: Literal["insert", "upsert"] = "insert",
+    key: Literal["name", "external_id"] = "name",
+    on_error: Literal["skip", "abort"] = Query(
+        "skip", description="abort: przy jakimkolwiek błędzie nic nie zapisuje"
+    ),
+    session: Session = Depends(get_session),
+):
+    """
+    Import wielu narzędzi z pliku CSV (nagłówek z nazwami pól `ToolCreate`)
+    lub NDJSON (jeden obiekt JSON w linii) wysłanego jako treść żądania.
+    Opcjonalna kolumna `external_id` zapisuje mapowanie na id zewnętrzne.
+    Tryb `upsert` aktualizuje narzędzia znalezione po `key` zamiast tworzyć
+    duplikaty. Wszystko zapisuje się w jednej transakcji; błędne wiersze są
+    pomijane (albo przerywają import z `on_error=abort`) i wracają w raporcie.
+    """
+    fmt = _detect_format(request, format)
+    # Treść żądania trafia do pliku tymczasowego (w pamięci tylko do progu),
+    # więc rozmiar importu nie przekłada się na zużycie pamięci
+    with tempfile.SpooledTemporaryFile(
+        max_size=settings.TOOLS_IMPORT_SPOOL_BYTES
+    ) as spool:
+        size = 0
+        async for chunk in request.stream():
+            size += len(chunk)
+            if size > settings.TOOLS_IMPORT_MAX_BYTES:
+                raise HTTPException(413, "Import file is too large")
+            spool.write(chunk)
+        spool.seek(0)
+        return await run_in_threadpool(
+            _run_import, spool, fmt, session, mode, key, on_error
+        )
@@ -0,0 +1,170 @@
+# Plik: app/routers/tools/catalogue.py
+
+from sqlmodel import Session, select
+import bisect
+import gzip
+import logging
+import threading
+import time
+
+from ...config import settings
+from ...db import engine
+from ...models import Tool as ToolModel
+from ...change_tracker import change_tracker
+from .schemas import ToolOut
+
+
+class ToolCatalogue:
+    """
+    Katalog narzędzi trzymany w pamięci jako gotowy JSON.
+
+    Każdy wiersz jest serializowany przez `ToolOut` (razem z polem `status`)
+    raz, przy zmianie narzędzia - odczyt listy to tylko sklejenie bajtów.
+    Po commit, który dotknął tabeli tool, `ChangeTracker` przekazuje id
+    zmienionych wierszy; przy następnym odczycie przeładowane są tylko one.
+    Gdy id nie są znane (UPDATE/DELETE na wielu wierszach), katalog jest
+    budowany od nowa. Pełna lista i jej wersja gzip są składane leniwie
+    i trzymane do następnej zmiany.
+    """
+
+    def __init__(self, compress_level: int = 6):
+        self.compress_level = compress_level
+        self._rows: dict[int, bytes] = {}
+        self._ids: list[int] = []  # posortowane rosnąco
+        self._dirty: set[int] = set()
+        self._stale = True
+        self._body: bytes | None = None
+        self._gzipped: bytes | None = None
+        self._rows_bytes = 0
+        self._lock = threading.Lock()
+
+        self.full_rebuilds = 0
+        self.partial_rebuilds = 0
+        self.rows_reloaded = 0
+        self.last_rebuild_ms = 0.0
+
+    # --- Zmiany ---
+
+    def invalidate(self, ids=None) -> None:
+        """Oznacza wiersze do przeładowania; None - cały katalog."""
+        with self._lock:
+            if ids is None:
+                self._stale = True
+            else:
+                self._dirty.update(ids)
+
+    def warm(self) -> None:
+        """Buduje katalog z góry (przy starcie), żeby nie czekał pierwszy klient."""
+        with self._lock:
+            self._refresh()
+
+    # --- Odczyt ---
+
+    def page(self, after_id: int | None, limit: int, order: str = "asc"):
+        """
+        Strona katalogu posortowana po id: (JSON, id ostatniego wiersza lub
+        None gdy to koniec, liczba wszystkich narzędzi).
+        """
+        with self._lock:
+            self._refresh()
+            ids = self._ids
+            if order == "asc":
+                start = 0 if after_id is None else bisect.bisect_right(ids, after_id)
+                chunk = ids[start : start + limit + 1]
+            else:
+                end = (
+                    len(ids) if after_id is None else bisect.bisect_left(ids, after_id)
+                )
+                chunk = ids[max(0, end - limit - 1) : end][::-1]
+            has_more = len(chunk) > limit
+            chunk = chunk[:limit]
+            body = b"[" + b",".join(self._rows[i] for i in chunk) + b"]"
+            return body, (chunk[-1] if has_more else None), len(ids)
+
+    def body(self, compressed: bool = False) -> bytes:
+        """Cały katalog jako tablica JSON, opcjonalnie skompresowana gzip."""
+        with self._lock:
+            self._refresh()
+            if self._body is None:
+                self._body = b"[" + b",".join(self._rows[i] for i in self._ids) + b"]"
+            if not compressed:
+                return self._body
+            if self._gzipped is None:
+                self._gzipped = gzip.compress(self._body, self.compress_level)
+            return self._gzipped
+
+    # --- Przebudowa (pod blokadą) ---
+
+    def _refresh(self) -> None:
+        if not self._stale and not self._dirty:
+            return
+        started = time.perf_counter()
+        with Session(engine) as session:
+            if self._stale:
+                self._dirty.clear()
+                self._stale = False
+                self._load_all(session)
+                self.full_rebuilds += 1
+            else:
+                dirty, self._dirty = self._dirty, set()
+                self._load_rows(session, dirty)
+                self.partial_rebuilds += 1
+        self._body = self._gzipped = None
+        self.last_rebuild_ms = round((time.perf_counter() - started) * 1000, 2)
+
+    def _load_all(self, session: Session) -> None:
+        rows = {}
+        query = (
+            select(ToolModel).order_by(ToolModel.id).execution_options(yield_per=1000)
+        )
+        for tool in session.exec(query):
+            rows[tool.id] = _serialize(tool)
+        self._rows = rows
+        self._ids = list(rows)
+        self._rows_bytes = sum(len(b) for b in rows.values())
+        self.rows_reloaded += len(rows)
+        logging.info("Tool catalogue built: %d tools.", len(rows))
+
+    def _load_rows(self, session: Session, ids: set[int]) -> None:
+        found = {
+            tool.id: tool
+            for tool in session.exec(select(ToolModel).where(ToolModel.id.in_(ids)))
+        }
+        for tool_id in ids:
+            old = self._rows.pop(tool_id, None)
+            if old is not None:
+                self._rows_bytes -= len(old)
+            tool = found.get(tool_id)
+            if tool is None:
+                if old is not None:
+                    del self._ids[bisect.bisect_left(self._ids, tool_id)]
+                continue
+            row = _serialize(tool)
+            self._rows[tool_id] = row
+            self._rows_bytes += len(row)
+            if old is None:
+                bisect.insort(self._ids, tool_id)
+        self.rows_reloaded += len(ids)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "rows": len(self._ids),
+                "rows_bytes": self._rows_bytes,
+                "body_bytes": len(self._body or b""),
+                "gzip_bytes": len(self._gzipped or b""),
+                "pending_rows": len(self._dirty),
+                "stale": self._stale,
+                "full_rebuilds": self.full_rebuilds,
+                "partial_rebuilds": self.partial_rebuilds,
+                "rows_reloaded": self.rows_reloaded,
+                "last_rebuild_ms": self.last_rebuild_ms,
+            }
+
+
+def _serialize(tool: ToolModel) -> bytes:
+    return ToolOut.model_validate(tool).model_dump_json().encode()
+
+
+tool_catalogue = ToolCatalogue(settings.TOOLS_CATALOGUE_GZIP_LEVEL)
+change_tracker.subscribe(ToolModel.__table__.name, tool_catalogue.invalidate)
@@ -1,30 +1,146 @@
 # Plik: app/routers/tools/core.py
 
-from fastapi import APIRouter, Depends
-from typing import List
-from sqlmodel import Session, select
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from typing import List, Literal, Optional
+from sqlmodel import Session, select, func
 from datetime import datetime
 
+from ...config import settings
 from ...db import get_session
 from ...models import Tool as ToolModel, ToolLoan
-from ...dependencies import require_role, get_current_user
+from ...dependencies import require_permission, conditional_get
 from ...exceptions import ResourceNotFound, OperationForbidden
 from .schemas import ToolCreate, ToolUpdate, ToolOut, Message
+from . import listing
+from .listing import ToolFilters
+from .catalogue import tool_catalogue
 
 router = APIRouter()
 
 
-@router.get("/", response_model=List[ToolOut], dependencies=[Depends(get_current_user)])
-def list_tools(session: Session = Depends(get_session)):
-    tools = session.exec(select(ToolModel)).all()
+def _raw_json(body: bytes, response: Response, **headers) -> Response:
+    """Gotowy JSON z katalogu; przenosi nagłówki ustawione przez zależności."""
+    out = Response(content=body, media_type="application/json", headers=headers)
+    for name in ("ETag", "Cache-Control", "X-Next-Cursor", "X-Total-Count"):
+        if name in response.headers:
+            out.headers[name] = response.headers[name]
+    return out
+
+
+def _tool_filters(
+    type: Optional[str] = None,
+    condition: Optional[str] = None,
+    available: Optional[bool] = Query(
+        None, description="true: quantity_available > 0, false: brak sztuk"
+    ),
+    weight_min: Optional[float] = Query(None, description="Waga min. w gramach"),
+    weight_max: Optional[float] = Query(None, description="Waga maks. w gramach"),
+    width_min: Optional[float] = None,
+    width_max: Optional[float] = None,
+    height_min: Optional[float] = None,
+    height_max: Optional[float] = None,
+    area_min: Optional[float] = None,
+    area_max: Optional[float] = None,
+) -> ToolFilters:
+    return ToolFilters(
+        type=type,
+        condition=condition,
+        available=available,
+        weight_min=weight_min,
+        weight_max=weight_max,
+        width_min=width_min,
+        width_max=width_max,
+        height_min=height_min,
+        height_max=height_max,
+        area_min=area_min,
+        area_max=area_max,
+    )
+
+
+@router.get(
+    "/",
+    response_model=List[ToolOut],
+    dependencies=[
+        Depends(require_permission("tools", "read")),
+        Depends(conditional_get(ToolModel)),
+    ],
+)
+def list_tools(
+    response: Response,
+    filters: ToolFilters = Depends(_tool_filters),
+    sort: Literal["id", "name", "updated_at"] = "id",
+    order: Literal["asc", "desc"] = "asc",
+    limit: int = Query(
+        settings.TOOLS_PAGE_DEFAULT_LIMIT, ge=1, le=settings.TOOLS_PAGE_MAX_LIMIT
+    ),
+    cursor: Optional[str] = None,
+    include_total: bool = False,
+    session: Session = Depends(get_session),
+):
+    """
+    Strona narzędzi posortowana stabilnie po (`sort`, id). Gdy są kolejne
+    wyniki, nagłówek `X-Next-Cursor` zawiera kursor następnej strony.
+    Z `include_total=true` nagłówek `X-Total-Count` podaje liczbę wszystkich
+    narzędzi spełniających filtry (dodatkowe zapytanie COUNT).
+    Lista bez filtrów sortowana po id jest podawana z katalogu w pamięci.
+    """
+    try:
+        after = listing.decode_cursor(cursor, sort, order) if cursor else None
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+    if settings.TOOLS_CATALOGUE_ENABLED and sort == "id" and filters.is_empty():
+        # Bez filtrów strona pochodzi z katalogu w pamięci - bez zapytania
+        body, last_id, total = tool_catalogue.page(after and after[1], limit, order)
+        if last_id is not None:
+            response.headers["X-Next-Cursor"] = listing.encode_cursor(
+                sort, order, last_id, last_id
+            )
+        if include_total:
+            response.headers["X-Total-Count"] = str(total)
+        return _raw_json(body, response)
+
+    tools = session.exec(
+        listing.tools_query(filters, sort, order, after).limit(limit + 1)
+    ).all()
+    if len(tools) > limit:
+        tools = tools[:limit]
+        response.headers["X-Next-Cursor"] = listing.encode_cursor(
+            sort, order, getattr(tools[-1], sort), tools[-1].id
+        )
+    if include_total:
+        response.headers["X-Total-Count"] = str(listing.count_tools(session, filters))
     return tools
 
 
+@router.get(
+    "/catalogue",
+    response_model=List[ToolOut],
+    dependencies=[
+        Depends(require_permission("tools", "read")),
+        Depends(conditional_get(ToolModel)),
+    ],
+)
+def get_catalogue(request: Request, response: Response):
+    """
+    Cały katalog narzędzi (posortowany po id) jednym żądaniem, z pamięci.
+    Klient akceptujący gzip dostaje wersję skompresowaną z góry.
+    """
+    if not settings.TOOLS_CATALOGUE_ENABLED:
+        raise HTTPException(404, "Tool catalogue is disabled")
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        body = tool_catalogue.body(compressed=True)
+        return _raw_json(
+            body, response, **{"Content-Encoding": "gzip", "Vary": "Accept-Encoding"}
+        )
+    return _raw_json(tool_catalogue.body(), response, Vary="Accept-Encoding")
+
+
 @router.post(
     "/",
     response_model=ToolOut,
     status_code=201,
-    dependencies=[Depends(require_role("admin", "moderator"))],
+    dependencies=[Depends(require_permission("tools", "write"))],
 )
 def create_tool(payload: ToolCreate, session: Session = Depends(get_session)):
     obj_data = payload.model_dump()
@@ -37,7 +153,12 @@ def create_tool(payload: ToolCreate, session: Session = Depends(get_session)):
 
 
 @router.get(
-    "/{tool_id}", response_model=ToolOut, dependencies=[Depends(get_current_user)]
+    "/{tool_id}",
+    response_model=ToolOut,
+    dependencies=[
+        Depends(require_permission("tools", "read")),
+        Depends(conditional_get(ToolModel)),
+    ],
 )
 def get_tool(tool_id: int, session: Session = Depends(get_session)):
     obj = session.get(ToolModel, tool_id)
@@ -49,7 +170,7 @@ def get_tool(tool_id: int, session: Session = Depends(get_session)):
 @router.put(
     "/{tool_id}",
     response_model=ToolOut,
-    dependencies=[Depends(require_role("admin", "moderator"))],
+    dependencies=[Depends(require_permission("tools", "write"))],
 )
 def update_tool(
     tool_id: int, data: ToolUpdate, session: Session = Depends(get_session)
@@ -83,7 +204,7 @@ def update_tool(
 @router.delete(
     "/{tool_id}",
     response_model=Message,
-    dependencies=[Depends(require_role("admin", "moderator"))],
+    dependencies=[Depends(require_permission("tools", "delete"))],
 )
 def delete_tool(tool_id: int, session: Session = Depends(get_session)):
     tool = session.get(ToolModel, tool_id)
@@ -91,12 +212,14 @@ def delete_tool(tool_id: int, session: Session = Depends(get_session)):
         raise ResourceNotFound(name="Tool", resource_id=tool_id)
 
     active_loans = session.exec(
-        select(ToolLoan).where(ToolLoan.tool_id == tool_id, ToolLoan.returned == False)
-    ).all()
+        select(func.count())
+        .select_from(ToolLoan)
+        .where(ToolLoan.tool_id == tool_id, ToolLoan.returned == False)
+    ).one()
 
     if active_loans:
         raise OperationForbidden(
-            f"Cannot delete tool. There are {len(active_loans)} active loans."
+            f"Cannot delete tool. There are {active_loans} active loans."
         )
 
     session.delete(tool)
@@ -13,7 +13,7 @@ from datetime import datetime
 
 from ...db import get_session
 from ...models import Tool as ToolModel
-from ...dependencies import require_role
+from ...dependencies import require_permission
 from ...config import settings
 from ...exceptions import ResourceNotFound, OperationForbidden
 from .schemas import ToolOut, Base64ImagePayload, LocalImagePayload
@@ -24,7 +24,7 @@ router = APIRouter()
 @router.post(
     "/{tool_id}/upload-base64-image",
     response_model=ToolOut,
-    dependencies=[Depends(require_role("admin", "moderator"))],
+    dependencies=[Depends(require_permission("tools", "write"))],
 )
 def upload_base64_image(
     tool_id: int, payload: Base64ImagePayload, session: Session = Depends(get_session)
@@ -75,7 +75,7 @@ def upload_base64_image(
 @router.post(
     "/{tool_id}/assign-local-image",
     response_model=ToolOut,
-    dependencies=[Depends(require_role("admin", "moderator"))],
+    dependencies=[Depends(require_permission("tools", "write"))],
 )
 def assign_local_image(
     tool_id: int, payload: LocalImagePayload, session: Session = Depends(get_session)
@@ -0,0 +1,114 @@
+# Plik: app/routers/tools/listing.py
+
+from dataclasses import astuple, dataclass
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import tuple_
+from sqlmodel import select, func
+import base64
+import json
+
+from ...models import Tool as ToolModel, tool_weight_in_grams
+
+SORT_COLUMNS = {
+    "id": ToolModel.id,
+    "name": ToolModel.name,
+    "updated_at": ToolModel.updated_at,
+}
+
+
+@dataclass
+class ToolFilters:
+    """Filtry listy narzędzi; None oznacza brak ograniczenia."""
+
+    type: Optional[str] = None
+    condition: Optional[str] = None
+    available: Optional[bool] = None
+    weight_min: Optional[float] = None
+    weight_max: Optional[float] = None
+    width_min: Optional[float] = None
+    width_max: Optional[float] = None
+    height_min: Optional[float] = None
+    height_max: Optional[float] = None
+    area_min: Optional[float] = None
+    area_max: Optional[float] = None
+
+    def is_empty(self) -> bool:
+        return all(value is None for value in astuple(self))
+
+    def conditions(self) -> list:
+        out = []
+        if self.type is not None:
+            out.append(ToolModel.type == self.type)
+        if self.condition is not None:
+            out.append(ToolModel.condition == self.condition)
+        if self.available is True:
+            out.append(ToolModel.quantity_available > 0)
+        elif self.available is False:
+            out.append(ToolModel.quantity_available <= 0)
+        ranges = (
+            (tool_weight_in_grams, self.weight_min, self.weight_max),
+            (ToolModel.width, self.width_min, self.width_max),
+            (ToolModel.height, self.height_min, self.height_max),
+            (ToolModel.area, self.area_min, self.area_max),
+        )
+        for column, low, high in ranges:
+            if low is not None:
+                out.append(column >= low)
+            if high is not None:
+                out.append(column <= high)
+        return out
+
+
+def encode_cursor(sort: str, order: str, value, tool_id: int) -> str:
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([sort, order, value, tool_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str, sort: str, order: str) -> tuple:
+    """Dekoduje kursor dla danego sortowania; rzuca ValueError przy niezgodności."""
+    try:
+        c_sort, c_order, value, tool_id = json.loads(
+            base64.urlsafe_b64decode(cursor.encode())
+        )
+        if sort == "updated_at":
+            value = datetime.fromisoformat(value)
+        tool_id = int(tool_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if (c_sort, c_order) != (sort, order):
+        raise ValueError("Cursor does not match the requested sort order")
+    return value, tool_id
+
+
+def tools_query(
+    filters: ToolFilters, sort: str, order: str, after: Optional[tuple] = None
+):
+    """
+    Zapytanie o stronę narzędzi posortowaną stabilnie po (`sort`, id).
+    Kolejna strona zaczyna się za kluczem `after` - bez OFFSET, więc koszt
+    nie rośnie z numerem strony.
+    """
+    column = SORT_COLUMNS[sort]
+    query = select(ToolModel).where(*filters.conditions())
+    if sort == "id":
+        if after is not None:
+            query = query.where(
+                ToolModel.id > after[1] if order == "asc" else ToolModel.id < after[1]
+            )
+        keys = (ToolModel.id,)
+    else:
+        if after is not None:
+            key = tuple_(column, ToolModel.id)
+            query = query.where(key > after if order == "asc" else key < after)
+        keys = (column, ToolModel.id)
+    if order == "desc":
+        keys = tuple(k.desc() for k in keys)
+    return query.order_by(*keys)
+
+
+def count_tools(session, filters: ToolFilters) -> int:
+    query = select(func.count()).select_from(ToolModel).where(*filters.conditions())
+    return session.exec(query).one()
@@ -1,63 +1,248 @@
 # Plik: app/routers/tools/loans.py
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
 from typing import List
-from sqlmodel import Session, select
+from sqlmodel import Session, select, update
 from datetime import datetime
 
-from ...db import get_session
+from ...db import get_session, end_session
 from ...models import Tool as ToolModel, ToolLoan, User
-from ...dependencies import require_role, get_current_user
+from ...dependencies import require_permission
 from ...exceptions import ResourceNotFound, OperationForbidden
-from .schemas import ToolReturnPayload
+from .schemas import (
+    ToolReturnPayload,
+    BatchLoanPayload,
+    BatchLoanItemResult,
+    BatchLoanResult,
+)
 
 router = APIRouter()
 
+# Wszystkie zmiany stanu magazynu to warunkowe UPDATE ze sprawdzeniem liczby
+# zmienionych wierszy - poprawne przy równoległych żądaniach bez blokady
+# w procesie. Niezmiennik: quantity_available + aktywne wypożyczenia
+# == quantity_total.
+
+
+def _take(session: Session, tool_id: int, quantity: int) -> bool:
+    """Zmniejsza stan o `quantity`, o ile tyle sztuk jest dostępnych."""
+    taken = session.execute(
+        update(ToolModel)
+        .where(ToolModel.id == tool_id, ToolModel.quantity_available >= quantity)
+        .values(
+            quantity_available=ToolModel.quantity_available - quantity,
+            updated_at=datetime.now(),
+        )
+        .execution_options(changed_ids=[tool_id])
+    )
+    return taken.rowcount == 1
+
+
+def _restock(session: Session, tool_id: int, quantity: int) -> bool:
+    """Zwiększa stan o `quantity`, o ile nie przekroczy quantity_total."""
+    restocked = session.execute(
+        update(ToolModel)
+        .where(
+            ToolModel.id == tool_id,
+            ToolModel.quantity_available + quantity <= ToolModel.quantity_total,
+        )
+        .values(
+            quantity_available=ToolModel.quantity_available + quantity,
+            updated_at=datetime.now(),
+        )
+        .execution_options(changed_ids=[tool_id])
+    )
+    return restocked.rowcount == 1
+
+
+def _close_oldest_loans(session: Session, tool_id: int, quantity: int) -> list[int]:
+    """
+    Zamyka do `quantity` najstarszych aktywnych wypożyczeń. Każde jest
+    zamykane warunkowo (`returned = false`); gdy równoległy zwrot zamknął je
+    pierwszy, bierzemy następne.
+    """
+    closed: list[int] = []
+    while len(closed) < quantity:
+        loan_id = session.exec(
+            select(ToolLoan.id)
+            .where(ToolLoan.tool_id == tool_id, ToolLoan.returned == False)
+            .order_by(ToolLoan.loan_date, ToolLoan.id)
+            .limit(1)
+        ).first()
+        if loan_id is None:
+            break
+        result = session.execute(
+            update(ToolLoan)
+            .where(ToolLoan.id == loan_id, ToolLoan.returned == False)
+            .values(returned=True, return_date=datetime.now())
+            .execution_options(changed_ids=[loan_id])
+        )
+        if result.rowcount == 1:
+            closed.append(loan_id)
+    return closed
+
+
+def _missing_or(session: Session, tool_id: int, error: Exception) -> Exception:
+    if not session.get(ToolModel, tool_id):
+        return ResourceNotFound(name="Tool", resource_id=tool_id)
+    return error
+
+
+def _lend(session: Session, tool_id: int, user_id: str, quantity: int) -> list:
+    """Wypożycza `quantity` sztuk (jedno ToolLoan na sztukę), bez commit."""
+    if not _take(session, tool_id, quantity):
+        raise _missing_or(
+            session,
+            tool_id,
+            OperationForbidden(reason="No available items for this tool."),
+        )
+    loans = [ToolLoan(tool_id=tool_id, user_id=user_id) for _ in range(quantity)]
+    session.add_all(loans)
+    session.flush()
+    return loans
+
+
+def _give_back(session: Session, tool_id: int, quantity: int) -> list[int]:
+    """
+    Zwraca `quantity` sztuk, bez commit. Najpierw stan magazynu - warunek
+    `<= quantity_total` rezerwuje sztuki do zwrotu - potem wypożyczenia.
+    Przy braku aktywnych wypożyczeń (niespójne dane) zmiany są cofane.
+    """
+    if not _restock(session, tool_id, quantity):
+        raise _missing_or(
+            session,
+            tool_id,
+            OperationForbidden(
+                reason="Cannot return tool: all items are already in stock."
+            ),
+        )
+    closed = _close_oldest_loans(session, tool_id, quantity)
+    if len(closed) < quantity:
+        if closed:
+            session.execute(
+                update(ToolLoan)
+                .where(ToolLoan.id.in_(closed))
+                .values(returned=False, return_date=None)
+                .execution_options(changed_ids=closed)
+            )
+        _take(session, tool_id, quantity)
+        raise ResourceNotFound(name="Active loan for this tool", resource_id=tool_id)
+    return closed
+
+
+def _check_user(session: Session, current_user: dict) -> str:
+    user_id = current_user.get("sub")
+    if not session.get(User, user_id):
+        raise ResourceNotFound(name="User", resource_id=user_id)
+    return user_id
+
 
 @router.post(
     "/return",
     response_model=ToolLoan,
-    dependencies=[Depends(require_role("admin", "moderator"))],
+    dependencies=[Depends(require_permission("loans", "return"))],
 )
 def return_tool(payload: ToolReturnPayload, session: Session = Depends(get_session)):
-    tool = session.get(ToolModel, payload.tool_id)
-    if not tool:
-        raise ResourceNotFound(name="Tool", resource_id=payload.tool_id)
+    """
+    Zwrot jednej sztuki: zamyka najstarsze aktywne wypożyczenie narzędzia.
+    Dwa równoległe zwroty nie zamkną tego samego wypożyczenia ani nie
+    przekroczą liczby posiadanych sztuk.
+    """
+    try:
+        (loan_id,) = _give_back(session, payload.tool_id, 1)
+    except (ResourceNotFound, OperationForbidden):
+        session.rollback()
+        raise
+    session.commit()
+    return end_session(session, session.get(ToolLoan, loan_id))
 
-    if tool.quantity_available >= tool.quantity_total:
-        raise OperationForbidden(
-            reason="Cannot return tool: all items are already in stock."
-        )
 
-    loan_to_return = session.exec(
-        select(ToolLoan)
-        .where(ToolLoan.tool_id == payload.tool_id)
-        .where(ToolLoan.returned == False)
-        .order_by(ToolLoan.loan_date)
-    ).first()
+@router.post(
+    "/return/batch",
+    response_model=BatchLoanResult,
+    dependencies=[Depends(require_permission("loans", "return"))],
+)
+def return_tools_batch(
+    payload: BatchLoanPayload, session: Session = Depends(get_session)
+):
+    """
+    Zwrot wielu narzędzi jednym żądaniem i w jednej transakcji. Pozycja
+    zwraca `quantity` najstarszych wypożyczeń narzędzia. Semantyka błędów
+    jak w `POST /loans/batch`.
+    """
+    return _run_batch(
+        session, payload, lambda item: _give_back(session, item.tool_id, item.quantity)
+    )
+
 
-    if not loan_to_return:
-        raise ResourceNotFound(
-            name="Active loan for this tool", resource_id=payload.tool_id
-        )
+@router.post("/loans/batch", response_model=BatchLoanResult, status_code=201)
+def create_loans_batch(
+    payload: BatchLoanPayload,
+    session: Session = Depends(get_session),
+    current_user: dict = Depends(require_permission("loans", "create")),
+):
+    """
+    Wypożyczenie wielu narzędzi jednym żądaniem i w jednej transakcji
+    (jeden commit). Z `atomic=true` (domyślnie) błąd dowolnej pozycji cofa
+    całość i zwraca 409 z wynikiem każdej pozycji; z `atomic=false` udane
+    pozycje są zapisywane, a nieudane opisane w wyniku.
+    """
+    user_id = _check_user(session, current_user)
+
+    def lend(item):
+        return [
+            loan.id for loan in _lend(session, item.tool_id, user_id, item.quantity)
+        ]
+
+    return _run_batch(session, payload, lend)
 
-    loan_to_return.returned = True
-    loan_to_return.return_date = datetime.now()
-    tool.quantity_available += 1
-    tool.updated_at = datetime.now()
 
-    session.add(loan_to_return)
-    session.add(tool)
+def _run_batch(session: Session, payload: BatchLoanPayload, action) -> BatchLoanResult:
+    """
+    Wykonuje `action` dla kolejnych pozycji. Nieudana pozycja nie zostawia
+    zmian (warunkowy UPDATE nic nie zmienia albo zmiany są cofane), więc
+    w trybie nieatomowym pozostałe mogą być zapisane tym samym commitem.
+    """
+    results = []
+    failed = False
+    for item in payload.items:
+        result = BatchLoanItemResult(
+            tool_id=item.tool_id, quantity=item.quantity, ok=False
+        )
+        results.append(result)
+        if failed and payload.atomic:
+            result.error = "Not processed: batch rolled back"
+            continue
+        try:
+            result.loan_ids = action(item)
+            result.ok = True
+        except (ResourceNotFound, OperationForbidden) as e:
+            result.error = _error_message(e)
+            failed = True
+
+    if failed and payload.atomic:
+        session.rollback()
+        for result in results:
+            if result.ok:
+                result.ok, result.loan_ids = False, []
+                result.error = "Rolled back"
+        raise HTTPException(
+            409, BatchLoanResult(committed=False, items=results).model_dump()
+        )
     session.commit()
-    session.refresh(loan_to_return)
+    return end_session(session, BatchLoanResult(committed=True, items=results))
 
-    return loan_to_return
+
+def _error_message(error: Exception) -> str:
+    if isinstance(error, ResourceNotFound):
+        return f"{error.name} with ID '{error.id}' not found"
+    return error.reason
 
 
 @router.get(
     "/{tool_id}/loans",
     response_model=List[ToolLoan],
-    dependencies=[Depends(require_role("admin", "moderator"))],
+    dependencies=[Depends(require_permission("loans", "read"))],
 )
 def tool_loans(tool_id: int, session: Session = Depends(get_session)):
     return session.exec(select(ToolLoan).where(ToolLoan.tool_id == tool_id)).all()
@@ -67,30 +252,22 @@ def tool_loans(tool_id: int, session: Session = Depends(get_session)):
     "/{tool_id}/loans",
     response_model=ToolLoan,
     status_code=201,
-    dependencies=[Depends(get_current_user)],
 )
 def create_loan(
     tool_id: int,
     session: Session = Depends(get_session),
-    current_user: dict = Depends(get_current_user),
+    current_user: dict = Depends(require_permission("loans", "create")),
 ):
-    tool = session.get(ToolModel, tool_id)
-    if not tool:
-        raise ResourceNotFound(name="Tool", resource_id=tool_id)
-
-    user_id = current_user.get("sub")
-    if not session.get(User, user_id):
-        raise ResourceNotFound(name="User", resource_id=user_id)
-
-    if tool.quantity_available <= 0:
-        raise OperationForbidden(reason="No available items for this tool.")
-
-    tool.quantity_available -= 1
-    tool.updated_at = datetime.now()
-    session.add(tool)
-
-    loan = ToolLoan(tool_id=tool_id, user_id=user_id)
-    session.add(loan)
+    """
+    Wypożyczenie jednej sztuki. Przy ostatniej sztuce i wielu równoległych
+    żądaniach powiedzie się dokładnie jedno.
+    """
+    user_id = _check_user(session, current_user)
+    try:
+        (loan,) = _lend(session, tool_id, user_id, 1)
+    except (ResourceNotFound, OperationForbidden):
+        session.rollback()
+        raise
     session.commit()
     session.refresh(loan)
-    return loan
+    return end_session(session, loan)
@@ -1,7 +1,7 @@
 # Plik: app/routers/tools/schemas.py
 
-from pydantic import BaseModel, computed_field, ConfigDict
-from typing import Optional
+from pydantic import BaseModel, computed_field, ConfigDict, Field
+from typing import List, Optional
 from datetime import datetime
 
 
@@ -60,6 +60,30 @@ class ToolReturnPayload(BaseModel):
     tool_id: int
 
 
+class BatchLoanItem(BaseModel):
+    tool_id: int
+    quantity: int = Field(1, ge=1)
+
+
+class BatchLoanPayload(BaseModel):
+    items: List[BatchLoanItem] = Field(..., min_length=1, max_length=100)
+    # True: wszystko albo nic; False: każda pozycja osobno (wynik per pozycja)
+    atomic: bool = True
+
+
+class BatchLoanItemResult(BaseModel):
+    tool_id: int
+    quantity: int
+    ok: bool
+    loan_ids: List[int] = []
+    error: Optional[str] = None
+
+
+class BatchLoanResult(BaseModel):
+    committed: bool
+    items: List[BatchLoanItemResult]
+
+
 # --- Schemat odpowiedzi API ---
 class ToolOut(BaseModel):
     model_config = ConfigDict(from_attributes=True)
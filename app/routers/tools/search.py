@@ -0,0 +1,39 @@
+# Plik: app/routers/tools/search.py
+
+from fastapi import APIRouter, Depends, Query
+from typing import List
+from sqlmodel import Session, select
+
+from ...db import get_session
+from ...models import Tool as ToolModel
+from ...dependencies import require_permission
+from ...tool_search import search_tool_ids
+from .schemas import ToolOut
+
+router = APIRouter()
+
+
+@router.get(
+    "/search",
+    response_model=List[ToolOut],
+    dependencies=[Depends(require_permission("tools", "read"))],
+)
+def search_tools(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    session: Session = Depends(get_session),
+):
+    """
+    Wyszukiwanie pełnotekstowe po nazwie, typie, średnicy i stanie narzędzia.
+    Każde słowo dopasowuje początek wyrazu ("wier 6" znajdzie "Wiertło 6 mm"),
+    wielkość liter i polskie znaki nie mają znaczenia. Wyniki od najlepiej
+    dopasowanych.
+    """
+    ids = search_tool_ids(session, q, limit)
+    if not ids:
+        return []
+    tools = {
+        tool.id: tool
+        for tool in session.exec(select(ToolModel).where(ToolModel.id.in_(ids)))
+    }
+    return [tools[i] for i in ids if i in tools]
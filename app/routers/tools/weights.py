@@ -6,7 +6,7 @@ from sqlmodel import Session, select
 
 from ...db import get_session
 from ...models import Tool as ToolModel, ToolWeight
-from ...dependencies import get_current_user
+from ...dependencies import get_current_user, require_permission
 from ...exceptions import ResourceNotFound
 from .schemas import WeightCreate
 
@@ -16,7 +16,7 @@ router = APIRouter()
 @router.get(
     "/{tool_id}/weights",
     response_model=List[ToolWeight],
-    dependencies=[Depends(get_current_user)],
+    dependencies=[Depends(require_permission("tools", "read"))],
 )
 def get_tool_weights_history(tool_id: int, session: Session = Depends(get_session)):
     weights = session.exec(
@@ -2,12 +2,14 @@
 
 from fastapi import APIRouter, HTTPException, Depends, Body
 from typing import List, Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, model_validator
 from sqlmodel import Session, select
 from ..db import get_session
 from ..models import User, UserPermission
 from ..security import hash_password
 from ..dependencies import require_role
+from ..session_cache import session_cache
+from ..permissions import permission_engine, PERMISSION_BITS
 import uuid
 
 router = APIRouter()
@@ -38,6 +40,15 @@ class PermissionUpdate(BaseModel):
     permission: str
     granted: bool
 
+    @model_validator(mode="after")
+    def _known_permission(self):
+        if (self.module, self.permission) not in PERMISSION_BITS:
+            known = ", ".join(f"{m}.{p}" for m, p in PERMISSION_BITS)
+            raise ValueError(
+                f"Unknown permission '{self.module}.{self.permission}'. Known: {known}"
+            )
+        return self
+
 
 class PasswordReset(BaseModel):
     new_password: str
@@ -72,6 +83,7 @@ def create_user(u: UserCreate, session: Session = Depends(get_session)):
     session.add(user)
     session.commit()
     session.refresh(user)
+    permission_engine.refresh(session, user.id)
     return user
 
 
@@ -104,6 +116,9 @@ def update_user(
     session.add(obj)
     session.commit()
     session.refresh(obj)
+    # Zmiana statusu lub roli musi zadziałać od razu, nie po upływie TTL
+    session_cache.invalidate_user(user_id)
+    permission_engine.refresh(session, user_id)
     return obj
 
 
@@ -135,6 +150,8 @@ def delete_user(user_id: str, session: Session = Depends(get_session)):
     if obj:
         session.delete(obj)
         session.commit()
+    session_cache.invalidate_user(user_id)
+    permission_engine.forget(user_id)
 
 
 # --- Endpointy dla uprawnień ---
@@ -176,4 +193,5 @@ def update_user_permission(
     session.add(permission)
     session.commit()
     session.refresh(permission)
+    permission_engine.refresh(session, user_id)
     return permission
@@ -7,7 +7,7 @@ from sqlmodel import Session, select
 from datetime import datetime
 from ..db import get_session
 from ..models import WarehouseConfig, ToolOrder, ToolMapping, Tool
-from ..dependencies import require_role
+from ..dependencies import require_role, conditional_get
 
 # Zabezpieczenie całego routera - wymaga roli "admin"
 router = APIRouter(dependencies=[Depends(require_role("admin"))])
@@ -33,7 +33,11 @@ class ToolMappingCreate(BaseModel):
 # --- Endpointy dla konfiguracji ---
 
 
-@router.get("/config", response_model=Optional[WarehouseConfig])
+@router.get(
+    "/config",
+    response_model=Optional[WarehouseConfig],
+    dependencies=[Depends(conditional_get(WarehouseConfig))],
+)
 def get_config(session: Session = Depends(get_session)):
     return session.exec(select(WarehouseConfig)).first()
 
@@ -60,7 +64,11 @@ def update_config(
 # --- Endpointy dla zamówień ---
 
 
-@router.get("/orders", response_model=List[ToolOrder])
+@router.get(
+    "/orders",
+    response_model=List[ToolOrder],
+    dependencies=[Depends(conditional_get(ToolOrder))],
+)
 def list_orders(session: Session = Depends(get_session)):
     return session.exec(select(ToolOrder)).all()
 
@@ -77,7 +85,11 @@ def create_order(payload: OrderCreate, session: Session = Depends(get_session)):
 # --- Endpointy dla mapowania narzędzi ---
 
 
-@router.get("/tool-mapping", response_model=List[ToolMapping])
+@router.get(
+    "/tool-mapping",
+    response_model=List[ToolMapping],
+    dependencies=[Depends(conditional_get(ToolMapping))],
+)
 def list_mapping(session: Session = Depends(get_session)):
     return session.exec(select(ToolMapping)).all()
 
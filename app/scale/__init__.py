@@ -0,0 +1,3 @@
+# Plik: app/scale/__init__.py
+#
+# Podsystem obsługi wag: odczyt z portów szeregowych i zapis odczytów.
@@ -0,0 +1,98 @@
+# Plik: app/scale/broker.py
+
+import asyncio
+import threading
+
+
+class PortBroker:
+    """
+    Udostępnia odczyty "na żądanie" z portów otwartych już przez listenery.
+
+    Zamiast otwierać urządzenie przy każdym żądaniu, wywołujący czeka na
+    kolejną linię, którą listener i tak odczyta. Wszyscy równocześnie
+    czekający na tę samą wagę współdzielą jedno oczekiwanie (jeden Future).
+    Listener sprawdza `wants()` przy każdej linii - bez oczekujących to
+    tylko odczyt ze słownika. Gdy wszyscy czekający zrezygnują (timeout),
+    oczekiwanie jest usuwane, żeby listener nie dostarczał linii nikomu.
+    """
+
+    def __init__(self):
+        self._pending: dict[int, asyncio.Future] = {}
+        self._waiters: dict[int, int] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._lock = threading.Lock()
+        self._counters = {"requests": 0, "shared": 0, "delivered": 0, "timeouts": 0}
+
+    def wants(self, scale_id: int) -> bool:
+        return scale_id in self._pending
+
+    async def next_line(self, scale_id: int, timeout: float) -> str | None:
+        """Czeka na kolejną linię z wagi. Zwraca None po upływie `timeout`."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._loop = loop
+            self._counters["requests"] += 1
+            future = self._pending.get(scale_id)
+            if future is None or future.done():
+                future = self._pending[scale_id] = loop.create_future()
+                self._waiters[scale_id] = 0
+            else:
+                self._counters["shared"] += 1
+            self._waiters[scale_id] += 1
+        try:
+            # shield: przekroczenie czasu przez jednego klienta nie anuluje
+            # oczekiwania pozostałych
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self._counters["timeouts"] += 1
+            return None
+        finally:
+            self._leave(scale_id, future)
+
+    def _leave(self, scale_id: int, future: asyncio.Future) -> None:
+        """Ostatni rezygnujący usuwa nierozstrzygnięte oczekiwanie."""
+        with self._lock:
+            if self._pending.get(scale_id) is not future:
+                return
+            self._waiters[scale_id] -= 1
+            if self._waiters[scale_id] == 0:
+                del self._pending[scale_id]
+                del self._waiters[scale_id]
+                future.cancel()
+
+    def offer(self, scale_id: int, line: bytes) -> None:
+        """Przekazuje linię oczekującym. Wołane przez listener (dowolny wątek)."""
+        with self._lock:
+            future = self._pending.pop(scale_id, None)
+            self._waiters.pop(scale_id, None)
+            loop = self._loop
+            if future is None or loop is None:
+                return
+            self._counters["delivered"] += 1
+        text = line.decode(errors="ignore").strip()
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            _resolve(future, text)
+        else:
+            try:
+                loop.call_soon_threadsafe(_resolve, future, text)
+            except RuntimeError:
+                pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            data = dict(self._counters)
+            data["pending"] = len(self._pending)
+        return data
+
+
+def _resolve(future: asyncio.Future, text: str) -> None:
+    if not future.done():
+        future.set_result(text)
+
+
+port_broker = PortBroker()
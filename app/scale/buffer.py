@@ -0,0 +1,80 @@
+# Plik: app/scale/buffer.py
+
+from collections import deque
+from typing import Iterable
+import threading
+
+from ..config import settings
+from .reading import ScaleReading
+
+
+class ReadingBuffer:
+    """
+    Bufor cykliczny ostatnich odczytów trzymany w pamięci procesu,
+    osobno dla każdej wagi.
+
+    Waga jest "rozgrzana" po jednorazowym załadowaniu historii z bazy
+    (`seed`) - samo pojawienie się odczytu z listenera po restarcie nie
+    wystarcza, bo bufor miałby wtedy tylko najnowsze punkty. Dla rozgrzanej
+    wagi zapytania są obsługiwane bez odwołania do bazy.
+    """
+
+    def __init__(self, size: int):
+        self.size = max(1, size)
+        self._buffers: dict[int, deque] = {}
+        self._seeded: set[int] = set()
+        self._lock = threading.Lock()
+
+    def append(self, reading: ScaleReading) -> None:
+        with self._lock:
+            buf = self._buffers.get(reading.scale_id)
+            if buf is None:
+                buf = self._buffers[reading.scale_id] = deque(maxlen=self.size)
+            buf.append(reading)
+
+    def is_warm(self, scale_id: int) -> bool:
+        with self._lock:
+            return scale_id in self._seeded
+
+    def seed(self, scale_id: int, readings: Iterable[ScaleReading]) -> None:
+        """
+        Ładuje historię (od najstarszego) dla wagi, która nie jest jeszcze
+        rozgrzana. Odczyty z listenera zebrane przed `seed` zostają na końcu;
+        z historii brane są tylko starsze od nich (bez zdublowania odczytów
+        już zapisanych w bazie).
+        """
+        with self._lock:
+            if scale_id in self._seeded:
+                return
+            self._seeded.add(scale_id)
+            live = self._buffers.get(scale_id) or ()
+            if live:
+                first = live[0].created_at
+                readings = [r for r in readings if r.created_at < first]
+            self._buffers[scale_id] = deque([*readings, *live], maxlen=self.size)
+
+    def last(self, scale_id: int) -> ScaleReading | None:
+        with self._lock:
+            buf = self._buffers.get(scale_id)
+            return buf[-1] if buf else None
+
+    def recent(self, scale_id: int, n: int) -> list[ScaleReading]:
+        """Zwraca do `n` ostatnich odczytów, od najnowszego."""
+        with self._lock:
+            buf = self._buffers.get(scale_id)
+            if not buf:
+                return []
+            n = min(n, len(buf))
+            return [buf[-i] for i in range(1, n + 1)]
+
+    def clear(self, scale_id: int | None = None) -> None:
+        with self._lock:
+            if scale_id is None:
+                self._buffers.clear()
+                self._seeded.clear()
+            else:
+                self._buffers.pop(scale_id, None)
+                self._seeded.discard(scale_id)
+
+
+latest_readings = ReadingBuffer(settings.SCALE_BUFFER_SIZE)
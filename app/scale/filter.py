@@ -0,0 +1,64 @@
+# Plik: app/scale/filter.py
+
+from collections import deque
+import time
+
+from ..models import ScaleConfig
+
+
+class ReadingFilter:
+    """
+    Filtr odczytów jednej wagi: wykrywanie stabilizacji i martwa strefa.
+
+    - odczyt jest stabilny, gdy ostatnie `stable_window` wartości mieszczą się
+      w zakresie `stable_tolerance`,
+    - zapisywany jest pierwszy odczyt, każdy stabilny odczyt różniący się od
+      ostatnio zapisanego o co najmniej `deadband`, oraz odczyt "heartbeat",
+      gdy od ostatniego zapisu minęło `heartbeat_s` sekund (0 wyłącza).
+    """
+
+    def __init__(
+        self,
+        stable_window: int = 1,
+        stable_tolerance: float = 0.0,
+        deadband: float = 0.0,
+        heartbeat_s: float = 0,
+    ):
+        self._recent: deque = deque(maxlen=max(1, stable_window))
+        self.stable_tolerance = stable_tolerance
+        self.deadband = deadband
+        self.heartbeat_s = heartbeat_s
+        self.stable = False
+        self._saved_weight: float | None = None
+        self._saved_at = 0.0
+
+    @classmethod
+    def from_config(cls, cfg: ScaleConfig) -> "ReadingFilter":
+        return cls(
+            stable_window=cfg.stable_window,
+            stable_tolerance=cfg.stable_tolerance,
+            deadband=cfg.deadband,
+            heartbeat_s=cfg.heartbeat_s,
+        )
+
+    def update(self, weight: float, now: float | None = None) -> bool:
+        """Aktualizuje stan filtra. Zwraca True, jeśli odczyt należy zapisać."""
+        now = time.monotonic() if now is None else now
+        recent = self._recent
+        recent.append(weight)
+        self.stable = (
+            len(recent) == recent.maxlen
+            and max(recent) - min(recent) <= self.stable_tolerance
+        )
+
+        if self._saved_weight is None:
+            persist = True
+        elif self.heartbeat_s and now - self._saved_at >= self.heartbeat_s:
+            persist = True
+        else:
+            persist = self.stable and abs(weight - self._saved_weight) >= self.deadband
+
+        if persist:
+            self._saved_weight = weight
+            self._saved_at = now
+        return persist
@@ -0,0 +1,112 @@
+# Plik: app/scale/history.py
+
+from datetime import datetime
+from typing import Iterable, Iterator
+from sqlmodel import Session, select, func, and_, or_, literal
+import base64
+
+from ..models import ScaleWeight, ScaleWeightRollup
+
+# Punkt historii: (t, min, max, avg, count, id)
+Point = tuple
+
+
+def _columns(resolution: str):
+    """Kolumny punktu historii i kolumny klucza sortowania (t, id)."""
+    if resolution == "raw":
+        m = ScaleWeight
+        cols = (m.created_at, m.weight, m.weight, m.weight, literal(1), m.id)
+        return cols, m.created_at, m.id
+    m = ScaleWeightRollup
+    cols = (
+        m.bucket_start,
+        m.min_weight,
+        m.max_weight,
+        m.sum_weight / m.count,
+        m.count,
+        m.id,
+    )
+    return cols, m.bucket_start, m.id
+
+
+def history_query(
+    scale_id: int,
+    resolution: str,
+    start: datetime,
+    end: datetime,
+    after: tuple[datetime, int] | None = None,
+):
+    """
+    Zapytanie o punkty historii posortowane po (t, id). Warunek `after`
+    realizuje paginację kursorem (keyset) - bez OFFSET, więc kolejne strony
+    kosztują tyle samo niezależnie od głębokości.
+    Korzysta z indeksów (scale_id, created_at) oraz
+    (scale_id, resolution, bucket_start).
+    """
+    cols, t_col, id_col = _columns(resolution)
+    stmt = select(*cols)
+    if resolution == "raw":
+        stmt = stmt.where(ScaleWeight.scale_id == scale_id)
+    else:
+        stmt = stmt.where(
+            ScaleWeightRollup.scale_id == scale_id,
+            ScaleWeightRollup.resolution == resolution,
+        )
+    stmt = stmt.where(t_col >= start, t_col < end)
+    if after is not None:
+        after_t, after_id = after
+        stmt = stmt.where(
+            or_(t_col > after_t, and_(t_col == after_t, id_col > after_id))
+        )
+    return stmt.order_by(t_col, id_col)
+
+
+def count_points(session: Session, scale_id: int, resolution: str, start, end) -> int:
+    stmt = history_query(scale_id, resolution, start, end).subquery()
+    return session.exec(select(func.count()).select_from(stmt)).one()
+
+
+def encode_cursor(point: Point) -> str:
+    raw = f"{point[0].isoformat()}|{point[5]}".encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Dekoduje kursor; rzuca ValueError przy niepoprawnej wartości."""
+    try:
+        t, point_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(t), int(point_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def decimate(points: Iterable[Point], total: int, max_points: int) -> Iterator[Point]:
+    """
+    Zmniejsza liczbę punktów do co najwyżej `max_points`, zachowując ekstrema:
+    punkty są dzielone na `max_points // 2` kolejnych przedziałów, a z każdego
+    zostaje punkt z najmniejszym minimum i punkt z największym maksimum
+    (w kolejności czasowej). Przetwarza strumień, pamięć O(max_points).
+    """
+    if total <= max_points:
+        yield from points
+        return
+
+    buckets = max(1, max_points // 2)
+    size = -(-total // buckets)  # zaokrąglenie w górę
+    lo = hi = None
+    for i, point in enumerate(points):
+        if lo is None or point[1] < lo[1]:
+            lo = point
+        if hi is None or point[2] > hi[2]:
+            hi = point
+        if (i + 1) % size == 0:
+            yield from _ordered(lo, hi)
+            lo = hi = None
+    if lo is not None:
+        yield from _ordered(lo, hi)
+
+
+def _ordered(lo: Point, hi: Point) -> tuple:
+    if lo is hi:
+        return (lo,)
+    return (lo, hi) if (lo[0], lo[5]) <= (hi[0], hi[5]) else (hi, lo)
@@ -0,0 +1,120 @@
+# Plik: app/scale/hub.py
+
+import asyncio
+import json
+import threading
+
+from ..config import settings
+from .reading import ScaleReading
+
+
+def reading_message(reading: ScaleReading) -> str:
+    """Serializuje odczyt do wiadomości JSON wysyłanej subskrybentom."""
+    return json.dumps(
+        {
+            "scale_id": reading.scale_id,
+            "weight": reading.weight,
+            "stable": reading.stable,
+            "created_at": reading.created_at.isoformat(),
+        }
+    )
+
+
+class Subscription:
+    """Subskrypcja strumienia odczytów jednej wagi (lub wszystkich, gdy scale_id=None)."""
+
+    def __init__(self, scale_id: int | None, queue_size: int):
+        self.scale_id = scale_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, queue_size))
+        self.coalesced = 0
+
+    def offer(self, message: str) -> bool:
+        """
+        Dodaje wiadomość bez blokowania. Jeśli klient nie nadąża, najstarsza
+        zaległa wiadomość jest porzucana - klient zawsze dostaje najnowszą wartość.
+        Zwraca True, gdy doszło do scalenia.
+        """
+        coalesced = False
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.coalesced += 1
+            coalesced = True
+        self.queue.put_nowait(message)
+        return coalesced
+
+    async def get(self) -> str:
+        return await self.queue.get()
+
+
+def _running_loop() -> asyncio.AbstractEventLoop | None:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+class ReadingHub:
+    """
+    Rozsyła odczyty z listenerów do wszystkich subskrybentów strumienia.
+
+    `publish` może być wołane z dowolnego wątku; samo rozgłaszanie odbywa się
+    w pętli zdarzeń aplikacji, a każdy odczyt jest serializowany tylko raz.
+    """
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self._subscribers: set[Subscription] = set()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._lock = threading.Lock()
+        self._counters = {"published": 0, "delivered": 0, "coalesced": 0}
+
+    def subscribe(self, scale_id: int | None = None) -> Subscription:
+        """Rejestruje subskrybenta. Musi być wołane z pętli zdarzeń."""
+        self._loop = asyncio.get_running_loop()
+        sub = Subscription(scale_id, self.queue_size)
+        with self._lock:
+            self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def publish(self, reading: ScaleReading) -> None:
+        with self._lock:
+            if not self._subscribers or self._loop is None:
+                return
+            loop = self._loop
+        if _running_loop() is loop:
+            # Wywołanie z wątku pętli (silnik asyncio) - bez przeskoku
+            self._fanout(reading)
+            return
+        try:
+            loop.call_soon_threadsafe(self._fanout, reading)
+        except RuntimeError:
+            # Pętla została zamknięta (np. przy wyłączaniu aplikacji)
+            pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            data = dict(self._counters)
+            data["subscribers"] = len(self._subscribers)
+        return data
+
+    def _fanout(self, reading: ScaleReading) -> None:
+        message = reading_message(reading)
+        with self._lock:
+            subscribers = list(self._subscribers)
+        delivered = coalesced = 0
+        for sub in subscribers:
+            if sub.scale_id is not None and sub.scale_id != reading.scale_id:
+                continue
+            coalesced += sub.offer(message)
+            delivered += 1
+        with self._lock:
+            self._counters["published"] += 1
+            self._counters["delivered"] += delivered
+            self._counters["coalesced"] += coalesced
+
+
+reading_hub = ReadingHub(settings.SCALE_STREAM_QUEUE_SIZE)
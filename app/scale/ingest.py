@@ -0,0 +1,160 @@
+# Plik: app/scale/ingest.py
+
+from sqlmodel import Session
+import threading
+import queue
+import time
+import logging
+
+from ..config import settings
+from ..db import engine
+from ..models import ScaleWeight
+
+
+class ScaleWriteQueue:
+    """
+    Kolejka write-behind dla odczytów wagi.
+
+    Wątki nasłuchujące wrzucają gotowe wiersze `ScaleWeight` do ograniczonej
+    kolejki, a osobny wątek zapisuje je do bazy jedną transakcją na paczkę
+    (co `batch_size` odczytów lub co `flush_interval_ms`, co nastąpi pierwsze).
+    Gdy kolejka jest pełna, producent czeka maksymalnie `put_timeout_ms`,
+    a potem odczyt jest odrzucany i liczony jako `dropped`.
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        batch_size: int,
+        flush_interval_ms: int,
+        put_timeout_ms: int,
+    ):
+        self._queue: queue.Queue = queue.Queue(maxsize=max_size)
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.put_timeout = put_timeout_ms / 1000.0
+        self._stop_event = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self._counters = {
+            "queued": 0,
+            "flushed": 0,
+            "dropped": 0,
+            "failed": 0,
+            "batches": 0,
+        }
+
+    # --- Strona producenta ---
+
+    def put(self, reading: ScaleWeight, wait: bool = True) -> bool:
+        """
+        Dodaje odczyt do kolejki. Zwraca False, jeśli odczyt został odrzucony.
+        Z `wait=False` pełna kolejka odrzuca odczyt od razu (np. w pętli zdarzeń).
+        """
+        try:
+            self._queue.put(reading, block=wait, timeout=self.put_timeout)
+        except queue.Full:
+            self._count("dropped")
+            return False
+        self._count("queued")
+        return True
+
+    # --- Cykl życia wątku zapisującego ---
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="scale-write-queue", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Zatrzymuje wątek zapisujący i zapisuje wszystko, co zostało w kolejce."""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+            if self._thread.is_alive():
+                logging.warning("Scale write queue did not terminate gracefully.")
+                return
+            self._thread = None
+        self.flush_pending()
+
+    def flush_pending(self) -> None:
+        """Synchronicznie zapisuje wszystkie oczekujące odczyty."""
+        while True:
+            batch = self._drain(self.batch_size)
+            if not batch:
+                return
+            self._flush(batch)
+
+    def stats(self) -> dict:
+        with self._lock:
+            data = dict(self._counters)
+        data["pending"] = self._queue.qsize()
+        data["capacity"] = self._queue.maxsize
+        return data
+
+    # --- Logika wewnętrzna ---
+
+    def _count(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self._counters[name] += value
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            batch = self._collect()
+            if batch:
+                self._flush(batch)
+        # Dokończenie zapisu po sygnale zatrzymania
+        self.flush_pending()
+
+    def _collect(self) -> list:
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self._stop_event.is_set():
+                batch.extend(self._drain(self.batch_size - len(batch)))
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _drain(self, limit: int) -> list:
+        items = []
+        while len(items) < limit:
+            try:
+                items.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def _flush(self, batch: list) -> None:
+        try:
+            # expire_on_commit=False: obiekty pozostają czytelne po zamknięciu sesji
+            with Session(engine, expire_on_commit=False) as session:
+                session.add_all(batch)
+                session.commit()
+        except Exception as e:
+            self._count("failed", len(batch))
+            logging.error(f"Failed to flush {len(batch)} scale readings: {e}")
+            return
+        self._count("flushed", len(batch))
+        self._count("batches")
+        logging.debug(f"Flushed {len(batch)} scale readings")
+
+
+write_queue = ScaleWriteQueue(
+    max_size=settings.SCALE_QUEUE_MAX_SIZE,
+    batch_size=settings.SCALE_QUEUE_BATCH_SIZE,
+    flush_interval_ms=settings.SCALE_QUEUE_FLUSH_INTERVAL_MS,
+    put_timeout_ms=settings.SCALE_QUEUE_PUT_TIMEOUT_MS,
+)
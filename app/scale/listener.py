@@ -0,0 +1,365 @@
+# Plik: app/scale/listener.py
+
+from datetime import datetime
+import asyncio
+import threading
+import serial
+import os
+import logging
+
+from ..models import ScaleConfig
+from .broker import port_broker
+from .pipeline import record_reading, configure_scale
+from .protocols import LineFramer, ProtocolParser, get_parser
+
+RECONNECT_DELAY_S = 5
+
+
+def open_serial(scale_config: ScaleConfig, timeout: float | None) -> serial.Serial:
+    """
+    Otwiera port szeregowy wagi zgodnie z jej konfiguracją. Stałe pyserial
+    to same wartości (PARITY_EVEN == "E", STOPBITS_TWO == 2, EIGHTBITS == 8),
+    więc konfiguracja trafia do portu wprost; niepoprawna wartość kończy się
+    ValueError, a listener przechodzi w backoff z opisem błędu.
+    """
+    return serial.Serial(
+        port=scale_config.port,
+        baudrate=scale_config.baudrate,
+        parity=scale_config.parity.upper(),
+        stopbits=scale_config.stop_bits,
+        bytesize=scale_config.data_bits,
+        timeout=timeout,
+    )
+
+
+def handle_data(
+    scale_id: int,
+    framer: LineFramer,
+    parser: ProtocolParser,
+    data: bytes,
+    wait: bool = True,
+) -> None:
+    """Dzieli porcję danych z portu na linie i przekazuje sparsowane odczyty dalej."""
+    buf = framer.buffer
+    for start, end in framer.feed(data):
+        if port_broker.wants(scale_id):
+            port_broker.offer(scale_id, bytes(buf[start:end]))
+        weight = parser.parse(buf, start, end)
+        if weight is not None:
+            record_reading(scale_id, weight, wait=wait)
+
+
+class ListenerStatus:
+    """
+    Stan pojedynczego listenera: connecting, connected, backoff, stopping
+    (zatrzymany, ale wątek jeszcze nie zwolnił portu), stopped.
+    """
+
+    def __init__(self, cfg: ScaleConfig):
+        self.scale_id = cfg.id
+        self.port = cfg.port
+        self.state = "connecting"
+        self.since = datetime.now()
+        self.last_error: str | None = None
+
+    def set(self, state: str, error: str | None = None) -> None:
+        self.state = state
+        self.since = datetime.now()
+        if error is not None:
+            self.last_error = error
+
+    def as_dict(self) -> dict:
+        return {
+            "scale_id": self.scale_id,
+            "port": self.port,
+            "state": self.state,
+            "since": self.since,
+            "last_error": self.last_error,
+        }
+
+
+# --- Silnik wątkowy: jeden wątek na wagę ---
+
+
+def scale_listener(
+    scale_config: ScaleConfig,
+    stop_event: threading.Event,
+    status: ListenerStatus | None = None,
+    port: dict | None = None,
+    previous: list[threading.Thread] = (),
+):
+    """
+    Funkcja działająca w osobnym wątku, nasłuchująca na porcie szeregowym
+    i zapisująca odczyty wagi do bazy danych. Otwarty port jest dostępny
+    w `port["serial"]`, żeby zatrzymujący mógł przerwać blokujący odczyt.
+    Port jest otwierany dopiero, gdy zakończą się wątki `previous` -
+    poprzednie listenery tego portu - żeby urządzenia nie czytały dwa wątki.
+    """
+    status = status or ListenerStatus(scale_config)
+    port = port if port is not None else {}
+    for thread in previous:
+        while thread.is_alive() and not stop_event.is_set():
+            thread.join(timeout=0.5)
+    configure_scale(scale_config)
+    parser = get_parser(scale_config.protocol)
+    while not stop_event.is_set():
+        ser = None
+        try:
+            status.set("connecting")
+            logging.info(
+                f"Attempting to connect to scale {scale_config.id} on {scale_config.port}..."
+            )
+            ser = port["serial"] = open_serial(
+                scale_config, timeout=scale_config.timeout / 1000.0
+            )
+            status.set("connected")
+            logging.info(
+                f"Successfully connected to scale {scale_config.id} on {scale_config.port}"
+            )
+
+            framer = LineFramer()
+            while not stop_event.is_set():
+                data = ser.read(ser.in_waiting or 1)
+                if data:
+                    handle_data(scale_config.id, framer, parser, data)
+
+        except serial.SerialException as e:
+            status.set("backoff", str(e))
+            logging.error(
+                f"Serial error with scale {scale_config.id} on {scale_config.port}: {e}"
+            )
+            stop_event.wait(RECONNECT_DELAY_S)  # Czekaj 5s lub do sygnału zatrzymania
+        except Exception as e:
+            status.set("backoff", str(e))
+            logging.error(
+                f"An unexpected error occurred with scale listener {scale_config.id}: {e}"
+            )
+            stop_event.wait(RECONNECT_DELAY_S)  # Czekaj 5s lub do sygnału zatrzymania
+        finally:
+            port["serial"] = None
+            if ser is not None:
+                ser.close()
+    status.set("stopped")
+
+
+class ThreadListenerEngine:
+    """Uruchamia osobny wątek `scale_listener` dla każdej wagi."""
+
+    name = "thread"
+
+    def __init__(self):
+        self._listeners: dict[int, dict] = {}
+        # Zatrzymane listenery, których wątek jeszcze nie zwolnił portu
+        self._stopping: list[dict] = []
+        self._lock = threading.Lock()
+
+    def start(self, configs: list[ScaleConfig]) -> None:
+        for cfg in configs:
+            self.add(cfg)
+
+    def add(self, cfg: ScaleConfig) -> None:
+        stop_event = threading.Event()
+        status = ListenerStatus(cfg)
+        port = {"serial": None}
+        with self._lock:
+            previous = [
+                item["thread"]
+                for item in self._stopping
+                if item["status"].port == cfg.port
+            ]
+        thread = threading.Thread(
+            target=scale_listener,
+            args=(cfg, stop_event, status, port, previous),
+            name=f"scale-listener-{cfg.id}",
+            daemon=True,
+        )
+        with self._lock:
+            self._listeners[cfg.id] = {
+                "thread": thread,
+                "stop_event": stop_event,
+                "status": status,
+                "port": port,
+            }
+        thread.start()
+        logging.info(f"Started listener thread for scale {cfg.id} on port {cfg.port}")
+
+    def remove(self, scale_id: int, timeout: float = 2) -> None:
+        """
+        Zatrzymuje listener: przerywa blokujący odczyt i czeka na wątek do
+        `timeout`. Wątek, który nie zdążył (odczyt zawieszony w sterowniku),
+        jest raportowany jako "stopping" - nowy listener tego portu otworzy
+        go dopiero po jego zakończeniu, a wywołujący nie jest blokowany.
+        """
+        with self._lock:
+            item = self._listeners.pop(scale_id, None)
+        if not item:
+            return
+        item["stop_event"].set()
+        ser = item["port"]["serial"]
+        if ser is not None:
+            # Przerywa odczyt czekający na dane z wagi
+            ser.cancel_read()
+        item["thread"].join(timeout=timeout)
+        if item["thread"].is_alive():
+            logging.warning(
+                f"Thread for scale {scale_id} did not terminate gracefully, "
+                "the port stays busy until it exits."
+            )
+            item["status"].set("stopping")
+            with self._lock:
+                self._stopping.append(item)
+
+    def stop(self) -> None:
+        with self._lock:
+            scale_ids = list(self._listeners)
+            for item in self._listeners.values():
+                item["stop_event"].set()
+        for scale_id in scale_ids:
+            # Daj wątkowi 2 sekundy na zakończenie
+            self.remove(scale_id)
+
+    def status(self) -> list[dict]:
+        with self._lock:
+            self._stopping = [i for i in self._stopping if i["thread"].is_alive()]
+            items = [*self._stopping, *self._listeners.values()]
+            return [item["status"].as_dict() for item in items]
+
+
+# --- Silnik asyncio: wszystkie porty w jednej pętli zdarzeń ---
+
+
+class _AsyncPort:
+    def __init__(self, cfg: ScaleConfig):
+        self.cfg = cfg
+        self.ser: serial.Serial | None = None
+        self.framer = LineFramer()
+        self.parser = get_parser(cfg.protocol)
+        self.status = ListenerStatus(cfg)
+        self.retry_at = 0.0
+
+
+class AsyncListenerEngine:
+    """
+    Czyta wszystkie porty wag z jednej pętli zdarzeń, bez wątków.
+
+    Porty są otwierane w trybie nieblokującym, a ich deskryptory rejestrowane
+    przez `loop.add_reader` - proces nie zużywa CPU, dopóki waga nic nie
+    wysyła. Jedno zadanie asyncio pilnuje ponownych połączeń po błędach.
+    Odczyty trafiają do bufora i strumienia bezpośrednio w wątku pętli.
+    `add` i `remove` można wołać z dowolnego wątku.
+    """
+
+    name = "asyncio"
+
+    def __init__(self):
+        self._ports: dict[int, _AsyncPort] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._task: asyncio.Task | None = None
+        self._wakeup = asyncio.Event()
+
+    def start(self, configs: list[ScaleConfig]) -> None:
+        self._loop = asyncio.get_running_loop()
+        for cfg in configs:
+            self._add(cfg)
+        self._task = asyncio.create_task(self._supervise())
+
+    def add(self, cfg: ScaleConfig) -> None:
+        self._in_loop(self._add, cfg)
+
+    def remove(self, scale_id: int) -> None:
+        self._in_loop(self._remove, scale_id)
+
+    def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        for scale_id in list(self._ports):
+            self._remove(scale_id)
+
+    def status(self) -> list[dict]:
+        return [port.status.as_dict() for port in list(self._ports.values())]
+
+    def _in_loop(self, fn, *args) -> None:
+        """Wykonuje operację na portach w wątku pętli zdarzeń."""
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            fn(*args)
+        else:
+            self._loop.call_soon_threadsafe(fn, *args)
+
+    def _add(self, cfg: ScaleConfig) -> None:
+        configure_scale(cfg)
+        self._ports[cfg.id] = _AsyncPort(cfg)
+        self._wakeup.set()
+        logging.info(f"Registered scale {cfg.id} on port {cfg.port} (asyncio engine)")
+
+    def _remove(self, scale_id: int) -> None:
+        port = self._ports.pop(scale_id, None)
+        if port:
+            self._close(port)
+            port.status.set("stopped")
+
+    async def _supervise(self) -> None:
+        """Otwiera porty, które nie są połączone, z opóźnieniem po błędzie."""
+        while True:
+            now = self._loop.time()
+            for port in list(self._ports.values()):
+                if port.ser is None and now >= port.retry_at:
+                    self._open(port)
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=1)
+            except asyncio.TimeoutError:
+                pass
+
+    def _open(self, port: _AsyncPort) -> None:
+        cfg = port.cfg
+        try:
+            port.status.set("connecting")
+            logging.info(f"Attempting to connect to scale {cfg.id} on {cfg.port}...")
+            # timeout=0: odczyt nieblokujący
+            port.ser = open_serial(cfg, timeout=0)
+            self._loop.add_reader(port.ser.fileno(), self._on_readable, port)
+            port.status.set("connected")
+            logging.info(f"Successfully connected to scale {cfg.id} on {cfg.port}")
+        except (serial.SerialException, OSError, ValueError) as e:
+            logging.error(f"Serial error with scale {cfg.id} on {cfg.port}: {e}")
+            self._close(port, error=str(e))
+
+    def _on_readable(self, port: _AsyncPort) -> None:
+        try:
+            data = os.read(port.ser.fileno(), 4096)
+            if not data:
+                raise OSError("device disconnected")
+        except OSError as e:
+            logging.error(
+                f"Serial error with scale {port.cfg.id} on {port.cfg.port}: {e}"
+            )
+            self._close(port, error=str(e))
+            return
+
+        # Bez czekania na miejsce w kolejce - nie blokujemy pętli zdarzeń
+        handle_data(port.cfg.id, port.framer, port.parser, data, wait=False)
+
+    def _close(self, port: _AsyncPort, error: str | None = None) -> None:
+        if port.ser is not None:
+            try:
+                self._loop.remove_reader(port.ser.fileno())
+            except (ValueError, OSError):
+                pass
+            port.ser.close()
+            port.ser = None
+        port.framer.reset()
+        if error is not None:
+            port.status.set("backoff", error)
+            port.retry_at = self._loop.time() + RECONNECT_DELAY_S
+
+
+def create_listener_engine(name: str):
+    """Zwraca silnik listenerów wybrany ustawieniem SCALE_LISTENER_ENGINE."""
+    if name == "asyncio":
+        return AsyncListenerEngine()
+    return ThreadListenerEngine()
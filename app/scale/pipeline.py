@@ -0,0 +1,58 @@
+# Plik: app/scale/pipeline.py
+
+import threading
+import logging
+
+from ..models import ScaleConfig, ScaleWeight
+from .buffer import latest_readings
+from .filter import ReadingFilter
+from .hub import reading_hub
+from .ingest import write_queue
+from .reading import ScaleReading
+
+# Filtry odczytów per waga; waga bez konfiguracji dostaje filtr domyślny,
+# który zapisuje każdy odczyt
+_filters: dict[int, ReadingFilter] = {}
+_filters_lock = threading.Lock()
+
+
+def configure_scale(cfg: ScaleConfig) -> None:
+    """(Re)konfiguruje filtr odczytów dla wagi na podstawie jej ScaleConfig."""
+    with _filters_lock:
+        _filters[cfg.id] = ReadingFilter.from_config(cfg)
+
+
+def forget_scale(scale_id: int) -> None:
+    """Usuwa stan filtra wagi (np. po usunięciu jej konfiguracji)."""
+    with _filters_lock:
+        _filters.pop(scale_id, None)
+
+
+def record_reading(scale_id: int, weight: float, wait: bool = True) -> ScaleReading:
+    """
+    Punkt wejścia dla każdego sparsowanego odczytu wagi.
+    Odczyt trafia do bufora w pamięci i do subskrybentów strumienia;
+    do kolejki zapisu trafiają tylko odczyty przepuszczone przez filtr.
+    """
+    reading_filter = _filters.get(scale_id)
+    if reading_filter is None:
+        with _filters_lock:
+            reading_filter = _filters.setdefault(scale_id, ReadingFilter())
+
+    persist = reading_filter.update(weight)
+    reading = ScaleReading(
+        scale_id=scale_id, weight=weight, stable=reading_filter.stable
+    )
+
+    if persist:
+        reading.row = ScaleWeight(
+            scale_id=scale_id, weight=weight, created_at=reading.created_at
+        )
+        if not write_queue.put(reading.row, wait=wait):
+            logging.warning(
+                f"Write queue full, dropped weight {weight}g for scale {scale_id}"
+            )
+
+    latest_readings.append(reading)
+    reading_hub.publish(reading)
+    return reading
@@ -0,0 +1,118 @@
+# Plik: app/scale/protocols.py
+
+import re
+
+# Mnożniki do przeliczenia jednostek na gramy
+UNIT_TO_GRAMS = {
+    b"g": 1.0,
+    b"kg": 1000.0,
+    b"lb": 453.59237,
+    b"oz": 28.349523125,
+}
+
+
+_NO_SPANS: list = []
+
+
+class LineFramer:
+    """
+    Dzieli strumień bajtów z portu na linie zakończone `\\n`.
+
+    Dane są dopisywane do jednego, wielokrotnie używanego `bytearray`.
+    Każdy bajt jest przeszukiwany tylko raz - niedokończona linia nie jest
+    skanowana ponownie po dojściu kolejnej porcji danych. `feed` zwraca
+    zakresy (start, end) linii w `buffer`, ważne do następnego wywołania,
+    więc parsery czytają dane bez kopiowania.
+    """
+
+    def __init__(self, max_line: int = 1024):
+        self.buffer = bytearray()
+        self.max_line = max_line
+        self.overflows = 0
+        self._consumed = 0
+
+    def feed(self, data: bytes) -> list[tuple[int, int]]:
+        buf = self.buffer
+        if self._consumed:
+            # Usuwamy linie oddane w poprzednim wywołaniu
+            del buf[: self._consumed]
+            self._consumed = 0
+        buf += data
+
+        # Wcześniejsze dane nie zawierają już końca linii - szukamy tylko w nowych
+        pos = buf.find(b"\n", len(buf) - len(data))
+        if pos == -1:
+            if len(buf) > self.max_line:
+                # Śmieci bez znaku końca linii - porzucamy, żeby bufor nie rósł
+                self.overflows += 1
+                self._consumed = len(buf)
+            return _NO_SPANS
+
+        spans = []
+        start = 0
+        while pos != -1:
+            spans.append((start, pos))
+            start = pos + 1
+            pos = buf.find(b"\n", start)
+        self._consumed = start
+        if len(buf) - start > self.max_line:
+            self.overflows += 1
+            self._consumed = len(buf)
+        return spans
+
+    def reset(self) -> None:
+        self.buffer.clear()
+        self._consumed = 0
+
+
+class ProtocolParser:
+    """
+    Parser linii jednego protokołu wagi oparty o prekompilowane wyrażenie.
+    Grupa `value` to liczba, opcjonalna grupa `unit` to jednostka
+    (bez niej przyjmowana jest `default_unit`). Wynik zawsze w gramach.
+    """
+
+    def __init__(self, name: str, pattern: bytes, default_unit: bytes = b"g"):
+        self.name = name
+        self.regex = re.compile(pattern)
+        self.has_unit = "unit" in self.regex.groupindex
+        self.default_factor = UNIT_TO_GRAMS[default_unit]
+
+    def parse(self, buf, start: int = 0, end: int | None = None) -> float | None:
+        """Zwraca wagę w gramach albo None, jeśli linia nie jest odczytem."""
+        match = self.regex.search(buf, start, len(buf) if end is None else end)
+        if match is None:
+            return None
+        try:
+            value = float(match.group("value"))
+        except ValueError:
+            return None
+        if self.has_unit:
+            return value * UNIT_TO_GRAMS[match.group("unit").lower()]
+        return value * self.default_factor
+
+
+PARSERS: dict[str, ProtocolParser] = {
+    parser.name: parser
+    for parser in (
+        # Domyślny format dotychczasowych wag: "Net   123.4 g"
+        ProtocolParser("net_g", rb"Net\s+(?P<value>[\d.]+)\s+g"),
+        # Mettler Toledo MT-SICS: "S S      100.00 g" (stabilny) / "S D ..." (dynamiczny)
+        ProtocolParser(
+            "mt_sics",
+            rb"S\s+[SD]\s+(?P<value>[-+]?[\d.]+)\s+(?P<unit>(?i:kg|g|lb|oz))",
+        ),
+        # Ogólny: pierwsza liczba z jednostką w linii
+        ProtocolParser(
+            "generic",
+            rb"(?P<value>[-+]?\d+(?:\.\d+)?)\s*(?P<unit>(?i:kg|g|lb|oz))\b",
+        ),
+    )
+}
+
+FALLBACK_PROTOCOL = "generic"
+
+
+def get_parser(name: str | None) -> ProtocolParser:
+    """Zwraca parser protokołu; nieznana nazwa oznacza parser ogólny."""
+    return PARSERS.get(name or "", PARSERS[FALLBACK_PROTOCOL])
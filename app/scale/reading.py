@@ -0,0 +1,28 @@
+# Plik: app/scale/reading.py
+
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from ..models import ScaleWeight
+
+
+@dataclass(slots=True)
+class ScaleReading:
+    """Pojedynczy odczyt wagi trzymany w pamięci (bufor, strumień)."""
+
+    scale_id: int
+    weight: float
+    stable: bool = False
+    created_at: datetime = field(default_factory=datetime.now)
+    # Wiersz w bazie, jeśli odczyt został utrwalony (id nadaje kolejka zapisu)
+    row: ScaleWeight | None = None
+
+    @property
+    def id(self) -> int | None:
+        return self.row.id if self.row is not None else None
+
+    @classmethod
+    def from_row(cls, row: ScaleWeight) -> "ScaleReading":
+        return cls(
+            scale_id=row.scale_id, weight=row.weight, created_at=row.created_at, row=row
+        )
@@ -0,0 +1,181 @@
+# Plik: app/scale/rollup.py
+
+from datetime import datetime, timedelta
+from sqlmodel import Session, select, func
+import threading
+import time
+
+from ..config import settings
+from ..db import engine, delete_in_batches
+from ..models import ScaleWeight, ScaleWeightRollup, ScaleRollupState
+
+RESOLUTIONS = ("minute", "hour")
+
+
+def bucket_start(ts: datetime, resolution: str) -> datetime:
+    """Zwraca początek przedziału czasu, do którego należy znacznik `ts`."""
+    if resolution == "minute":
+        return ts.replace(second=0, microsecond=0)
+    if resolution == "hour":
+        return ts.replace(minute=0, second=0, microsecond=0)
+    raise ValueError(f"Unknown resolution: {resolution}")
+
+
+class ScaleRollup:
+    """
+    Przyrostowa agregacja `scale_weights` do tabeli `scale_weight_rollups`
+    oraz usuwanie danych starszych niż skonfigurowana retencja.
+
+    Postęp agregacji jest zapisywany per rozdzielczość jako ostatnie
+    przetworzone id odczytu, więc każdy odczyt jest liczony dokładnie raz.
+    Surowe odczyty są usuwane dopiero po zagregowaniu we wszystkich
+    rozdzielczościach. Każda paczka to osobna, krótka transakcja.
+    """
+
+    def __init__(self, batch_size: int):
+        self.batch_size = max(1, batch_size)
+        self._lock = threading.Lock()
+        self._stats = {
+            "runs": 0,
+            "aggregated": 0,
+            "purged_raw": 0,
+            "purged_rollups": 0,
+            "last_run_ms": None,
+            "last_run_at": None,
+        }
+
+    def run_once(self) -> dict:
+        """Wykonuje pełny cykl: agregacja, potem retencja. Zwraca wynik cyklu."""
+        started = time.perf_counter()
+        result = {"aggregated": 0, "purged_raw": 0, "purged_rollups": 0}
+        for resolution in RESOLUTIONS:
+            result["aggregated"] += self._aggregate(resolution)
+        result["purged_raw"] = self._purge_raw()
+        result["purged_rollups"] = self._purge_rollups()
+
+        with self._lock:
+            self._stats["runs"] += 1
+            for key, value in result.items():
+                self._stats[key] += value
+            self._stats["last_run_ms"] = round(
+                (time.perf_counter() - started) * 1000, 1
+            )
+            self._stats["last_run_at"] = datetime.now().isoformat()
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
+
+    # --- Agregacja ---
+
+    def _aggregate(self, resolution: str) -> int:
+        total = 0
+        while True:
+            count = self._aggregate_batch(resolution)
+            total += count
+            if count < self.batch_size:
+                return total
+
+    def _aggregate_batch(self, resolution: str) -> int:
+        with Session(engine) as session:
+            state = session.get(ScaleRollupState, resolution) or ScaleRollupState(
+                resolution=resolution
+            )
+            rows = session.exec(
+                select(ScaleWeight.id, ScaleWeight.scale_id, ScaleWeight.weight, ScaleWeight.created_at)  # type: ignore
+                .where(ScaleWeight.id > state.last_weight_id)
+                .order_by(ScaleWeight.id)
+                .limit(self.batch_size)
+            ).all()
+            if not rows:
+                return 0
+
+            # (scale_id, bucket_start) -> [min, max, sum, count]
+            buckets: dict[tuple, list] = {}
+            for _, scale_id, weight, created_at in rows:
+                key = (scale_id, bucket_start(created_at, resolution))
+                agg = buckets.get(key)
+                if agg is None:
+                    buckets[key] = [weight, weight, weight, 1]
+                else:
+                    agg[0] = min(agg[0], weight)
+                    agg[1] = max(agg[1], weight)
+                    agg[2] += weight
+                    agg[3] += 1
+
+            starts = [key[1] for key in buckets]
+            existing = {
+                (r.scale_id, r.bucket_start): r
+                for r in session.exec(
+                    select(ScaleWeightRollup)
+                    .where(ScaleWeightRollup.resolution == resolution)
+                    .where(ScaleWeightRollup.scale_id.in_({k[0] for k in buckets}))  # type: ignore
+                    .where(ScaleWeightRollup.bucket_start >= min(starts))
+                    .where(ScaleWeightRollup.bucket_start <= max(starts))
+                )
+            }
+            for (scale_id, start), (lo, hi, total, count) in buckets.items():
+                rollup = existing.get((scale_id, start))
+                if rollup is None:
+                    rollup = ScaleWeightRollup(
+                        scale_id=scale_id,
+                        resolution=resolution,
+                        bucket_start=start,
+                        min_weight=lo,
+                        max_weight=hi,
+                        sum_weight=total,
+                        count=count,
+                    )
+                else:
+                    rollup.min_weight = min(rollup.min_weight, lo)
+                    rollup.max_weight = max(rollup.max_weight, hi)
+                    rollup.sum_weight += total
+                    rollup.count += count
+                session.add(rollup)
+
+            state.last_weight_id = rows[-1][0]
+            session.add(state)
+            session.commit()
+            return len(rows)
+
+    # --- Retencja ---
+
+    def _purge_raw(self) -> int:
+        cutoff = datetime.now() - timedelta(days=settings.SCALE_RAW_RETENTION_DAYS)
+        with Session(engine) as session:
+            states = session.exec(select(ScaleRollupState)).all()
+            max_id = session.exec(select(func.max(ScaleWeight.id))).one()
+        if max_id is None:
+            return 0
+        watermarks = {s.resolution: s.last_weight_id for s in states}
+        # Usuwamy tylko odczyty zagregowane we wszystkich rozdzielczościach.
+        # Najnowszy wiersz zostaje zawsze - SQLite bez AUTOINCREMENT nadaje
+        # id = max(id) + 1, więc jego usunięcie cofnęłoby numerację poniżej
+        # znacznika postępu i nowe odczyty nie zostałyby zagregowane.
+        safe_id = min(min(watermarks.get(r, 0) for r in RESOLUTIONS), max_id - 1)
+        return delete_in_batches(
+            ScaleWeight,
+            ScaleWeight.created_at < cutoff,
+            ScaleWeight.id <= safe_id,
+            batch_size=self.batch_size,
+        )
+
+    def _purge_rollups(self) -> int:
+        purged = 0
+        now = datetime.now()
+        retention = {
+            "minute": settings.SCALE_MINUTE_ROLLUP_RETENTION_DAYS,
+            "hour": settings.SCALE_HOUR_ROLLUP_RETENTION_DAYS,
+        }
+        for resolution, days in retention.items():
+            purged += delete_in_batches(
+                ScaleWeightRollup,
+                ScaleWeightRollup.resolution == resolution,
+                ScaleWeightRollup.bucket_start < now - timedelta(days=days),
+                batch_size=self.batch_size,
+            )
+        return purged
+
+
+scale_rollup = ScaleRollup(settings.SCALE_ROLLUP_BATCH_SIZE)
@@ -0,0 +1,102 @@
+# Plik: app/scale/supervisor.py
+
+import threading
+import logging
+
+from ..models import ScaleConfig
+from .listener import create_listener_engine
+from .pipeline import configure_scale, forget_scale
+
+# Pola konfiguracji, których zmiana wymaga ponownego otwarcia portu
+SERIAL_FIELDS = (
+    "port",
+    "baudrate",
+    "parity",
+    "data_bits",
+    "stop_bits",
+    "timeout",
+    "protocol",
+)
+
+
+class ListenerSupervisor:
+    """
+    Zarządza listenerami wag w trakcie działania aplikacji.
+
+    Reaguje na utworzenie, zmianę i usunięcie ScaleConfig: zatrzymuje
+    i uruchamia ponownie tylko listener, którego dotyczy zmiana - pozostałe
+    wagi nadają bez przerwy. Zmiana samych parametrów filtra nie zamyka portu.
+    """
+
+    def __init__(self):
+        self.engine = None
+        self._configs: dict[int, ScaleConfig] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self.engine is not None
+
+    def start(self, engine_name: str, configs: list[ScaleConfig]) -> None:
+        self.engine = create_listener_engine(engine_name)
+        with self._lock:
+            self._configs = {cfg.id: _detached(cfg) for cfg in configs}
+            self.engine.start(list(self._configs.values()))
+
+    def stop(self) -> None:
+        if self.engine is None:
+            return
+        self.engine.stop()
+        self.engine = None
+        self._configs.clear()
+
+    def apply(self, cfg: ScaleConfig) -> None:
+        """Uruchamia listener nowej wagi albo przeładowuje zmienioną."""
+        if self.engine is None:
+            return
+        cfg = _detached(cfg)
+        with self._lock:
+            current = self._configs.get(cfg.id)
+            self._configs[cfg.id] = cfg
+            if current is not None and all(
+                getattr(current, f) == getattr(cfg, f) for f in SERIAL_FIELDS
+            ):
+                configure_scale(cfg)
+                logging.info(f"Reconfigured reading filter for scale {cfg.id}")
+                return
+            if current is not None:
+                self.engine.remove(cfg.id)
+            self.engine.add(cfg)
+        logging.info(f"Reloaded listener for scale {cfg.id} on port {cfg.port}")
+
+    def remove(self, scale_id: int) -> None:
+        if self.engine is None:
+            return
+        with self._lock:
+            if self._configs.pop(scale_id, None) is None:
+                return
+            self.engine.remove(scale_id)
+        forget_scale(scale_id)
+        logging.info(f"Stopped listener for deleted scale {scale_id}")
+
+    def is_connected(self, scale_id: int) -> bool:
+        """Czy listener wagi ma aktualnie otwarty port."""
+        if self.engine is None:
+            return False
+        return any(
+            s["scale_id"] == scale_id and s["state"] == "connected"
+            for s in self.engine.status()
+        )
+
+    def status(self) -> dict:
+        if self.engine is None:
+            return {"engine": None, "listeners": []}
+        return {"engine": self.engine.name, "listeners": self.engine.status()}
+
+
+def _detached(cfg: ScaleConfig) -> ScaleConfig:
+    """Kopia konfiguracji niezwiązana z sesją DB - bezpieczna dla innych wątków."""
+    return ScaleConfig(**cfg.model_dump())
+
+
+listener_supervisor = ListenerSupervisor()
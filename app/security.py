@@ -1,14 +1,26 @@
 # Plik: app/security.py (cała zawartość)
 
 import bcrypt, jwt, uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+import asyncio
+import logging
+import math
+import statistics
+import threading
+import time
 from .config import settings
+from .exceptions import ServiceBusy
 
 ALGO = "HS256"
 
+# Koszt bcrypt dla nowych haszy; ustalany przy starcie przez calibrate_bcrypt_cost
+_bcrypt_cost = settings.AUTH_BCRYPT_COST or 12
+_calibration_ms: float | None = None
+
 
 def hash_password(plain: str) -> str:
-    return bcrypt.hashpw(plain.encode(), bcrypt.gensalt()).decode()
+    return bcrypt.hashpw(plain.encode(), bcrypt.gensalt(rounds=_bcrypt_cost)).decode()
 
 
 def verify_password(plain: str, password_hash: str) -> bool:
@@ -18,6 +30,129 @@ def verify_password(plain: str, password_hash: str) -> bool:
         return False
 
 
+def needs_rehash(password_hash: str) -> bool:
+    """
+    Czy hasz powstał z kosztem niższym niż bieżący ("$2b$12$..."). Hasze
+    o wyższym koszcie zostają - kalibracja na innym sprzęcie albo po
+    restarcie nie obniża zabezpieczenia istniejących haseł.
+    """
+    try:
+        return int(password_hash.split("$")[2]) < _bcrypt_cost
+    except (IndexError, ValueError):
+        return False
+
+
+# Koszt pomiarów przy kalibracji - tani, żeby kilka próbek nie wydłużało startu
+_CALIBRATION_COST = 8
+_CALIBRATION_SAMPLES = 5
+
+
+def calibrate_bcrypt_cost() -> int:
+    """
+    Dobiera koszt bcrypt tak, by haszowanie trwało ok. AUTH_BCRYPT_TARGET_MS
+    na tym sprzęcie, nie mniej niż AUTH_BCRYPT_MIN_COST. Koszt +1 podwaja
+    czas, więc wystarczy pomiar przy niskim koszcie; mediana kilku próbek
+    sprawia, że pojedynczy wolny pomiar nie zmienia kosztu między
+    restartami. Stały AUTH_BCRYPT_COST wyłącza kalibrację.
+    """
+    global _bcrypt_cost, _calibration_ms
+    if settings.AUTH_BCRYPT_COST:
+        _bcrypt_cost = settings.AUTH_BCRYPT_COST
+        return _bcrypt_cost
+
+    low, high = settings.AUTH_BCRYPT_MIN_COST, settings.AUTH_BCRYPT_MAX_COST
+    salt = bcrypt.gensalt(rounds=_CALIBRATION_COST)
+    samples = []
+    for _ in range(_CALIBRATION_SAMPLES):
+        started = time.perf_counter()
+        bcrypt.hashpw(b"calibration", salt)
+        samples.append((time.perf_counter() - started) * 1000)
+    elapsed_ms = statistics.median(samples)
+    steps = math.floor(
+        math.log2(settings.AUTH_BCRYPT_TARGET_MS / max(elapsed_ms, 0.01))
+    )
+    _bcrypt_cost = max(low, min(high, _CALIBRATION_COST + steps))
+    _calibration_ms = round(elapsed_ms * 2 ** (_bcrypt_cost - _CALIBRATION_COST), 1)
+    logging.info(
+        f"bcrypt cost set to {_bcrypt_cost} (~{_calibration_ms} ms per hash, "
+        f"target {settings.AUTH_BCRYPT_TARGET_MS} ms)"
+    )
+    return _bcrypt_cost
+
+
+class HashingPool:
+    """
+    Osobna, ograniczona pula wątków dla bcrypt (bcrypt zwalnia GIL).
+
+    Fala logowań nie zajmuje wspólnej puli wątków, z której korzystają
+    pozostałe endpointy. Gdy w kolejce czeka już `queue_size` zadań,
+    kolejne są odrzucane od razu (429); zadanie, które nie skończy się
+    w `timeout_s`, kończy się odpowiedzią 503.
+    """
+
+    def __init__(self, workers: int, queue_size: int, timeout_s: float):
+        self.workers = max(1, workers)
+        self.queue_size = max(0, queue_size)
+        self.timeout_s = timeout_s
+        self._executor: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._counters = {"completed": 0, "rejected": 0, "timeouts": 0, "rehashed": 0}
+
+    async def run(self, fn, *args):
+        with self._lock:
+            if self._in_flight >= self.workers + self.queue_size:
+                self._counters["rejected"] += 1
+                raise ServiceBusy("Too many logins in progress", status_code=429)
+            self._in_flight += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="bcrypt"
+                )
+        future = self._executor.submit(fn, *args)
+        # Miejsce w puli zwalnia dopiero koniec zadania - haszowania, które
+        # przekroczyło timeout, nie da się przerwać i nadal zajmuje wątek
+        future.add_done_callback(self._release)
+        try:
+            result = await asyncio.wait_for(
+                asyncio.wrap_future(future), timeout=self.timeout_s
+            )
+        except asyncio.TimeoutError:
+            future.cancel()
+            self._count("timeouts")
+            raise ServiceBusy("Login service is overloaded", status_code=503)
+        self._count("completed")
+        return result
+
+    def _release(self, future) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+    def count_rehash(self) -> None:
+        self._count("rehashed")
+
+    def stats(self) -> dict:
+        with self._lock:
+            data = dict(self._counters)
+            data["in_flight"] = self._in_flight
+        data["workers"] = self.workers
+        data["queue_size"] = self.queue_size
+        data["bcrypt_cost"] = _bcrypt_cost
+        data["bcrypt_hash_ms"] = _calibration_ms
+        return data
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+
+password_pool = HashingPool(
+    workers=settings.AUTH_HASH_WORKERS,
+    queue_size=settings.AUTH_HASH_QUEUE_SIZE,
+    timeout_s=settings.AUTH_HASH_TIMEOUT_S,
+)
+
+
 def create_access_token(sub: str, role: str) -> tuple[str, str, datetime]:
     """Zwraca token, jego unikalne ID (jti) oraz datę wygaśnięcia."""
     exp = datetime.utcnow() + timedelta(hours=settings.ACCESS_TOKEN_EXPIRE_HOURS)
@@ -0,0 +1,107 @@
+# Plik: app/session_cache.py
+
+from collections import OrderedDict
+import threading
+import time
+
+from .config import settings
+
+
+class SessionCache:
+    """
+    Pamięć podręczna zweryfikowanych sesji (TTL + LRU), kluczem jest jti tokena.
+
+    Trafienie pomija zapytanie do `user_sessions` przy każdym żądaniu.
+    Wylogowanie i zmiany użytkownika w panelu admina usuwają wpisy jawnie;
+    TTL ogranicza nieaktualność przy zmianach wykonanych poza tym procesem
+    (inny worker, ręczna edycja bazy). Przechowywane są tylko ważne sesje.
+    """
+
+    def __init__(self, max_size: int, ttl_s: float):
+        self.max_size = max_size
+        self.ttl_s = ttl_s
+        self._entries: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self._by_user: dict[str, set[str]] = {}
+        self._lock = threading.Lock()
+        self._counters = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "invalidations": 0,
+        }
+
+    def get(self, jti: str) -> str | None:
+        """Zwraca user_id dla ważnej sesji z pamięci albo None (chybienie)."""
+        if self.ttl_s <= 0:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(jti)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    self._discard(jti)
+                self._counters["misses"] += 1
+                return None
+            self._entries.move_to_end(jti)
+            self._counters["hits"] += 1
+            return entry[0]
+
+    def put(self, jti: str, user_id: str, expires_in_s: float | None = None) -> None:
+        """Zapamiętuje ważną sesję najdłużej do końca TTL lub jej wygaśnięcia."""
+        if self.ttl_s <= 0 or self.max_size <= 0:
+            return
+        ttl = self.ttl_s if expires_in_s is None else min(self.ttl_s, expires_in_s)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._discard(jti)
+            self._entries[jti] = (user_id, time.monotonic() + ttl)
+            self._by_user.setdefault(user_id, set()).add(jti)
+            while len(self._entries) > self.max_size:
+                oldest = next(iter(self._entries))
+                self._discard(oldest)
+                self._counters["evictions"] += 1
+
+    def invalidate(self, jti: str) -> None:
+        with self._lock:
+            if self._discard(jti):
+                self._counters["invalidations"] += 1
+
+    def invalidate_user(self, user_id: str) -> None:
+        """Usuwa wszystkie sesje użytkownika (zmiana statusu, roli, usunięcie)."""
+        with self._lock:
+            for jti in list(self._by_user.get(user_id, ())):
+                if self._discard(jti):
+                    self._counters["invalidations"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            data = dict(self._counters)
+            data["size"] = len(self._entries)
+        lookups = data["hits"] + data["misses"]
+        data["hit_ratio"] = round(data["hits"] / lookups, 3) if lookups else None
+        data["max_size"] = self.max_size
+        data["ttl_s"] = self.ttl_s
+        return data
+
+    def _discard(self, jti: str) -> bool:
+        entry = self._entries.pop(jti, None)
+        if entry is None:
+            return False
+        jtis = self._by_user.get(entry[0])
+        if jtis is not None:
+            jtis.discard(jti)
+            if not jtis:
+                del self._by_user[entry[0]]
+        return True
+
+
+session_cache = SessionCache(
+    max_size=settings.AUTH_SESSION_CACHE_SIZE,
+    ttl_s=settings.AUTH_SESSION_CACHE_TTL_S,
+)
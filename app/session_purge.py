@@ -0,0 +1,70 @@
+# Plik: app/session_purge.py
+
+from datetime import datetime, timedelta
+import threading
+import time
+
+from .config import settings
+from .db import delete_in_batches
+from .models import UserSession
+
+
+class SessionPurge:
+    """
+    Okresowe usuwanie zbędnych wierszy `user_sessions`: sesji wygasłych
+    (`expires_at` w przeszłości) bez wylogowania oraz sesji wylogowanych
+    ponad SESSION_INACTIVE_RETENTION_DAYS temu - wylogowane są trzymane
+    przez cały okres retencji, także po wygaśnięciu tokenu. Każdy rodzaj
+    to osobny przebieg po indeksie (logged_out_at, expires_at). Usuwanie
+    odbywa się małymi paczkami, każda w osobnej, krótkiej transakcji.
+    """
+
+    def __init__(self, batch_size: int):
+        self.batch_size = max(1, batch_size)
+        self._lock = threading.Lock()
+        self._stats = {
+            "runs": 0,
+            "purged": 0,
+            "last_purged": 0,
+            "last_run_ms": None,
+            "last_run_at": None,
+        }
+
+    def run_once(self) -> dict:
+        started = time.perf_counter()
+        # expires_at jest zapisywane w UTC (patrz create_access_token)
+        now = datetime.utcnow()
+        logout_cutoff = datetime.now() - timedelta(
+            days=settings.SESSION_INACTIVE_RETENTION_DAYS
+        )
+        # Przerwy między paczkami - logowania nie czekają na blokadę zapisu
+        purged = delete_in_batches(
+            UserSession,
+            UserSession.logged_out_at.is_(None),
+            UserSession.expires_at < now,
+            batch_size=self.batch_size,
+            pause_s=0.01,
+        )
+        purged += delete_in_batches(
+            UserSession,
+            UserSession.logged_out_at < logout_cutoff,
+            batch_size=self.batch_size,
+            pause_s=0.01,
+        )
+
+        with self._lock:
+            self._stats["runs"] += 1
+            self._stats["purged"] += purged
+            self._stats["last_purged"] = purged
+            self._stats["last_run_ms"] = round(
+                (time.perf_counter() - started) * 1000, 1
+            )
+            self._stats["last_run_at"] = datetime.now().isoformat()
+        return {"purged": purged}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
+
+
+session_purge = SessionPurge(settings.SESSION_PURGE_BATCH_SIZE)
@@ -0,0 +1,29 @@
+# Plik: app/tasks.py
+
+from typing import Callable
+from starlette.concurrency import run_in_threadpool
+import asyncio
+import logging
+
+
+async def run_periodic(name: str, func: Callable, interval_s: float) -> None:
+    """
+    Uruchamia synchroniczną funkcję `func` cyklicznie co `interval_s` sekund.
+    Praca odbywa się w puli wątków, więc nie blokuje pętli zdarzeń API.
+    Błąd pojedynczego cyklu jest logowany i nie przerywa zadania.
+    """
+    logging.info(f"Started background task '{name}' (every {interval_s}s)")
+    while True:
+        try:
+            result = await run_in_threadpool(func)
+            logging.debug(f"Background task '{name}' finished: {result}")
+        except Exception as e:
+            logging.error(f"Background task '{name}' failed: {e}")
+        await asyncio.sleep(interval_s)
+
+
+async def cancel_tasks(tasks: list[asyncio.Task]) -> None:
+    """Anuluje zadania w tle i czeka na ich zakończenie."""
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,140 @@
+# Plik: app/tool_search.py
+
+from sqlalchemy import text
+from sqlmodel import Session
+import logging
+import re
+
+# Indeks pełnotekstowy narzędzi (SQLite FTS5, "external content" - tekst
+# jest czytany z tabeli tool, indeks przechowuje tylko tokeny). Triggery
+# aktualizują go przy każdym INSERT/UPDATE/DELETE na tool, niezależnie od
+# tego, który endpoint zmienia dane.
+SEARCH_COLUMNS = ("name", "type", "diameter", "condition")
+# Wagi kolumn w rankingu bm25 - trafienie w nazwę liczy się najbardziej
+SEARCH_WEIGHTS = (10.0, 3.0, 2.0, 1.0)
+
+# Tokenizer usuwa znaki diakrytyczne (ą -> a), ale "ł" to osobna litera,
+# a nie "l" z diakrytykiem - zamieniamy ją sami, w tekście indeksowanym
+# (triggery, przebudowa) i w zapytaniu (fts_query)
+FOLD = {"ł": "l", "Ł": "L"}
+
+
+def _fold_sql(expr: str) -> str:
+    for letter, plain in FOLD.items():
+        expr = f"replace({expr}, '{letter}', '{plain}')"
+    return expr
+
+
+def fold(value: str) -> str:
+    for letter, plain in FOLD.items():
+        value = value.replace(letter, plain)
+    return value
+
+
+_COLUMNS = ", ".join(SEARCH_COLUMNS)
+_NEW = ", ".join(_fold_sql(f"new.{c}") for c in SEARCH_COLUMNS)
+_OLD = ", ".join(_fold_sql(f"old.{c}") for c in SEARCH_COLUMNS)
+_FOLDED = ", ".join(_fold_sql(c) for c in SEARCH_COLUMNS)
+_TRIGGERS = ("tool_fts_ai", "tool_fts_ad", "tool_fts_au")
+
+SEARCH_DDL = (
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS tool_fts USING fts5(
+        {_COLUMNS},
+        content='tool', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS tool_fts_ai AFTER INSERT ON tool BEGIN
+        INSERT INTO tool_fts(rowid, {_COLUMNS}) VALUES (new.id, {_NEW});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS tool_fts_ad AFTER DELETE ON tool BEGIN
+        INSERT INTO tool_fts(tool_fts, rowid, {_COLUMNS})
+        VALUES ('delete', old.id, {_OLD});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS tool_fts_au AFTER UPDATE OF {_COLUMNS} ON tool
+    BEGIN
+        INSERT INTO tool_fts(tool_fts, rowid, {_COLUMNS})
+        VALUES ('delete', old.id, {_OLD});
+        INSERT INTO tool_fts(rowid, {_COLUMNS}) VALUES (new.id, {_NEW});
+    END
+    """,
+)
+
+
+def ensure_search_index(engine) -> None:
+    """
+    Tworzy tabelę FTS5 i triggery; przy pierwszym utworzeniu indeksuje dane.
+    Indeks z wcześniejszej wersji (triggery bez zamiany "ł") jest budowany
+    od nowa.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.begin() as conn:
+        trigger = conn.execute(
+            text("SELECT sql FROM sqlite_master WHERE name = 'tool_fts_ai'")
+        ).first()
+        exists = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE name = 'tool_fts'")
+        ).first()
+        if exists and (trigger is None or "replace(" not in trigger[0]):
+            for name in _TRIGGERS:
+                conn.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+            conn.execute(text("DROP TABLE tool_fts"))
+            exists = None
+        for ddl in SEARCH_DDL:
+            conn.execute(text(ddl))
+        if not exists:
+            # Nie 'rebuild' - ten czyta kolumny z tabeli tool bez zamiany "ł"
+            conn.execute(
+                text(
+                    f"INSERT INTO tool_fts(rowid, {_COLUMNS}) "
+                    f"SELECT id, {_FOLDED} FROM tool"
+                )
+            )
+            logging.info("Built full-text search index for tools.")
+
+
+def fts_query(q: str) -> str | None:
+    """
+    Zamienia tekst wpisany przez operatora na zapytanie FTS5: każde słowo
+    jako prefiks, wszystkie słowa wymagane ("wiert 6" -> "wiert"* AND "6").
+    Pojedyncze znaki są dopasowywane dokładnie - prefiks jednej litery pasuje
+    do dużej części katalogu, a ranking wszystkich trafień kosztuje najwięcej.
+    Cudzysłowy wokół tokenów wyłączają składnię FTS5 w danych wejściowych.
+    """
+    tokens = re.findall(r"\w+", fold(q))
+    if not tokens:
+        return None
+    return " AND ".join(
+        f'"{token}"*' if len(token) > 1 else f'"{token}"' for token in tokens
+    )
+
+
+def search_tool_ids(session: Session, q: str, limit: int) -> list[int]:
+    """Id narzędzi pasujących do `q`, od najlepiej dopasowanych (bm25)."""
+    match = fts_query(q)
+    if match is None:
+        return []
+    if session.get_bind().dialect.name != "sqlite":
+        # Bez FTS5: zwykłe LIKE po nazwie (np. inna baza w testach lokalnych)
+        like = "%" + q.strip() + "%"
+        rows = session.execute(
+            text("SELECT id FROM tool WHERE name LIKE :like LIMIT :limit"),
+            {"like": like, "limit": limit},
+        )
+        return [row[0] for row in rows]
+    weights = ", ".join(str(w) for w in SEARCH_WEIGHTS)
+    rows = session.execute(
+        text(
+            "SELECT rowid FROM tool_fts WHERE tool_fts MATCH :match "
+            f"ORDER BY bm25(tool_fts, {weights}) LIMIT :limit"
+        ),
+        {"match": match, "limit": limit},
+    )
+    return [row[0] for row in rows]
@@ -0,0 +1,171 @@
+# Plik: scripts/bench_auth.py
+#
+# Benchmark ścieżki uwierzytelniania pod obciążeniem równoległym.
+# Uruchomienie: python -m scripts.bench_auth [--clients 50] [--requests 4000]
+#               [--mode legacy|nocache|cached|all]
+#
+# Serwer uvicorn startuje w osobnym procesie dla każdego trybu:
+#   legacy  - dawna zależność: zapytanie synchroniczne w pętli zdarzeń,
+#   nocache - zapytanie w puli wątków, bez pamięci podręcznej sesji,
+#   cached  - bieżąca implementacja (pula wątków + pamięć podręczna).
+# Wymaga konta admina w bazie (python -m scripts.seed_admin).
+
+import argparse
+import asyncio
+import multiprocessing
+import socket
+import time
+
+import httpx
+from fastapi import Depends, HTTPException
+from sqlmodel import Session, select
+
+from app.config import settings
+from app.db import engine
+from app.models import User, UserSession
+from app.security import create_access_token, decode_token
+
+ENDPOINT = "/api/system/stats"
+MODES = ("legacy", "nocache", "cached")
+
+
+async def legacy_current_user(creds=None):
+    """Zależność sprzed zmian: blokujące zapytanie wprost w `async def`."""
+    try:
+        payload = decode_token(creds.credentials)
+    except Exception:
+        raise HTTPException(401, "Invalid token")
+    with Session(engine) as session:
+        db_session = session.exec(
+            select(UserSession).where(UserSession.id == payload["jti"])
+        ).first()
+    if not db_session or not db_session.is_active:
+        raise HTTPException(401, "Session is not active")
+    return payload
+
+
+def serve(mode: str, port: int) -> None:
+    import uvicorn
+
+    from app import dependencies
+    from app.main import app
+    from app.session_cache import session_cache
+
+    if mode == "legacy":
+
+        async def override(creds=Depends(dependencies.bearer)):
+            return await legacy_current_user(creds)
+
+        app.dependency_overrides[dependencies.get_current_user] = override
+    if mode != "cached":
+        session_cache.ttl_s = 0
+
+    settings.SCALE_LISTENER_ENABLED = False
+    settings.SCALE_ROLLUP_ENABLED = False
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def issue_token() -> tuple[str, str]:
+    """Tworzy sesję admina bezpośrednio w bazie - bez kosztu bcrypt."""
+    with Session(engine) as s:
+        admin = s.exec(select(User).where(User.email == settings.ADMIN_EMAIL)).first()
+        if not admin:
+            raise SystemExit("No admin user - run python -m scripts.seed_admin")
+        token, jti, exp = create_access_token(sub=admin.id, role=admin.role)
+        s.add(
+            UserSession(id=jti, user_id=admin.id, session_token=token, expires_at=exp)
+        )
+        s.commit()
+    return token, jti
+
+
+def revoke(jti: str) -> None:
+    with Session(engine) as s:
+        db_session = s.get(UserSession, jti)
+        db_session.is_active = False
+        s.add(db_session)
+        s.commit()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_ready(base: str) -> None:
+    async with httpx.AsyncClient(base_url=base) as client:
+        for _ in range(200):
+            try:
+                await client.get("/health")
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.05)
+    raise SystemExit("Server did not start")
+
+
+async def load(base: str, token: str, clients: int, total: int) -> dict:
+    headers = {"Authorization": f"Bearer {token}"}
+    latencies: list[float] = []
+    errors = 0
+    remaining = total
+
+    async def worker(client: httpx.AsyncClient) -> None:
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            r = await client.get(ENDPOINT, headers=headers)
+            latencies.append(time.perf_counter() - started)
+            if r.status_code != 200:
+                errors += 1
+
+    limits = httpx.Limits(max_connections=clients)
+    async with httpx.AsyncClient(base_url=base, limits=limits) as client:
+        # Rozgrzewka: połączenia i pierwsze trafienie w pamięć podręczną
+        await client.get(ENDPOINT, headers=headers)
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(clients)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50": latencies[len(latencies) // 2] * 1000,
+        "p99": latencies[int(len(latencies) * 0.99)] * 1000,
+        "errors": errors,
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--clients", type=int, default=50)
+    ap.add_argument("--requests", type=int, default=4000)
+    ap.add_argument("--mode", choices=MODES + ("all",), default="all")
+    args = ap.parse_args()
+
+    token, jti = issue_token()
+    modes = MODES if args.mode == "all" else (args.mode,)
+    ctx = multiprocessing.get_context("spawn")
+    print(f"{args.clients} clients, {args.requests} x GET {ENDPOINT}")
+    print(f"{'mode':<10}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for mode in modes:
+        port = free_port()
+        proc = ctx.Process(target=serve, args=(mode, port), daemon=True)
+        proc.start()
+        try:
+            base = f"http://127.0.0.1:{port}"
+            asyncio.run(wait_ready(base))
+            r = asyncio.run(load(base, token, args.clients, args.requests))
+            print(
+                f"{mode:<10}{r['rps']:>10,.0f}{r['p50']:>10.1f}"
+                f"{r['p99']:>10.1f}{r['errors']:>8}"
+            )
+        finally:
+            proc.terminate()
+            proc.join()
+    revoke(jti)
+
+
+if __name__ == "__main__":
+    main()
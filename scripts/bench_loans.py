@@ -0,0 +1,143 @@
+# Plik: scripts/bench_loans.py
+#
+# Test obciążeniowy wypożyczeń i zwrotów: wielu równoległych klientów
+# wypożycza i zwraca sztuki tego samego narzędzia.
+# Uruchomienie: python -m scripts.bench_loans [--clients 200] [--stock 50]
+#               [--rounds 5] [--connections 100]
+#
+# W każdej rundzie wszyscy klienci naraz próbują wypożyczyć sztukę, potem
+# naraz zwracają. Po każdej fazie sprawdzane są niezmienniki:
+#   - udanych wypożyczeń jest dokładnie min(klienci, stan),
+#   - quantity_available + aktywne wypożyczenia == quantity_total,
+#   - quantity_available nigdy nie jest ujemne ani większe od quantity_total.
+# Wymaga konta admina w bazie (python -m scripts.seed_admin).
+
+import argparse
+import asyncio
+import multiprocessing
+import time
+
+import httpx
+from sqlmodel import Session, select, func
+
+from app.db import engine
+from app.models import Tool, ToolLoan
+from scripts.bench_auth import free_port, issue_token, revoke, serve, wait_ready
+
+
+def create_tool(stock: int) -> int:
+    with Session(engine) as s:
+        tool = Tool(name="bench-loans", quantity_total=stock, quantity_available=stock)
+        s.add(tool)
+        s.commit()
+        return tool.id
+
+
+def check_invariants(tool_id: int) -> tuple[int, int]:
+    with Session(engine) as s:
+        tool = s.get(Tool, tool_id)
+        active = s.exec(
+            select(func.count())
+            .select_from(ToolLoan)
+            .where(ToolLoan.tool_id == tool_id, ToolLoan.returned == False)
+        ).one()
+    assert 0 <= tool.quantity_available <= tool.quantity_total, tool
+    assert tool.quantity_available + active == tool.quantity_total, (tool, active)
+    return tool.quantity_available, active
+
+
+def cleanup(tool_id: int) -> None:
+    with Session(engine) as s:
+        for loan in s.exec(select(ToolLoan).where(ToolLoan.tool_id == tool_id)):
+            s.delete(loan)
+        s.delete(s.get(Tool, tool_id))
+        s.commit()
+
+
+async def burst(client: httpx.AsyncClient, requests: list) -> tuple[list, float]:
+    """Wszystkie żądania naraz; zwraca (status, czas w s) i czas całej fazy."""
+
+    async def one(method, url, **kwargs):
+        started = time.perf_counter()
+        r = await client.request(method, url, **kwargs)
+        return r.status_code, time.perf_counter() - started
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(one(*req[:2], **req[2]) for req in requests))
+    return results, time.perf_counter() - started
+
+
+async def run(base: str, token: str, tool_id: int, args) -> None:
+    headers = {"Authorization": f"Bearer {token}"}
+    limits = httpx.Limits(max_connections=min(args.clients, args.connections))
+    borrow = ("POST", f"/api/tools/{tool_id}/loans", {})
+    give_back = ("POST", "/api/tools/return", {"json": {"tool_id": tool_id}})
+    totals = {"loan": [0, 0.0, []], "return": [0, 0.0, []]}
+
+    async with httpx.AsyncClient(
+        base_url=base, headers=headers, limits=limits, timeout=60
+    ) as client:
+        for round_no in range(1, args.rounds + 1):
+            results, elapsed = await burst(client, [borrow] * args.clients)
+            ok = sum(1 for status, _ in results if status == 201)
+            assert ok == min(args.clients, args.stock), ok
+            assert all(status in (201, 400) for status, _ in results), results
+            available, active = check_invariants(tool_id)
+            _add(totals["loan"], results, elapsed)
+
+            results, elapsed = await burst(client, [give_back] * args.clients)
+            returned = sum(1 for status, _ in results if status == 200)
+            assert returned == active, (returned, active)
+            check_invariants(tool_id)
+            _add(totals["return"], results, elapsed)
+            print(
+                f"round {round_no}: {ok} loans ({available} left), "
+                f"{returned} returns - invariants hold"
+            )
+
+    print(f"{'phase':<8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for phase, (count, elapsed, latencies) in totals.items():
+        latencies.sort()
+        print(
+            f"{phase:<8}{count / elapsed:>10,.0f}"
+            f"{latencies[len(latencies) // 2] * 1000:>10.1f}"
+            f"{latencies[int(len(latencies) * 0.99)] * 1000:>10.1f}"
+        )
+
+
+def _add(total: list, results: list, elapsed: float) -> None:
+    total[0] += len(results)
+    total[1] += elapsed
+    total[2].extend(latency for _, latency in results)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--clients", type=int, default=200)
+    ap.add_argument("--stock", type=int, default=50)
+    ap.add_argument("--rounds", type=int, default=5)
+    # Żądania ponad limit połączeń czekają w kolejce klienta
+    ap.add_argument("--connections", type=int, default=100)
+    args = ap.parse_args()
+
+    token, jti = issue_token()
+    tool_id = create_tool(args.stock)
+    port = free_port()
+    proc = multiprocessing.get_context("spawn").Process(
+        target=serve, args=("cached", port), daemon=True
+    )
+    proc.start()
+    try:
+        base = f"http://127.0.0.1:{port}"
+        asyncio.run(wait_ready(base))
+        print(f"{args.clients} parallel clients, stock {args.stock}")
+        asyncio.run(run(base, token, tool_id, args))
+    finally:
+        proc.terminate()
+        proc.join()
+        cleanup(tool_id)
+        revoke(jti)
+
+
+if __name__ == "__main__":
+    main()
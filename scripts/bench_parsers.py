@@ -0,0 +1,97 @@
+# Plik: scripts/bench_parsers.py
+#
+# Mikro-benchmark dzielenia strumienia na linie i parserów protokołów wag.
+# Uruchomienie: python -m scripts.bench_parsers [--lines 200000] [--chunk 64]
+
+import argparse
+import random
+import re
+import time
+
+from app.scale.protocols import LineFramer, PARSERS
+
+SAMPLES = {
+    "net_g": "Net {:>8.1f} g\r\n",
+    "mt_sics": "S S {:>10.2f} g\r\n",
+    "generic": "  +{:.1f} kg\r\n",
+}
+
+
+def make_stream(template: str, lines: int) -> bytes:
+    rnd = random.Random(42)
+    out = []
+    for i in range(lines):
+        if i % 20 == 0:
+            out.append("ST,GS,garbage line\r\n")
+        else:
+            out.append(template.format(rnd.uniform(0, 5000)))
+    return "".join(out).encode()
+
+
+def chunks(data: bytes, size: int) -> list[bytes]:
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+def best_of(repeat: int, fn, *args) -> tuple[int, float]:
+    """Najlepszy z kilku pomiarów - mniej szumu od innych procesów."""
+    return min((fn(*args) for _ in range(repeat)), key=lambda r: r[1])
+
+
+def bench_framed(parser, parts: list[bytes]) -> tuple[int, float]:
+    framer = LineFramer()
+    buf = framer.buffer
+    found = 0
+    started = time.perf_counter()
+    for data in parts:
+        for start, end in framer.feed(data):
+            if parser.parse(buf, start, end) is not None:
+                found += 1
+    return found, time.perf_counter() - started
+
+
+def bench_legacy(parts: list[bytes]) -> tuple[int, float]:
+    """Dotychczasowa implementacja: dekodowanie do str i split całego bufora."""
+    buffer = ""
+    found = 0
+    started = time.perf_counter()
+    for chunk in parts:
+        data = chunk.decode(errors="ignore")
+        buffer += data
+        if "\n" in buffer:
+            lines = buffer.split("\n")
+            buffer = lines.pop()
+            for line in lines:
+                line = line.strip()
+                if not line:
+                    continue
+                match = re.search(r"Net\s+([\d\.]+)\s+g", line)
+                if match:
+                    float(match.group(1))
+                    found += 1
+    return found, time.perf_counter() - started
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--lines", type=int, default=200_000)
+    ap.add_argument("--chunk", type=int, default=64, help="rozmiar porcji z portu")
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    print(f"{'parser':<16}{'lines/s':>14}{'readings':>12}")
+    for name, template in SAMPLES.items():
+        parts = chunks(make_stream(template, args.lines), args.chunk)
+        found, elapsed = best_of(args.repeat, bench_framed, PARSERS[name], parts)
+        print(f"{name:<16}{args.lines / elapsed:>14,.0f}{found:>12}")
+        if name == "net_g":
+            found, elapsed = best_of(args.repeat, bench_legacy, parts)
+            print(f"{'legacy (str)':<16}{args.lines / elapsed:>14,.0f}{found:>12}")
+
+    # Parser ogólny jako fallback na danych innego producenta
+    parts = chunks(make_stream(SAMPLES["net_g"], args.lines), args.chunk)
+    found, elapsed = best_of(args.repeat, bench_framed, PARSERS["generic"], parts)
+    print(f"{'generic/net_g':<16}{args.lines / elapsed:>14,.0f}{found:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+# Plik: scripts/bench_scale.py
+#
+# Benchmark przepustowości listenerów wag na wirtualnych wagach (pty).
+# Uruchomienie: python -m scripts.bench_scale [--scales 4] [--rate 50]
+#               [--duration 10] [--engine thread|asyncio]
+#
+# Wagi są symulowane w osobnym procesie, więc zużycie CPU dotyczy tylko
+# aplikacji: listenerów, filtra, bufora i kolejki zapisu. Opóźnienie liczone
+# jest od wysłania linii do (a) odczytu w pamięci i (b) widoczności wiersza
+# w bazie (próbkowanie co --poll-ms). Wiersze testowe są na koniec usuwane.
+
+import argparse
+import asyncio
+import multiprocessing
+import resource
+import threading
+import time
+
+from sqlmodel import Session, select, delete, func
+
+from app.db import init_db, engine
+from app.models import ScaleConfig, ScaleWeight
+from app.scale import listener
+from app.scale.ingest import write_queue
+from app.scale.supervisor import listener_supervisor
+from scripts.scale_simulator import VirtualScale
+
+# Identyfikatory wag testowych - poza zakresem używanym w praktyce
+BENCH_SCALE_ID = 90_000
+
+
+def simulate(conn, scales: int, rate: float, garbage: float) -> None:
+    """Proces symulatora: tworzy wagi, nadaje przez zadany czas, odsyła czasy."""
+    sims = [VirtualScale(rate, garbage=garbage, seed=i) for i in range(scales)]
+    conn.send([s.port for s in sims])
+    duration = conn.recv()
+    stop = threading.Event()
+    threads = [threading.Thread(target=s.run, args=(stop,), daemon=True) for s in sims]
+    for t in threads:
+        t.start()
+    time.sleep(duration)
+    stop.set()
+    for t in threads:
+        t.join()
+    conn.send([s.emitted.tolist() for s in sims])
+    # Porty zostają otwarte, aż listenery doczytają resztę danych
+    conn.recv()
+    for s in sims:
+        s.close()
+
+
+class RowPoller(threading.Thread):
+    """Co `interval` sprawdza liczbę wierszy per waga i notuje czas ich pojawienia się."""
+
+    def __init__(self, scale_ids: list[int], after_id: int, interval: float):
+        super().__init__(daemon=True)
+        self.scale_ids = scale_ids
+        self.after_id = after_id
+        self.interval = interval
+        self.visible = {scale_id: [] for scale_id in scale_ids}
+        self.cpu = 0.0
+        self._done = threading.Event()
+
+    def run(self) -> None:
+        query = (
+            select(ScaleWeight.scale_id, func.count())
+            .where(ScaleWeight.id > self.after_id)
+            .where(ScaleWeight.scale_id.in_(self.scale_ids))
+            .group_by(ScaleWeight.scale_id)
+        )
+        while not self._done.wait(self.interval):
+            with Session(engine) as s:
+                counts = dict(s.exec(query).all())
+            now = time.monotonic()
+            for scale_id, count in counts.items():
+                seen = self.visible[scale_id]
+                seen.extend([now] * (count - len(seen)))
+        # CPU pollera odejmujemy od wyniku - to koszt pomiaru, nie aplikacji
+        self.cpu = time.thread_time()
+
+    def stop(self) -> None:
+        self._done.set()
+        self.join()
+
+
+def percentiles(values: list[float]) -> str:
+    if not values:
+        return "n/a"
+    values = sorted(values)
+
+    def pick(p: float) -> float:
+        return values[min(len(values) - 1, int(p * len(values)))] * 1000
+
+    return (
+        f"p50 {pick(0.50):7.1f}  p95 {pick(0.95):7.1f}  "
+        f"p99 {pick(0.99):7.1f}  max {values[-1] * 1000:7.1f} ms"
+    )
+
+
+def latencies(emitted: dict, arrived: dict) -> list[float]:
+    """Łączy k-tą wysłaną linię z k-tym odczytem tej samej wagi."""
+    out = []
+    for scale_id, sent in emitted.items():
+        out.extend(b - a for a, b in zip(sent, arrived.get(scale_id, [])))
+    return out
+
+
+async def run(args) -> None:
+    init_db()
+    with Session(engine) as s:
+        after_id = s.exec(select(func.max(ScaleWeight.id))).one() or 0
+
+    ctx = multiprocessing.get_context("spawn")
+    conn, child_conn = ctx.Pipe()
+    proc = ctx.Process(
+        target=simulate, args=(child_conn, args.scales, args.rate, args.garbage)
+    )
+    proc.start()
+    ports = conn.recv()
+
+    scale_ids = [BENCH_SCALE_ID + i for i in range(len(ports))]
+    configs = [
+        # Filtr przepuszcza każdy odczyt - mierzymy pełną ścieżkę zapisu
+        ScaleConfig(id=scale_id, port=port, stable_window=1, deadband=0, heartbeat_s=0)
+        for scale_id, port in zip(scale_ids, ports)
+    ]
+
+    # Sonda na wejściu potoku: czas, w którym odczyt jest dostępny w pamięci
+    arrived = {scale_id: [] for scale_id in scale_ids}
+    record_reading = listener.record_reading
+
+    def probe(scale_id, weight, wait=True):
+        reading = record_reading(scale_id, weight, wait=wait)
+        arrived[scale_id].append(time.monotonic())
+        return reading
+
+    listener.record_reading = probe
+
+    write_queue.start()
+    listener_supervisor.start(args.engine, configs)
+    while not all(
+        s["state"] == "connected" for s in listener_supervisor.status()["listeners"]
+    ):
+        await asyncio.sleep(0.05)
+
+    poller = RowPoller(scale_ids, after_id, args.poll_ms / 1000)
+    poller.start()
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    started = time.monotonic()
+    conn.send(args.duration)
+    emitted_lists = await asyncio.to_thread(conn.recv)
+    emitted = dict(zip(scale_ids, emitted_lists))
+    total = sum(len(v) for v in emitted.values())
+
+    # Czekamy, aż wszystko dotrze do pamięci i do bazy (albo się poddajemy)
+    deadline = time.monotonic() + args.drain_s
+    while time.monotonic() < deadline:
+        in_memory = sum(len(v) for v in arrived.values())
+        in_db = sum(len(v) for v in poller.visible.values())
+        if in_memory >= total and in_db >= in_memory - write_queue.stats()["dropped"]:
+            break
+        await asyncio.sleep(0.05)
+    elapsed = time.monotonic() - started
+    usage_end = resource.getrusage(resource.RUSAGE_SELF)
+    poller.stop()
+
+    listener_supervisor.stop()
+    conn.send("close")
+    write_queue.stop()
+    listener.record_reading = record_reading
+    proc.join()
+
+    cpu = (
+        usage_end.ru_utime
+        - usage.ru_utime
+        + usage_end.ru_stime
+        - usage.ru_stime
+        - poller.cpu
+    )
+    in_memory = sum(len(v) for v in arrived.values())
+    in_db = sum(len(v) for v in poller.visible.values())
+    stats = write_queue.stats()
+    print(
+        f"engine={args.engine} scales={args.scales} "
+        f"rate={args.rate or 'max'}/s duration={args.duration}s"
+    )
+    print(f"emitted      {total:>10} lines  {total / args.duration:>10,.0f}/s")
+    print(f"in memory    {in_memory:>10} reads  {in_memory / elapsed:>10,.0f}/s")
+    print(f"in database  {in_db:>10} rows   {in_db / elapsed:>10,.0f}/s")
+    print(f"dropped      {stats['dropped']:>10}        batches {stats['batches']}")
+    print(f"latency mem  {percentiles(latencies(emitted, arrived))}")
+    print(f"latency db   {percentiles(latencies(emitted, poller.visible))}")
+    if stats["dropped"]:
+        # Po odrzuceniu odczytu k-ty wiersz nie odpowiada już k-tej linii
+        print("             (db latency approximate - readings were dropped)")
+    print(f"cpu          {cpu:>10.2f} s  {100 * cpu / elapsed:>9.1f}% of one core")
+
+    if not args.keep:
+        with Session(engine) as s:
+            s.exec(delete(ScaleWeight).where(ScaleWeight.scale_id.in_(scale_ids)))
+            s.commit()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--scales", type=int, default=4)
+    ap.add_argument("--rate", type=float, default=50, help="linie/s, 0 = max")
+    ap.add_argument("--duration", type=float, default=10)
+    ap.add_argument("--engine", choices=("thread", "asyncio"), default="thread")
+    ap.add_argument("--garbage", type=float, default=0.02)
+    ap.add_argument("--poll-ms", type=float, default=20)
+    ap.add_argument("--drain-s", type=float, default=10)
+    ap.add_argument("--keep", action="store_true", help="nie usuwaj wierszy")
+    args = ap.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
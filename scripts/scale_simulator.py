@@ -0,0 +1,127 @@
+# Plik: scripts/scale_simulator.py
+#
+# Wirtualna waga na pseudo-terminalu (pty) - do testów listenera bez sprzętu.
+# Uruchomienie: python -m scripts.scale_simulator [--scales 2] [--rate 10]
+# Skrypt wypisuje ścieżki portów (/dev/pts/N) do wpisania w ScaleConfig.port.
+
+import argparse
+import os
+import random
+import threading
+import time
+import tty
+from array import array
+
+LINE = "Net {:>8.1f} g\r\n"
+GARBAGE = (
+    b"ST,GS,garbage line\r\n",
+    b"\x00\xff\xfe\r\n",
+    b"ES\r\n",
+    b"Net ---- g\r\n",
+)
+
+
+class VirtualScale:
+    """
+    Wirtualna waga: para pty, do której wątek wysyła linie "Net 123.4 g".
+
+    Symulowany jest realistyczny przebieg: pusta szalka, położenie ładunku
+    (wartość dochodzi do celu w kilku krokach), szum pomiaru i co jakiś czas
+    śmieciowa linia. Czas wysłania każdej poprawnej linii trafia do
+    `emitted` (time.monotonic), aby benchmark mógł policzyć opóźnienia.
+    """
+
+    def __init__(
+        self,
+        rate: float = 10.0,
+        noise: float = 0.3,
+        garbage: float = 0.02,
+        seed: int | None = None,
+    ):
+        self.rate = rate
+        self.noise = noise
+        self.garbage = garbage
+        self.emitted = array("d")
+        self._rnd = random.Random(seed)
+        self.master, self.slave = os.openpty()
+        # Tryb surowy - bez echa i konwersji końców linii po stronie pty
+        tty.setraw(self.slave)
+        self.port = os.ttyname(self.slave)
+
+    def weights(self):
+        """Nieskończony ciąg wartości: kolejne ładunki z osiadaniem i szumem."""
+        rnd = self._rnd
+        current = 0.0
+        while True:
+            target = rnd.choice((0.0, rnd.uniform(50, 5000)))
+            hold = max(10, int((self.rate or 100) * rnd.uniform(2, 6)))
+            for _ in range(hold):
+                current += (target - current) * 0.3
+                yield max(0.0, current + rnd.gauss(0, self.noise))
+
+    def run(self, stop_event: threading.Event, limit: int | None = None) -> None:
+        """Wysyła linie z zadaną częstotliwością (rate=0: najszybciej jak się da)."""
+        rnd = self._rnd
+        interval = 1.0 / self.rate if self.rate else 0.0
+        next_at = time.monotonic()
+        sent = 0
+        for weight in self.weights():
+            if stop_event.is_set() or (limit is not None and sent >= limit):
+                return
+            if interval:
+                delay = next_at - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                # Harmonogram bezwzględny - opóźnienia nie kumulują się
+                next_at += interval
+            if rnd.random() < self.garbage:
+                os.write(self.master, rnd.choice(GARBAGE))
+                continue
+            self.emitted.append(time.monotonic())
+            os.write(self.master, LINE.format(weight).encode())
+            sent += 1
+
+    def close(self) -> None:
+        for fd in (self.master, self.slave):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--scales", type=int, default=1)
+    ap.add_argument("--rate", type=float, default=10.0, help="linie/s na wagę")
+    ap.add_argument("--noise", type=float, default=0.3, help="odchylenie szumu [g]")
+    ap.add_argument("--garbage", type=float, default=0.02, help="udział śmieci")
+    args = ap.parse_args()
+
+    stop = threading.Event()
+    scales = [
+        VirtualScale(args.rate, args.noise, args.garbage, seed=i)
+        for i in range(args.scales)
+    ]
+    for i, scale in enumerate(scales, start=1):
+        print(f"scale {i}: {scale.port}")
+    threads = [
+        threading.Thread(target=s.run, args=(stop,), daemon=True) for s in scales
+    ]
+    for t in threads:
+        t.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        # Wątek może wisieć na zapisie do pełnego pty, jeśli nikt nie czyta
+        for t in threads:
+            t.join(timeout=1)
+        for scale in scales:
+            scale.close()
+
+
+if __name__ == "__main__":
+    main()
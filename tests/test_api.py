@@ -6,6 +6,7 @@ from app.db import init_db, engine
 from app.models import User
 from app.security import hash_password
 from sqlmodel import Session, select
+import json
 import pytest
 import uuid
 
@@ -83,3 +84,727 @@ def test_admin_login_and_access():
 
     assert response.status_code == 200
     assert isinstance(response.json(), list)
+
+
+def _login(email: str, password: str) -> dict:
+    response = client.post(
+        "/api/auth/login", json={"email": email, "password": password}
+    )
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def test_session_cache_is_invalidated_on_logout_and_user_block():
+    """Sesja z pamięci podręcznej traci ważność od razu, nie po upływie TTL."""
+    from app.session_cache import session_cache
+
+    admin = _login("admin@example.com", "admin")
+    email = f"cache-{uuid.uuid4()}@example.com"
+    created = client.post(
+        "/api/users",
+        headers=admin,
+        json={
+            "first_name": "Cache",
+            "last_name": "Test",
+            "email": email,
+            "password": "secret",
+        },
+    )
+    assert created.status_code in (200, 201), created.text
+    user_id = created.json()["id"]
+
+    # Pierwsze żądanie zapełnia pamięć, drugie z niej korzysta
+    user = _login(email, "secret")
+    hits = session_cache.stats()["hits"]
+    assert client.post("/api/auth/logout", headers=admin).status_code == 204
+    admin = _login("admin@example.com", "admin")
+    client.get("/api/users", headers=admin)
+    client.get("/api/users", headers=admin)
+    assert session_cache.stats()["hits"] > hits
+
+    # Zablokowanie użytkownika unieważnia jego sesję
+    assert client.get("/api/scale/weight/1/last", headers=user).status_code != 401
+    blocked = client.put(
+        f"/api/users/{user_id}", headers=admin, json={"status": "inactive"}
+    )
+    assert blocked.status_code == 200
+    r = client.get("/api/scale/weight/1/last", headers=user)
+    assert r.status_code == 401
+
+    # Wylogowanie unieważnia token, mimo że był w pamięci podręcznej
+    assert client.post("/api/auth/logout", headers=admin).status_code == 204
+    assert client.get("/api/users", headers=admin).status_code == 401
+
+    with Session(engine) as session:
+        session.delete(session.get(User, user_id))
+        session.commit()
+
+
+def test_session_purge_removes_expired_and_old_inactive_sessions():
+    from datetime import datetime, timedelta
+    from app.models import UserSession
+    from app.session_purge import SessionPurge
+
+    with Session(engine) as session:
+        admin = session.exec(
+            select(User).where(User.email == "admin@example.com")
+        ).first()
+        now = datetime.utcnow()
+        rows = {
+            "expired": UserSession(
+                user_id=admin.id, session_token="t", expires_at=now - timedelta(hours=1)
+            ),
+            "old-logout": UserSession(
+                user_id=admin.id,
+                session_token="t",
+                expires_at=now - timedelta(days=29),
+                is_active=False,
+                created_at=datetime.now() - timedelta(days=30),
+                logged_out_at=datetime.now() - timedelta(days=30),
+            ),
+            # Token wygasł, ale wylogowanie mieści się w okresie retencji
+            "fresh-logout": UserSession(
+                user_id=admin.id,
+                session_token="t",
+                expires_at=now - timedelta(hours=1),
+                is_active=False,
+                created_at=datetime.now() - timedelta(days=2),
+                logged_out_at=datetime.now() - timedelta(days=2),
+            ),
+            "active": UserSession(
+                user_id=admin.id, session_token="t", expires_at=now + timedelta(hours=1)
+            ),
+        }
+        session.add_all(rows.values())
+        session.commit()
+        ids = {name: row.id for name, row in rows.items()}
+
+    purge = SessionPurge(batch_size=1)
+    assert purge.run_once()["purged"] >= 2
+    assert purge.stats()["runs"] == 1
+
+    with Session(engine) as session:
+        left = {name for name, id in ids.items() if session.get(UserSession, id)}
+        assert left == {"fresh-logout", "active"}
+        for name in left:
+            session.delete(session.get(UserSession, ids[name]))
+        session.commit()
+
+
+def test_login_rehashes_password_with_current_cost():
+    import bcrypt
+    from app.security import needs_rehash
+
+    email = f"rehash-{uuid.uuid4()}@example.com"
+    with Session(engine) as session:
+        user = User(
+            id=str(uuid.uuid4()),
+            first_name="Old",
+            last_name="Hash",
+            email=email,
+            password_hash=bcrypt.hashpw(b"secret", bcrypt.gensalt(rounds=4)).decode(),
+        )
+        session.add(user)
+        session.commit()
+        user_id = user.id
+
+    _login(email, "secret")
+    with Session(engine) as session:
+        user = session.get(User, user_id)
+        assert not needs_rehash(user.password_hash)
+        # Hasz o wyższym koszcie nie jest obniżany
+        assert not needs_rehash("$2b$31$" + "x" * 53)
+        assert bcrypt.checkpw(b"secret", user.password_hash.encode())
+        session.delete(user)
+        session.commit()
+
+
+def test_hashing_pool_rejects_when_full():
+    import asyncio
+    import threading
+    from app.exceptions import ServiceBusy
+    from app.security import HashingPool
+
+    async def scenario():
+        pool = HashingPool(workers=1, queue_size=0, timeout_s=5)
+        release = threading.Event()
+        busy = asyncio.create_task(pool.run(release.wait))
+        await asyncio.sleep(0.05)
+        with pytest.raises(ServiceBusy) as exc:
+            await pool.run(lambda: True)
+        assert exc.value.status_code == 429
+        release.set()
+        assert await busy is True
+        assert pool.stats()["rejected"] == 1
+        assert pool.stats()["in_flight"] == 0
+
+        # Po timeoucie haszowanie nadal zajmuje wątek - miejsce wciąż zajęte
+        pool = HashingPool(workers=1, queue_size=0, timeout_s=0.05)
+        release = threading.Event()
+        try:
+            with pytest.raises(ServiceBusy) as exc:
+                await pool.run(release.wait)
+            assert exc.value.status_code == 503
+            with pytest.raises(ServiceBusy) as exc:
+                await pool.run(lambda: True)
+            assert exc.value.status_code == 429
+        finally:
+            release.set()
+        await asyncio.sleep(0.05)
+        assert pool.stats()["in_flight"] == 0
+        assert await pool.run(lambda: True) is True
+
+    asyncio.run(scenario())
+
+
+def test_permission_overrides_apply_immediately():
+    admin = _login("admin@example.com", "admin")
+    email = f"perm-{uuid.uuid4()}@example.com"
+    user_id = client.post(
+        "/api/users",
+        headers=admin,
+        json={"first_name": "P", "last_name": "U", "email": email, "password": "pw"},
+    ).json()["id"]
+    user = _login(email, "pw")
+
+    # Domyślnie rola "user": odczyt narzędzi tak, lista wypożyczeń nie
+    assert client.get("/api/tools/", headers=user).status_code == 200
+    assert client.get("/api/recognise/loans", headers=user).status_code == 403
+
+    def grant(module, permission, granted):
+        r = client.put(
+            f"/api/users/{user_id}/permissions",
+            headers=admin,
+            json={"module": module, "permission": permission, "granted": granted},
+        )
+        assert r.status_code == 200, r.text
+
+    grant("loans", "read", True)
+    grant("tools", "read", False)
+    assert client.get("/api/recognise/loans", headers=user).status_code == 200
+    assert client.get("/api/tools/", headers=user).status_code == 403
+
+    bad = client.put(
+        f"/api/users/{user_id}/permissions",
+        headers=admin,
+        json={"module": "tools", "permission": "fly", "granted": True},
+    )
+    assert bad.status_code == 422
+
+    assert client.delete(f"/api/users/{user_id}", headers=admin).status_code == 204
+
+
+def test_tools_keyset_pagination_and_filters():
+    from app.models import Tool
+
+    kind = f"paging-{uuid.uuid4()}"
+    with Session(engine) as session:
+        for i, (weight, unit) in enumerate(
+            [(500, "g"), (1.5, "kg"), (2500, "g"), (0.2, "kg"), (900, "g")]
+        ):
+            session.add(
+                Tool(
+                    name=f"tool {i % 3}",  # powtarzające się nazwy
+                    type=kind,
+                    weight_value=weight,
+                    weight_unit=unit,
+                    quantity_available=i % 2,
+                )
+            )
+        session.commit()
+
+    admin = _login("admin@example.com", "admin")
+    seen, cursor = [], None
+    while True:
+        params = {"type": kind, "sort": "name", "order": "desc", "limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        else:
+            params["include_total"] = True
+        r = client.get("/api/tools/", headers=admin, params=params)
+        assert r.status_code == 200, r.text
+        if not cursor:
+            assert r.headers["X-Total-Count"] == "5"
+        seen += [(t["name"], t["id"]) for t in r.json()]
+        cursor = r.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert seen == sorted(seen, key=lambda t: (t[0], t[1]), reverse=True)
+    assert len(set(seen)) == 5
+
+    # Zakres wagi w gramach obejmuje też narzędzia ważone w kg
+    r = client.get(
+        "/api/tools/",
+        headers=admin,
+        params={"type": kind, "weight_min": 800, "weight_max": 2000},
+    )
+    assert sorted(t["weight_value"] for t in r.json()) == [1.5, 900]
+    r = client.get(
+        "/api/tools/", headers=admin, params={"type": kind, "available": True}
+    )
+    assert len(r.json()) == 2
+
+    bad = client.get(
+        "/api/tools/", headers=admin, params={"cursor": cursor or "x", "sort": "id"}
+    )
+    assert bad.status_code == 400
+
+    with Session(engine) as session:
+        for tool in session.exec(select(Tool).where(Tool.type == kind)):
+            session.delete(tool)
+        session.commit()
+
+
+def test_tool_search_prefix_ranking_and_sync():
+    from app.tool_search import fts_query
+
+    assert fts_query('wier "6') == '"wier"* AND "6"'
+    assert fts_query("  --  ") is None
+
+    admin = _login("admin@example.com", "admin")
+    tag = uuid.uuid4().hex[:8]
+    created = []
+    for name, kind in [
+        (f"Wiertło {tag} 6 mm", "wiertła"),
+        (f"Frez {tag}", "wiertło-frez"),
+    ]:
+        r = client.post("/api/tools/", headers=admin, json={"name": name, "type": kind})
+        assert r.status_code == 201, r.text
+        created.append(r.json()["id"])
+
+    # Prefiks, bez polskich znaków; trafienie w nazwę wyżej niż w typ
+    r = client.get("/api/tools/search", headers=admin, params={"q": f"wiert {tag}"})
+    assert r.status_code == 200
+    assert [t["id"] for t in r.json()] == created
+
+    # Indeks nadąża za zmianami i usunięciem
+    client.put(f"/api/tools/{created[1]}", headers=admin, json={"type": "frezy"})
+    r = client.get("/api/tools/search", headers=admin, params={"q": f"wiert {tag}"})
+    assert [t["id"] for t in r.json()] == created[:1]
+    # "ł" nie jest literą z diakrytykiem - zapytanie bez polskich znaków
+    # i z nimi znajduje to samo
+    for q in (f"wiertlo {tag}", f"WIERTŁO {tag}"):
+        r = client.get("/api/tools/search", headers=admin, params={"q": q})
+        assert [t["id"] for t in r.json()] == created[:1]
+    client.put(
+        f"/api/tools/{created[1]}", headers=admin, json={"name": f"Młotek {tag}"}
+    )
+    r = client.get("/api/tools/search", headers=admin, params={"q": f"mlotek {tag}"})
+    assert [t["id"] for t in r.json()] == created[1:]
+
+    client.delete(f"/api/tools/{created[0]}", headers=admin)
+    r = client.get("/api/tools/search", headers=admin, params={"q": tag})
+    assert [t["id"] for t in r.json()] == created[1:]
+    client.delete(f"/api/tools/{created[1]}", headers=admin)
+
+
+def test_conditional_get_returns_304_until_data_changes():
+    admin = _login("admin@example.com", "admin")
+    tool_id = client.post(
+        "/api/tools/", headers=admin, json={"name": "ETag test"}
+    ).json()["id"]
+    url = f"/api/tools/{tool_id}"
+
+    first = client.get(url, headers=admin)
+    etag = first.headers["ETag"]
+    again = client.get(url, headers={**admin, "If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.content == b"" and again.headers["ETag"] == etag
+
+    # Inne parametry zapytania - inny znacznik
+    listed = client.get("/api/tools/", headers=admin, params={"limit": 1})
+    assert listed.headers["ETag"] != etag
+
+    client.put(url, headers=admin, json={"name": "ETag test 2"})
+    changed = client.get(url, headers={**admin, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.json()["name"] == "ETag test 2"
+    assert changed.headers["ETag"] != etag
+
+    # Bez ważnego tokena nie ma 304 - uwierzytelnienie jest pierwsze
+    anonymous = client.get(url, headers={"If-None-Match": changed.headers["ETag"]})
+    assert anonymous.status_code == 401
+    client.delete(url, headers=admin)
+
+
+def test_tool_catalogue_follows_changes():
+    from app.routers.tools.catalogue import tool_catalogue
+
+    admin = _login("admin@example.com", "admin")
+    # Jak po starcie aplikacji: katalog zbudowany, zmiany tylko przyrostowo
+    tool_catalogue.warm()
+    kind = f"catalogue-{uuid.uuid4()}"
+    tool_id = client.post(
+        "/api/tools/",
+        headers=admin,
+        json={"name": "Katalog", "type": kind, "quantity_total": 3},
+    ).json()["id"]
+
+    def from_catalogue():
+        r = client.get("/api/tools/catalogue", headers=admin)
+        assert r.status_code == 200
+        return {t["id"]: t for t in r.json()}
+
+    assert tool_id in from_catalogue()
+    r = client.get("/api/tools/", headers=admin, params={"order": "desc", "limit": 5})
+    assert tool_id in [t["id"] for t in r.json()]
+
+    # Ten sam JSON co z bazy (łącznie z wyliczanym statusem)
+    from_db = client.get(f"/api/tools/{tool_id}", headers=admin).json()
+    assert from_catalogue()[tool_id] == from_db
+    assert from_db["status"] == "w magazynie 3 sztuki"
+
+    client.put(f"/api/tools/{tool_id}", headers=admin, json={"quantity_total": 5})
+    assert from_catalogue()[tool_id]["status"] == "w magazynie 5 sztuk"
+    assert tool_catalogue.stats()["partial_rebuilds"] > 0
+
+    # Strona listy bez filtrów zgadza się z katalogiem
+    r = client.get("/api/tools/", headers=admin, params={"order": "desc", "limit": 5})
+    assert r.json()[0] == from_catalogue()[tool_id]
+
+    r = client.get("/api/tools/catalogue", headers={**admin, "Accept-Encoding": "gzip"})
+    assert r.headers["Content-Encoding"] == "gzip"
+    # Klient (httpx) sam rozpakowuje odpowiedź
+    assert r.json() == list(from_catalogue().values())
+
+    client.delete(f"/api/tools/{tool_id}", headers=admin)
+    assert tool_id not in from_catalogue()
+
+
+def test_bulk_import_csv_ndjson_and_upsert():
+    from app.models import Tool, ToolMapping
+
+    admin = _login("admin@example.com", "admin")
+    kind = f"import-{uuid.uuid4()}"
+    csv_body = (
+        "name,type,quantity_total,weight_value,external_id\n"
+        f"Imp A,{kind},2,1.5,{kind}-a\n"
+        f"Imp B,{kind},x,,\n"
+        f'"Imp, C",{kind},,,{kind}-c\n'
+    )
+    r = client.post(
+        "/api/tools/import",
+        headers={**admin, "Content-Type": "text/csv"},
+        content=csv_body.encode(),
+    )
+    assert r.status_code == 200, r.text
+    report = r.json()
+    assert (report["inserted"], report["failed"]) == (2, 1)
+    assert report["errors"][0]["row"] == 2
+    assert "quantity_total" in report["errors"][0]["error"]
+
+    # Upsert po id zewnętrznym: istniejące aktualizuje, nowe tworzy
+    lines = [
+        {"external_id": f"{kind}-a", "name": "Imp A2", "quantity_total": 5},
+        {"external_id": f"{kind}-d", "name": "Imp D", "type": kind},
+        "{broken",
+    ]
+    body = "\n".join(x if isinstance(x, str) else json.dumps(x) for x in lines)
+    r = client.post(
+        "/api/tools/import",
+        headers={**admin, "Content-Type": "application/x-ndjson"},
+        params={"mode": "upsert", "key": "external_id"},
+        content=body.encode(),
+    )
+    report = r.json()
+    assert (report["inserted"], report["updated"], report["failed"]) == (1, 1, 1)
+
+    # on_error=abort: błąd wycofuje cały plik
+    r = client.post(
+        "/api/tools/import",
+        headers=admin,
+        params={"format": "ndjson", "on_error": "abort"},
+        content=f'{{"name": "Imp E", "type": "{kind}"}}\n{{"quantity_total": 1}}',
+    )
+    assert r.json()["committed"] is False
+
+    with Session(engine) as session:
+        tools = session.exec(select(Tool).where(Tool.type == kind)).all()
+        by_name = {t.name: t for t in tools}
+        assert sorted(by_name) == ["Imp A2", "Imp D", "Imp, C"]
+        assert by_name["Imp A2"].quantity_available == 5
+        for mapping in session.exec(
+            select(ToolMapping).where(ToolMapping.external_tool_id.like(f"{kind}%"))
+        ):
+            session.delete(mapping)
+        session.flush()
+        for tool in tools:
+            session.delete(tool)
+        session.commit()
+
+
+def test_export_streams_csv_and_ndjson_by_date_range():
+    import csv
+    import io
+    from datetime import datetime, timedelta
+    from app.models import Tool, ToolWeight
+
+    admin = _login("admin@example.com", "admin")
+    kind = f"export-{uuid.uuid4()}"
+    old = datetime(2001, 1, 1)
+    with Session(engine) as session:
+        tool = Tool(name="Eksport", type=kind)
+        session.add(tool)
+        session.flush()
+        session.add(ToolWeight(tool_id=tool.id, weight_value=12.5, measured_at=old))
+        session.add(ToolWeight(tool_id=tool.id, weight_value=13.0))
+        session.commit()
+        tool_id = tool.id
+
+    r = client.get(
+        "/api/export/weights",
+        headers=admin,
+        params={
+            "format": "ndjson",
+            "date_from": "2000-12-31T00:00:00",
+            "date_to": "2001-01-02T00:00:00",
+        },
+    )
+    assert r.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in r.text.splitlines()]
+    mine = [row for row in rows if row["tool_id"] == tool_id]
+    assert [(w["weight_value"], w["measured_at"]) for w in mine] == [
+        (12.5, old.isoformat())
+    ]
+
+    since = (datetime.now() - timedelta(minutes=5)).isoformat()
+    r = client.get("/api/export/tools", headers=admin, params={"date_from": since})
+    assert r.status_code == 200
+    assert "attachment" in r.headers["content-disposition"]
+    rows = list(csv.DictReader(io.StringIO(r.text)))
+    assert [row["name"] for row in rows if row["type"] == kind] == ["Eksport"]
+
+    bad = client.get(
+        "/api/export/loans",
+        headers=admin,
+        params={"date_from": since, "date_to": since},
+    )
+    assert bad.status_code == 400
+
+    # Wstrzymany w połowie eksport nie blokuje zapisów
+    from app.routers.export import export_rows
+
+    stream = export_rows("weights", "ndjson", batch_size=1)
+    next(stream)
+    with Session(engine) as session:
+        session.add(ToolWeight(tool_id=tool_id, weight_value=14.0))
+        session.commit()
+    stream.close()
+
+    with Session(engine) as session:
+        for weight in session.exec(
+            select(ToolWeight).where(ToolWeight.tool_id == tool_id)
+        ):
+            session.delete(weight)
+        session.delete(session.get(Tool, tool_id))
+        session.commit()
+
+
+def test_parallel_loans_and_returns_keep_stock_consistent():
+    from concurrent.futures import ThreadPoolExecutor
+    from app.models import Tool, ToolLoan
+
+    admin = _login("admin@example.com", "admin")
+    stock, borrowers = 20, 200
+    tool_id = client.post(
+        "/api/tools/",
+        headers=admin,
+        json={"name": "Wyścig", "quantity_total": stock},
+    ).json()["id"]
+
+    def borrow(_):
+        return client.post(f"/api/tools/{tool_id}/loans", headers=admin).status_code
+
+    def give_back(_):
+        return client.post(
+            "/api/tools/return", headers=admin, json={"tool_id": tool_id}
+        ).status_code
+
+    def state():
+        with Session(engine) as session:
+            tool = session.get(Tool, tool_id)
+            active = session.exec(
+                select(ToolLoan).where(
+                    ToolLoan.tool_id == tool_id, ToolLoan.returned == False
+                )
+            ).all()
+            return tool.quantity_available, len(active)
+
+    try:
+        with ThreadPoolExecutor(max_workers=50) as pool:
+            results = list(pool.map(borrow, range(borrowers)))
+        assert results.count(201) == stock
+        assert results.count(400) == borrowers - stock
+        assert state() == (0, stock)
+
+        with ThreadPoolExecutor(max_workers=50) as pool:
+            results = list(pool.map(give_back, range(stock + 30)))
+        assert results.count(200) == stock
+        # Nadmiarowe zwroty są odrzucane, nie kończą się błędem serwera
+        rejected = sum(1 for status in results if 400 <= status < 500)
+        assert results.count(200) + rejected == stock + 30
+        assert state() == (stock, 0)
+    finally:
+        with Session(engine) as session:
+            for loan in session.exec(
+                select(ToolLoan).where(ToolLoan.tool_id == tool_id)
+            ):
+                session.delete(loan)
+            session.delete(session.get(Tool, tool_id))
+            session.commit()
+
+
+def test_batch_checkout_and_return():
+    from app.models import Tool, ToolLoan
+
+    admin = _login("admin@example.com", "admin")
+    ids = [
+        client.post(
+            "/api/tools/",
+            headers=admin,
+            json={"name": f"Partia {i}", "quantity_total": 3},
+        ).json()["id"]
+        for i in range(2)
+    ]
+
+    def available():
+        with Session(engine) as session:
+            return [session.get(Tool, i).quantity_available for i in ids]
+
+    # Wszystko albo nic: druga pozycja przekracza stan - nic się nie zmienia
+    items = [{"tool_id": ids[0], "quantity": 2}, {"tool_id": ids[1], "quantity": 4}]
+    r = client.post("/api/tools/loans/batch", headers=admin, json={"items": items})
+    assert r.status_code == 409
+    detail = r.json()["detail"]
+    assert detail["committed"] is False
+    assert [i["ok"] for i in detail["items"]] == [False, False]
+    assert available() == [3, 3]
+
+    # Per pozycja: udane zapisane, nieudane opisane
+    items.append({"tool_id": 999999})
+    r = client.post(
+        "/api/tools/loans/batch", headers=admin, json={"items": items, "atomic": False}
+    )
+    assert r.status_code == 201
+    result = r.json()["items"]
+    assert [i["ok"] for i in result] == [True, False, False]
+    assert len(result[0]["loan_ids"]) == 2
+    assert "not found" in result[2]["error"]
+    assert available() == [1, 3]
+
+    r = client.post(
+        "/api/tools/return/batch",
+        headers=admin,
+        json={"items": [{"tool_id": ids[0], "quantity": 2}]},
+    )
+    assert r.status_code == 200
+    assert sorted(r.json()["items"][0]["loan_ids"]) == sorted(result[0]["loan_ids"])
+    assert available() == [3, 3]
+
+    with Session(engine) as session:
+        for loan in session.exec(select(ToolLoan).where(ToolLoan.tool_id.in_(ids))):
+            session.delete(loan)
+        for tool_id in ids:
+            session.delete(session.get(Tool, tool_id))
+        session.commit()
+
+
+def test_weight_history_pages_raw_and_rollup_rows():
+    from datetime import datetime, timedelta
+    from sqlmodel import delete
+    from app.models import ScaleWeight, ScaleWeightRollup
+
+    scale_id = 9701
+    now = datetime.now().replace(microsecond=0)
+    raw_t = now - timedelta(minutes=30)
+    minute_t = now - timedelta(days=2)
+    hour_t = now - timedelta(days=20)
+    with Session(engine) as session:
+        # Dwa odczyty z tym samym czasem - kursor rozróżnia je po id
+        for i, seconds in enumerate([0, 10, 10, 20, 30, 40, 50]):
+            session.add(
+                ScaleWeight(
+                    scale_id=scale_id,
+                    weight=float([3, 1, 7, -4, 2, 9, 5][i]),
+                    created_at=raw_t + timedelta(seconds=seconds),
+                )
+            )
+        for resolution, t0, step, n in [
+            ("minute", minute_t, timedelta(minutes=1), 5),
+            ("hour", hour_t, timedelta(hours=1), 3),
+        ]:
+            for i in range(n):
+                session.add(
+                    ScaleWeightRollup(
+                        scale_id=scale_id,
+                        resolution=resolution,
+                        bucket_start=t0 + i * step,
+                        min_weight=i,
+                        max_weight=i + 10,
+                        sum_weight=(i + 5) * 4,
+                        count=4,
+                    )
+                )
+        session.commit()
+
+    admin = _login("admin@example.com", "admin")
+    url = f"/api/scale/weight/{scale_id}/history"
+
+    def pages(start, end):
+        points, cursor = [], None
+        while True:
+            params = {"from": start.isoformat(), "to": end.isoformat(), "limit": 2}
+            if cursor:
+                params["cursor"] = cursor
+            r = client.get(url, headers=admin, params=params)
+            assert r.status_code == 200, r.text
+            body = r.json()
+            points += [(p["t"], p["min"]) for p in body["points"]]
+            cursor = body["next_cursor"]
+            if not cursor:
+                return body["resolution"], points
+
+    try:
+        # Krótki zakres - surowe odczyty, stronami po 2 bez duplikatów i luk
+        resolution, points = pages(raw_t - timedelta(minutes=1), now)
+        assert resolution == "raw"
+        assert [m for _, m in points] == [3, 1, 7, -4, 2, 9, 5]
+        assert len(set(points)) == 7
+
+        # Dłuższe zakresy - agregaty minutowe i godzinowe
+        resolution, points = pages(minute_t, minute_t + timedelta(hours=12))
+        assert resolution == "minute"
+        assert [m for _, m in points] == [0, 1, 2, 3, 4]
+        assert points[0][0] == minute_t.isoformat()
+        resolution, points = pages(hour_t, hour_t + timedelta(days=8))
+        assert resolution == "hour"
+        assert [m for _, m in points] == [0, 1, 2]
+
+        # Redukcja do max_points zachowuje ekstrema, bez kursora
+        r = client.get(
+            url,
+            headers=admin,
+            params={
+                "from": (raw_t - timedelta(minutes=1)).isoformat(),
+                "max_points": 4,
+            },
+        )
+        body = r.json()
+        assert body["downsampled"] and body["next_cursor"] is None
+        assert len(body["points"]) <= 4
+        assert min(p["min"] for p in body["points"]) == -4
+        assert max(p["max"] for p in body["points"]) == 9
+
+        bad = client.get(
+            url,
+            headers=admin,
+            params={"from": raw_t.isoformat(), "cursor": "not-a-cursor"},
+        )
+        assert bad.status_code == 400
+    finally:
+        with Session(engine) as session:
+            session.exec(delete(ScaleWeight).where(ScaleWeight.scale_id == scale_id))
+            session.exec(
+                delete(ScaleWeightRollup).where(ScaleWeightRollup.scale_id == scale_id)
+            )
+            session.commit()
@@ -0,0 +1,365 @@
+# Plik: tests/test_queries.py
+#
+# Regresje wydajności ścieżek krytycznych: liczba zapytań SQL na żądanie
+# i plan każdego zapytania (EXPLAIN QUERY PLAN). Zapytania są przechwytywane
+# z prawdziwych żądań, a ich plany sprawdzane na osobnej bazie z dużym
+# zbiorem danych (po ANALYZE) - tam planer pokazuje to samo co na produkcji.
+
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, event, insert
+from sqlmodel import SQLModel, Session, select
+import pytest
+import re
+import uuid
+
+from app.db import engine
+from app.models import (
+    Tool,
+    ToolLoan,
+    ToolWeight,
+    User,
+    UserPermission,
+    ExternalIntegration,
+    IntegrationLog,
+)
+from app.tool_search import ensure_search_index
+from tests.test_api import client, _login, setup_db  # noqa: F401
+
+TOOLS = 20000
+LOANS = 60000
+WEIGHTS = 60000
+USERS = 200
+INTEGRATIONS = 50
+LOGS = 50000
+
+
+def _seed(plan_engine) -> None:
+    now = datetime(2024, 1, 1)
+    users = [f"u{i}" for i in range(USERS)]
+    integrations = [f"i{i}" for i in range(INTEGRATIONS)]
+    with plan_engine.begin() as conn:
+        conn.execute(
+            insert(User),
+            [
+                dict(
+                    id=u,
+                    first_name="A",
+                    last_name="B",
+                    email=f"{u}@example.com",
+                    password_hash="x",
+                    role="user",
+                    status="active",
+                    created_at=now,
+                    updated_at=now,
+                )
+                for u in users
+            ],
+        )
+        conn.execute(
+            insert(Tool),
+            [
+                dict(
+                    id=i,
+                    name=f"Narzędzie {i}",
+                    type=f"typ {i % 50}",
+                    condition=("nowe", "używane", "zużyte")[i % 3],
+                    quantity_total=5,
+                    quantity_available=i % 6,
+                    weight_value=i % 900,
+                    weight_unit="g",
+                    width=i % 200,
+                    height=i % 300,
+                    area=i % 5000,
+                    created_at=now,
+                    updated_at=now + timedelta(minutes=i),
+                )
+                for i in range(1, TOOLS + 1)
+            ],
+        )
+        conn.execute(
+            insert(ToolLoan),
+            [
+                dict(
+                    tool_id=i % TOOLS + 1,
+                    user_id=users[i % USERS],
+                    loan_date=now + timedelta(minutes=i),
+                    returned=i % 10 != 0,
+                )
+                for i in range(LOANS)
+            ],
+        )
+        conn.execute(
+            insert(ToolWeight),
+            [
+                dict(
+                    tool_id=i % TOOLS + 1,
+                    weight_value=100.0,
+                    measured_at=now + timedelta(minutes=i),
+                )
+                for i in range(WEIGHTS)
+            ],
+        )
+        conn.execute(
+            insert(UserPermission),
+            [
+                dict(user_id=u, module="tools", permission=p, granted=True)
+                for u in users
+                for p in ("read", "write", "delete")
+            ],
+        )
+        conn.execute(
+            insert(ExternalIntegration),
+            [
+                dict(id=i, name=i, type="erp", config={}, is_active=True)
+                for i in integrations
+            ],
+        )
+        conn.execute(
+            insert(IntegrationLog),
+            [
+                dict(
+                    integration_id=integrations[i % INTEGRATIONS],
+                    event_type="sync",
+                    status="ok",
+                    created_at=now + timedelta(minutes=i),
+                )
+                for i in range(LOGS)
+            ],
+        )
+        conn.exec_driver_sql("ANALYZE")
+
+
+@pytest.fixture(scope="module")
+def plan_engine(tmp_path_factory):
+    path = tmp_path_factory.mktemp("plans") / "plans.db"
+    plan_engine = create_engine(f"sqlite:///{path}")
+    SQLModel.metadata.create_all(plan_engine)
+    ensure_search_index(plan_engine)
+    _seed(plan_engine)
+    yield plan_engine
+    plan_engine.dispose()
+
+
+@contextmanager
+def captured_sql():
+    """Zapytania wysłane do bazy aplikacji w bloku: lista (SQL, parametry)."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+def query_plan(plan_engine, statement: str, parameters) -> list[str]:
+    with plan_engine.connect() as conn:
+        rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)
+        return [row[3] for row in rows]
+
+
+# Indeksy częściowe, których przejście w całości jest zamierzone: zawierają
+# tylko aktywne wypożyczenia, a nie całą historię
+BOUNDED_INDEXES = {"ix_toolloan_open"}
+
+
+def full_scans(plan: list[str], statement: str = "") -> list[str]:
+    """
+    Kroki planu czytające całą tabelę lub cały indeks. Przejście po indeksie
+    (SCAN ... USING INDEX) jest dopuszczalne tylko w zapytaniu z LIMIT -
+    wtedy to odczyt kolejnych wierszy w porządku indeksu, a nie całej tabeli -
+    albo po indeksie z BOUNDED_INDEXES.
+    """
+    limited = re.search(r"\bLIMIT\b", statement, re.IGNORECASE) is not None
+    return [
+        step
+        for step in plan
+        if step.startswith("SCAN ")
+        and "VIRTUAL TABLE" not in step
+        and not (limited and " USING " in step)
+        and step.split(" INDEX ")[-1] not in BOUNDED_INDEXES
+    ]
+
+
+@pytest.fixture(scope="module")
+def admin():
+    headers = _login("admin@example.com", "admin")
+    # Rozgrzewka: sesja i uprawnienia trafiają do pamięci podręcznej
+    assert client.get("/api/tools/catalogue", headers=headers).status_code == 200
+    return headers
+
+
+@pytest.fixture
+def tool(admin):
+    tool_id = client.post(
+        "/api/tools/",
+        headers=admin,
+        json={"name": f"Plan {uuid.uuid4()}", "type": "plan", "quantity_total": 2},
+    ).json()["id"]
+    yield tool_id
+    with Session(engine) as session:
+        for loan in session.exec(select(ToolLoan).where(ToolLoan.tool_id == tool_id)):
+            session.delete(loan)
+        tool = session.get(Tool, tool_id)
+        if tool:
+            session.delete(tool)
+        session.commit()
+
+
+def _check(plan_engine, statements, max_statements):
+    """Limit liczby zapytań i brak pełnych skanów w planie każdego z nich."""
+    sql = [s for s, _ in statements]
+    assert len(statements) <= max_statements, "\n".join(sql)
+    for statement, parameters in statements:
+        plan = query_plan(plan_engine, statement, parameters)
+        assert not full_scans(plan, statement), f"{statement}\n{plan}"
+
+
+# (metoda, adres, dodatkowe argumenty, maksymalna liczba zapytań);
+# {tool} zastępowane id narzędzia utworzonego na potrzeby testu
+HOT_PATHS = [
+    ("GET", "/api/tools/{tool}", {}, 1),
+    ("GET", "/api/tools/", {"params": {"type": "plan", "limit": 50}}, 1),
+    ("GET", "/api/tools/", {"params": {"sort": "name", "limit": 50}}, 1),
+    (
+        "GET",
+        "/api/tools/",
+        {"params": {"weight_min": 100, "weight_max": 200, "available": True}},
+        1,
+    ),
+    ("GET", "/api/tools/search", {"params": {"q": "plan"}}, 2),
+    ("GET", "/api/tools/{tool}/loans", {}, 1),
+    ("GET", "/api/tools/{tool}/weights", {}, 1),
+    ("GET", "/api/recognise/loans", {}, 1),
+    (
+        "GET",
+        "/api/export/loans",
+        {"params": {"date_from": "2024-01-01", "date_to": "2024-01-02"}},
+        1,
+    ),
+]
+
+
+@pytest.mark.parametrize("method,url,kwargs,max_statements", HOT_PATHS)
+def test_hot_read_paths(plan_engine, admin, tool, method, url, kwargs, max_statements):
+    url = url.format(tool=tool)
+    with captured_sql() as statements:
+        r = client.request(method, url, headers=admin, **kwargs)
+    assert r.status_code == 200, r.text
+    _check(plan_engine, statements, max_statements)
+
+
+def test_catalogue_list_is_served_from_memory(plan_engine, admin, tool):
+    # Pierwsze żądanie przeładowuje tylko nowe narzędzie z fixture (po id)
+    with captured_sql() as statements:
+        r = client.get(
+            "/api/tools/", headers=admin, params={"order": "desc", "limit": 50}
+        )
+    assert r.status_code == 200
+    assert tool in [t["id"] for t in r.json()]
+    _check(plan_engine, statements, 1)
+    with captured_sql() as statements:
+        client.get("/api/tools/", headers=admin, params={"order": "desc"})
+        client.get("/api/tools/catalogue", headers=admin)
+    assert statements == []
+
+
+def test_not_modified_answers_without_queries(admin, tool):
+    first = client.get(f"/api/tools/{tool}", headers=admin)
+    with captured_sql() as statements:
+        r = client.get(
+            f"/api/tools/{tool}",
+            headers={**admin, "If-None-Match": first.headers["ETag"]},
+        )
+    assert r.status_code == 304
+    assert statements == []
+
+
+def test_loan_return_and_delete_paths(plan_engine, admin, tool):
+    with captured_sql() as statements:
+        r = client.post(f"/api/tools/{tool}/loans", headers=admin)
+    assert r.status_code == 201
+    # użytkownik, UPDATE stanu, INSERT wypożyczenia, odczyt po commit
+    _check(plan_engine, statements, 4)
+
+    with captured_sql() as statements:
+        r = client.post(
+            "/api/tools/loans/batch",
+            headers=admin,
+            json={"items": [{"tool_id": tool, "quantity": 1}]},
+        )
+    assert r.status_code == 201
+    _check(plan_engine, statements, 3)
+
+    with captured_sql() as statements:
+        r = client.post("/api/tools/return", headers=admin, json={"tool_id": tool})
+    assert r.status_code == 200
+    # UPDATE stanu, wybór i zamknięcie wypożyczenia, odczyt po commit
+    _check(plan_engine, statements, 4)
+
+    with captured_sql() as statements:
+        r = client.delete(f"/api/tools/{tool}", headers=admin)
+    assert r.status_code == 400  # jedno wypożyczenie nadal aktywne
+    _check(plan_engine, statements, 2)
+
+    client.post("/api/tools/return", headers=admin, json={"tool_id": tool})
+    with captured_sql() as statements:
+        r = client.delete(f"/api/tools/{tool}", headers=admin)
+    assert r.status_code == 200
+    _check(plan_engine, statements, 3)
+
+
+def test_admin_lookup_paths(plan_engine, admin):
+    user_id = str(uuid.uuid4())
+    integration_id = str(uuid.uuid4())
+    with Session(engine) as session:
+        session.add(
+            User(
+                id=user_id,
+                first_name="Plan",
+                last_name="Test",
+                email=f"{user_id}@example.com",
+                password_hash="x",
+            )
+        )
+        session.add(ExternalIntegration(id=integration_id, name="plan", type="erp"))
+        session.commit()
+
+    for url in (
+        f"/api/users/{user_id}/permissions",
+        f"/api/integrations/{integration_id}/logs",
+    ):
+        with captured_sql() as statements:
+            r = client.get(url, headers=admin)
+        assert r.status_code == 200, r.text
+        # istnienie rekordu + lista
+        _check(plan_engine, statements, 2)
+
+    with Session(engine) as session:
+        session.delete(session.get(ExternalIntegration, integration_id))
+        session.delete(session.get(User, user_id))
+        session.commit()
+
+
+def test_session_purge_uses_index(plan_engine):
+    from app.session_purge import SessionPurge
+
+    with captured_sql() as statements:
+        SessionPurge(batch_size=500).run_once()
+    # jedno DELETE na każdy z dwóch przebiegów
+    _check(plan_engine, statements, 2)
+
+
+def test_full_scan_detection():
+    assert full_scans(["SCAN tool"]) == ["SCAN tool"]
+    index_scan = "SCAN toolloan USING COVERING INDEX ix_toolloan_tool_returned"
+    assert full_scans([index_scan], "SELECT id FROM toolloan") == [index_scan]
+    assert not full_scans([index_scan], "SELECT id FROM toolloan LIMIT ?")
+    assert not full_scans(["SCAN toolloan USING INDEX ix_toolloan_open"])
+    assert not full_scans(
+        ["SEARCH toolloan USING INDEX ix_toolloan_tool_returned (tool_id=?)"]
+    )
@@ -0,0 +1,401 @@
+# Plik: tests/test_scale.py
+
+from sqlmodel import Session, select, delete
+from app.db import init_db, engine
+from app.models import ScaleConfig, ScaleWeight, ScaleWeightRollup
+from app.scale.ingest import ScaleWriteQueue
+from app.scale.buffer import ReadingBuffer
+from app.scale.hub import ReadingHub
+from app.scale.filter import ReadingFilter
+from app.scale.reading import ScaleReading
+from app.scale.rollup import ScaleRollup
+from app.scale import history
+from app.scale.buffer import latest_readings
+from app.scale import listener
+from app.scale.listener import AsyncListenerEngine, ThreadListenerEngine
+from app.scale.protocols import LineFramer, get_parser
+from app.scale.supervisor import ListenerSupervisor
+from app.scale.broker import PortBroker
+from datetime import datetime, timedelta
+import pytest
+import asyncio
+import json
+import threading
+import os
+import time
+
+
+@pytest.fixture(scope="module", autouse=True)
+def setup_db():
+    init_db()
+    yield
+
+
+def test_write_queue_flushes_in_batches_and_counts_drops():
+    """Odczyty ponad pojemność kolejki są odrzucane, reszta trafia do bazy."""
+    q = ScaleWriteQueue(
+        max_size=3, batch_size=2, flush_interval_ms=50, put_timeout_ms=1
+    )
+    scale_id = 9001
+    with Session(engine) as session:
+        session.exec(delete(ScaleWeight).where(ScaleWeight.scale_id == scale_id))
+        session.commit()
+
+    accepted = [q.put(ScaleWeight(scale_id=scale_id, weight=w)) for w in range(5)]
+    assert accepted == [True, True, True, False, False]
+
+    q.start()
+    q.stop()
+
+    stats = q.stats()
+    assert stats["queued"] == 3
+    assert stats["dropped"] == 2
+    assert stats["flushed"] == 3
+    assert stats["batches"] == 2
+    assert stats["pending"] == 0
+
+    with Session(engine) as session:
+        rows = session.exec(
+            select(ScaleWeight).where(ScaleWeight.scale_id == scale_id)
+        ).all()
+    assert sorted(r.weight for r in rows) == [0, 1, 2]
+
+
+def test_reading_buffer_keeps_latest_readings_per_scale():
+    buf = ReadingBuffer(size=3)
+    for w in range(5):
+        buf.append(ScaleReading(scale_id=1, weight=w))
+    buf.append(ScaleReading(scale_id=2, weight=100))
+
+    assert buf.last(1).weight == 4
+    assert [r.weight for r in buf.recent(1, 10)] == [4, 3, 2]
+    assert [r.weight for r in buf.recent(2, 2)] == [100]
+    assert not buf.is_warm(3)
+
+    # Odczyt z listenera po restarcie nie rozgrzewa wagi - historia z bazy
+    # trafia przed niego, a zapisany już odczyt nie jest dublowany
+    assert not buf.is_warm(2)
+    older = ScaleReading(scale_id=2, weight=99, created_at=datetime(2020, 1, 1))
+    persisted = buf.last(2)
+    buf.seed(2, [older, persisted])
+    assert buf.is_warm(2)
+    assert [r.weight for r in buf.recent(2, 10)] == [100, 99]
+
+    # Seed nie nadpisuje bufora, który już jest rozgrzany
+    buf.seed(2, [ScaleReading(scale_id=2, weight=-1)])
+    assert buf.last(2).weight == 100
+
+
+def test_reading_hub_coalesces_to_latest_for_slow_subscriber():
+    async def scenario():
+        hub = ReadingHub(queue_size=1)
+        sub = hub.subscribe(scale_id=1)
+        other = hub.subscribe(scale_id=2)
+
+        # Publikacja z innego wątku, tak jak robi to listener
+        def produce():
+            for w in range(3):
+                hub.publish(ScaleReading(scale_id=1, weight=w))
+
+        t = threading.Thread(target=produce)
+        t.start()
+        t.join()
+        await asyncio.sleep(0.05)
+
+        message = json.loads(await sub.get())
+        assert message["weight"] == 2
+        assert sub.queue.empty()
+        assert other.queue.empty()
+        assert hub.stats()["coalesced"] == 2
+
+        hub.unsubscribe(sub)
+        hub.unsubscribe(other)
+        assert hub.stats()["subscribers"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_reading_filter_persists_only_meaningful_transitions():
+    f = ReadingFilter(stable_window=3, stable_tolerance=0.5, deadband=5, heartbeat_s=60)
+
+    # Pierwszy odczyt jest zawsze zapisywany
+    assert f.update(0.0, now=0) is True
+    # Ten sam odczyt w kółko - stabilny, ale bez zmiany
+    assert [f.update(0.1, now=t) for t in (1, 2, 3)] == [False, False, False]
+    assert f.stable
+
+    # Kładziemy narzędzie: wartości się wahają, nic nie jest zapisywane
+    assert [f.update(w, now=4) for w in (80.0, 120.0, 101.0)] == [False] * 3
+    assert not f.stable
+    # Waga się stabilizuje na nowej wartości -> jeden zapis
+    assert [f.update(w, now=5) for w in (100.2, 100.0, 100.1, 100.1)] == [
+        False,
+        False,
+        True,
+        False,
+    ]
+    assert f.stable
+
+    # Heartbeat po minucie ciszy
+    assert f.update(100.0, now=66) is True
+
+
+def test_rollup_aggregates_incrementally_and_purges_old_raw_rows():
+    scale_id = 9002
+    base = (datetime.now() - timedelta(days=10)).replace(minute=5, second=0)
+    with Session(engine) as session:
+        session.exec(
+            delete(ScaleWeightRollup).where(ScaleWeightRollup.scale_id == scale_id)
+        )
+        for seconds, weight in [(1, 10.0), (20, 30.0), (40, 20.0), (70, 5.0)]:
+            session.add(
+                ScaleWeight(
+                    scale_id=scale_id,
+                    weight=weight,
+                    created_at=base + timedelta(seconds=seconds),
+                )
+            )
+        # Świeży odczyt innej wagi - najnowszy wiersz nigdy nie jest usuwany
+        session.add(ScaleWeight(scale_id=scale_id + 1, weight=1.0))
+        session.commit()
+
+    rollup = ScaleRollup(batch_size=2)
+    rollup.run_once()
+    # Drugi przebieg nie może policzyć tych samych odczytów ponownie
+    rollup.run_once()
+
+    with Session(engine) as session:
+        rows = session.exec(
+            select(ScaleWeightRollup)
+            .where(ScaleWeightRollup.scale_id == scale_id)
+            .order_by(ScaleWeightRollup.resolution, ScaleWeightRollup.bucket_start)
+        ).all()
+        raw_left = session.exec(
+            select(ScaleWeight).where(ScaleWeight.scale_id == scale_id)
+        ).all()
+
+    summary = [
+        (r.resolution, r.min_weight, r.max_weight, r.sum_weight / r.count, r.count)
+        for r in rows
+    ]
+    assert summary == [
+        ("hour", 5.0, 30.0, 16.25, 4),
+        ("minute", 10.0, 30.0, 20.0, 3),
+        ("minute", 5.0, 5.0, 5.0, 1),
+    ]
+    # Surowe odczyty starsze niż retencja zostały usunięte po agregacji
+    assert raw_left == []
+
+
+def test_history_decimation_keeps_extremes_and_cursor_roundtrips():
+    t0 = datetime(2026, 1, 1)
+    points = [
+        (t0 + timedelta(seconds=i), w, w, w, 1, i + 1)
+        for i, w in enumerate([0, 5, -3, 2, 9, 1, 4, 4, -8, 0])
+    ]
+    reduced = list(history.decimate(iter(points), len(points), max_points=4))
+
+    assert len(reduced) <= 4
+    assert min(p[1] for p in reduced) == -8
+    assert max(p[2] for p in reduced) == 9
+    assert [p[0] for p in reduced] == sorted(p[0] for p in reduced)
+
+    cursor = history.encode_cursor(points[3])
+    assert history.decode_cursor(cursor) == (points[3][0], 4)
+    with pytest.raises(ValueError):
+        history.decode_cursor("not-a-cursor")
+
+
+def test_async_listener_engine_reads_from_pty():
+    """Silnik asyncio czyta odczyty z pseudo-terminala bez wątków."""
+    master, slave = os.openpty()
+    cfg = ScaleConfig(id=9200, port=os.ttyname(slave), stable_window=1, deadband=0)
+
+    async def scenario():
+        engine_ = AsyncListenerEngine()
+        engine_.start([cfg])
+        try:
+            await asyncio.sleep(0.1)
+            os.write(master, b"garbage\r\nNet   12.5 g\r\nNet 13")
+            os.write(master, b".0 g\r\n")
+            for _ in range(50):
+                await asyncio.sleep(0.02)
+                if len(latest_readings.recent(cfg.id, 10)) >= 2:
+                    break
+        finally:
+            engine_.stop()
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        os.close(master)
+        os.close(slave)
+
+    assert [r.weight for r in latest_readings.recent(cfg.id, 10)] == [13.0, 12.5]
+
+
+def test_line_framer_and_protocol_parsers():
+    framer = LineFramer(max_line=32)
+    parser = get_parser("net_g")
+    readings = []
+    for chunk in [b"garbage\r\nNet  1", b"2.5 g\r\nNet 3 g\r", b"\n", b"x" * 40]:
+        buf = framer.buffer
+        for start, end in framer.feed(chunk):
+            weight = parser.parse(buf, start, end)
+            if weight is not None:
+                readings.append(weight)
+    assert readings == [12.5, 3.0]
+    # Śmieci bez końca linii nie powiększają bufora w nieskończoność
+    assert framer.overflows == 1
+
+    assert get_parser("mt_sics").parse(b"S S     1.25 kg") == 1250.0
+    # Nieznany protokół -> parser ogólny
+    assert get_parser("unknown").parse(b"+2 lb") == pytest.approx(907.18474)
+
+
+def test_supervisor_reloads_only_changed_listener():
+    ptys = [os.openpty() for _ in range(3)]
+    a = ScaleConfig(id=9401, port=os.ttyname(ptys[0][1]), stable_window=1, deadband=0)
+    b = ScaleConfig(id=9402, port=os.ttyname(ptys[1][1]), stable_window=1, deadband=0)
+    sup = ListenerSupervisor()
+    sup.start("thread", [a, b])
+    try:
+        _wait_for(lambda: _states(sup) == {9401: "connected", 9402: "connected"})
+        thread_b = sup.engine._listeners[9402]["thread"]
+
+        # Zmiana portu wagi A - listener B działa dalej bez restartu
+        moved = ScaleConfig(**{**a.model_dump(), "port": os.ttyname(ptys[2][1])})
+        sup.apply(moved)
+        _wait_for(lambda: _states(sup).get(9401) == "connected")
+        assert sup.engine._listeners[9402]["thread"] is thread_b
+
+        os.write(ptys[2][0], b"Net 42.0 g\r\n")
+        _wait_for(lambda: latest_readings.last(9401) is not None)
+        assert latest_readings.last(9401).weight == 42.0
+
+        sup.remove(9402)
+        assert set(_states(sup)) == {9401}
+    finally:
+        sup.stop()
+        for master, slave in ptys:
+            os.close(master)
+            os.close(slave)
+
+
+def test_thread_listener_remove_waits_for_blocked_read():
+    master, slave = os.openpty()
+    # Odczyt z długim timeoutem - wątek wisi w read, dopóki waga milczy
+    cfg = ScaleConfig(id=9403, port=os.ttyname(slave), timeout=60000)
+    engine_ = ThreadListenerEngine()
+    engine_.add(cfg)
+    try:
+        _wait_for(lambda: engine_.status()[0]["state"] == "connected")
+        thread = engine_._listeners[9403]["thread"]
+        started = time.monotonic()
+        engine_.remove(9403, timeout=5)
+        assert not thread.is_alive()
+        assert time.monotonic() - started < 2
+    finally:
+        engine_.stop()
+        os.close(master)
+        os.close(slave)
+
+
+def test_thread_listener_remove_reports_stuck_read_as_stopping(monkeypatch):
+    release = threading.Event()
+    opened = []
+
+    class StuckSerial:
+        in_waiting = 0
+
+        # Odczyt zawieszony w sterowniku - cancel_read go nie przerywa
+        def read(self, size=1):
+            release.wait()
+            return b""
+
+        def cancel_read(self):
+            pass
+
+        def close(self):
+            pass
+
+    def fake_open(cfg, timeout):
+        opened.append(cfg.id)
+        return StuckSerial()
+
+    monkeypatch.setattr("app.scale.listener.open_serial", fake_open)
+    cfg = ScaleConfig(id=9404, port="/dev/stuck-scale")
+    engine_ = ThreadListenerEngine()
+    engine_.add(cfg)
+    try:
+        _wait_for(lambda: opened == [9404])
+        started = time.monotonic()
+        engine_.remove(9404, timeout=0.1)
+        assert time.monotonic() - started < 1
+        assert [s["state"] for s in engine_.status()] == ["stopping"]
+
+        # Nowy listener tego portu czeka, aż stary wątek zwolni port
+        engine_.add(cfg)
+        time.sleep(0.3)
+        assert opened == [9404]
+        release.set()
+        _wait_for(lambda: len(opened) == 2)
+        _wait_for(lambda: len(engine_.status()) == 1)
+    finally:
+        release.set()
+        engine_.stop()
+
+
+def test_open_serial_maps_line_settings():
+    master, slave = os.openpty()
+    cfg = ScaleConfig(
+        id=9405, port=os.ttyname(slave), data_bits=7, parity="e", stop_bits=2
+    )
+    try:
+        ser = listener.open_serial(cfg, 0)
+        assert (ser.bytesize, ser.parity, ser.stopbits) == (7, "E", 2)
+        ser.close()
+    finally:
+        os.close(master)
+        os.close(slave)
+
+
+def test_port_broker_shares_one_line_between_waiters():
+    async def scenario():
+        broker = PortBroker()
+        waiters = [
+            asyncio.create_task(broker.next_line(1, timeout=1.0)) for _ in range(3)
+        ]
+        await asyncio.sleep(0)
+        assert broker.wants(1) and not broker.wants(2)
+
+        # Linia z innego wątku (jak z listenera wątkowego)
+        threading.Thread(target=broker.offer, args=(1, b" Net 1.5 g\r")).start()
+        assert await asyncio.gather(*waiters) == ["Net 1.5 g"] * 3
+        assert not broker.wants(1)
+
+        # Po timeoucie wszystkich czekających oczekiwanie znika; wcześniejszy
+        # timeout jednego nie odbiera linii pozostałym
+        slow = asyncio.create_task(broker.next_line(1, timeout=1.0))
+        assert await broker.next_line(1, timeout=0.05) is None
+        assert broker.wants(1)
+        slow.cancel()
+        await asyncio.gather(slow, return_exceptions=True)
+        assert not broker.wants(1)
+        broker.offer(1, b"Net 2.0 g")
+        stats = broker.stats()
+        assert stats["shared"] == 3 and stats["delivered"] == 1
+        assert stats["timeouts"] == 1 and stats["pending"] == 0
+
+    asyncio.run(scenario())
+
+
+def _states(sup) -> dict:
+    return {s["scale_id"]: s["state"] for s in sup.status()["listeners"]}
+
+
+def _wait_for(predicate, timeout: float = 3.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "condition not met in time"
+        time.sleep(0.02)